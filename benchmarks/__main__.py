@@ -0,0 +1,44 @@
+"""
+Runs every benchmark and prints the results as JSON, to compare
+releases:
+
+    python -m benchmarks > before.json
+    python -m benchmarks routing overhead --output after.json
+"""
+import argparse
+import importlib
+import json
+import platform
+import sys
+import porc
+
+BENCHMARKS = ['construct', 'overhead', 'routing', 'throughput', 'memory', 'responses']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Runs porc's benchmarks.")
+    parser.add_argument('names', nargs='*', metavar='name',
+                        help="benchmarks to run, of %s (default: all)" % ', '.join(BENCHMARKS))
+    parser.add_argument('--output', help="file to write the results to (default: stdout)")
+    args = parser.parse_args(argv)
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error("unknown benchmarks: %s" % ', '.join(sorted(unknown)))
+
+    results = dict(porc=porc.VERSION, python=platform.python_version(),
+                   codec=porc.codec.name, results={})
+    for name in args.names or BENCHMARKS:
+        sys.stderr.write('running %s\n' % name)
+        module = importlib.import_module('benchmarks.' + name)
+        results['results'][name] = module.run()
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
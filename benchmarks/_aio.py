@@ -0,0 +1,15 @@
+"""
+The `AsyncioClient` runner of `benchmarks.throughput`, kept apart since
+its syntax needs Python 3.7.
+"""
+import asyncio
+import porc
+
+
+def asyncio_client(url, requests, concurrency):
+    async def run():
+        async with porc.AsyncioClient('API_KEY', url, max_connections=concurrency) as client:
+            await asyncio.gather(*[
+                client.get('bench', str(i % 100)) for i in range(requests)])
+
+    asyncio.run(run())
@@ -0,0 +1,39 @@
+"""
+Cost of creating short-lived clients: constructing a `Client`, creating
+`Pages` from it, and constructing a client and sending its first request
+to a local stand-in server.
+
+    python -m benchmarks.construct
+"""
+import timeit
+import requests
+from requests_futures.sessions import FuturesSession
+import porc
+from porc.testing import serve
+
+
+def eager():
+    # what every Resource used to build up front
+    requests.Session()
+    FuturesSession().executor.shutdown(wait=False)
+
+
+def run(number=2000):
+    results = {}
+    results['construct_us'] = timeit.timeit(
+        lambda: porc.Client('API_KEY'), number=number) / number * 1e6
+    results['eager_sessions_us'] = timeit.timeit(
+        eager, number=number) / number * 1e6
+    client = porc.Client('API_KEY')
+    results['pages_us'] = timeit.timeit(
+        lambda: client.list('a_collection'), number=number) / number * 1e6
+    with serve() as url:
+        first = lambda: porc.Client('API_KEY', url).get('a_collection', 'a_key')
+        results['first_request_us'] = timeit.timeit(
+            first, number=number // 10) / (number // 10) * 1e6
+    return results
+
+
+if __name__ == '__main__':
+    for name, value in sorted(run().items()):
+        print('%-20s %9.2fus' % (name, value))
@@ -0,0 +1,53 @@
+"""
+Peak memory of reading a large collection from the local stand-in
+server: all at once with `Pages.all`, one item at a time with
+`Pages.items`, and with `Pages.items(stream=True)`. The stand-in runs in
+the same process, so its own allocations, the same in every case, are
+included.
+
+    python -m benchmarks.memory
+"""
+import tracemalloc
+import porc
+from porc.testing import Orchestrate, serve
+
+
+def all_items(client):
+    return len(client.list('bench', limit=100).all())
+
+
+def each_item(client, stream=False):
+    count = 0
+    for item in client.list('bench', limit=100).items(stream=stream):
+        count += 1
+    return count
+
+
+def peak(fn, *args):
+    tracemalloc.start()
+    try:
+        count = fn(*args)
+        return count, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(items=5000, size=1024):
+    state = Orchestrate()
+    for i in range(items):
+        state.handle('PUT', ['bench', '%06d' % i], {}, {}, {'i': i, 'text': 'x' * size})
+    results = {}
+    with serve(state) as url:
+        client = porc.Client('API_KEY', url)
+        for name, fn, args in [('all', all_items, ()),
+                               ('items', each_item, ()),
+                               ('items_stream', each_item, (True,))]:
+            count, used = peak(fn, client, *args)
+            assert count == items
+            results[name + '_peak_kb'] = used / 1024.0
+    return results
+
+
+if __name__ == '__main__':
+    for name, value in sorted(run().items()):
+        print('%-20s %9.1fKB' % (name, value))
@@ -0,0 +1,47 @@
+"""
+Per-call cost of building requests and following pages, without any I/O:
+`Resource._make_path` quoting, `Resource._prepare` normalizing params and
+encoding bodies, and `Pages._follow` parsing `Link` headers.
+
+    python -m benchmarks.overhead
+"""
+import timeit
+import requests
+import porc
+from porc import Pages, Response
+
+ITEM = dict(('field%d' % i, 'value %d' % i) for i in range(50))
+
+
+def link_response():
+    response = requests.Response()
+    response.status_code = 200
+    response.url = 'https://api.orchestrate.io/v0/users?limit=100'
+    response.headers['Link'] = (
+        '</v0/users?limit=100&afterKey=k0123456789>; rel="next", '
+        '</v0/users?limit=100&beforeKey=k0000000000>; rel="prev"')
+    response._content = b'{"count": 0, "results": []}'
+    return Response(response)
+
+
+def run(number=20000):
+    client = porc.Client('API_KEY')
+    pages = Pages(client.opts, client.uri, ['users'], {}, resource=client)
+    response = link_response()
+
+    cases = {
+        'make_path': lambda: client._make_path(['users', 'a key/with spaces', 'refs', 'abc']),
+        'prepare_get': lambda: client._prepare(
+            'GET', ['users'], {'limit': 100, 'values': True}, {}),
+        'prepare_put': lambda: client._prepare('PUT', ['users', 'key'], ITEM, {}),
+        'follow_links': lambda: pages._follow(Response(response.response)),
+    }
+    results = {}
+    for name, fn in sorted(cases.items()):
+        results[name + '_us'] = timeit.timeit(fn, number=number) / number * 1e6
+    return results
+
+
+if __name__ == '__main__':
+    for name, value in sorted(run().items()):
+        print('%-20s %9.2fus' % (name, value))
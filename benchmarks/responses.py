@@ -0,0 +1,81 @@
+"""
+Memory held by many responses, like those of a bulk read: 100k
+`Response` objects, with their bodies decoded, against the same
+responses made lean with `LeanResponse`. The responses are built the
+way requests builds them, with the headers the stand-in server sends,
+rather than fetched, so only the responses themselves are measured.
+
+    python -m benchmarks.responses
+"""
+import datetime
+import gc
+import json
+import tracemalloc
+import requests
+from requests.structures import CaseInsensitiveDict
+import porc
+
+URL = 'https://api.orchestrate.io/v0/bench/%06d'
+REQUEST = requests.Request('GET', URL % 0, headers={'Accept': 'application/json'},
+                           auth=('API_KEY', '')).prepare()
+
+
+def fake(i, size):
+    request = REQUEST.copy()
+    request.url = URL % i
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.reason = 'OK'
+    resp.url = request.url
+    resp.request = request
+    resp.encoding = 'utf-8'
+    resp.elapsed = datetime.timedelta(milliseconds=1)
+    resp.headers = CaseInsensitiveDict({
+        'Content-Type': 'application/json',
+        'Content-Length': str(size + 40),
+        'Content-Location': '/v0/bench/%06d/refs/%016x' % (i, i),
+        'ETag': '"%016x"' % i,
+        'Date': 'Sun, 18 Oct 2026 12:00:00 GMT',
+        'Server': 'BaseHTTP/0.6 Python/3',
+    })
+    resp._content = json.dumps({'i': i, 'text': 'x' * size}).encode('utf-8')
+    return porc.Response(resp)
+
+
+def full(i, size):
+    resp = fake(i, size)
+    resp.json
+    return resp
+
+
+def lean(i, size):
+    return porc.LeanResponse(fake(i, size))
+
+
+def held(make, count, size):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        responses = [make(i, size) for i in range(count)]
+        gc.collect()
+        used = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert responses[-1]['i'] == count - 1
+    assert responses[-1].ref == '%016x' % (count - 1)
+    return used
+
+
+def run(count=100000, size=100):
+    results = {}
+    for name, make in [('full', full), ('lean', lean)]:
+        used = held(make, count, size)
+        results[name + '_mb'] = used / 1024.0 / 1024
+        results[name + '_bytes_per_response'] = used / float(count)
+    results['payload_mb'] = count * len(fake(0, size).response.content) / 1024.0 / 1024
+    return results
+
+
+if __name__ == '__main__':
+    for name, value in sorted(run().items()):
+        print('%-28s %10.1f' % (name, value))
@@ -0,0 +1,96 @@
+"""
+Per-response cost of extracting route attributes (collection, key, ref,
+...) from the url and headers, comparing the regex matching that
+`Response._set_path` used to do with the current segment router.
+
+    python -m benchmarks.routing
+"""
+import re
+import timeit
+import requests
+from porc import Response
+
+URL_PATTERNS = [
+    r"/v0/(?P<collection>.+)/(?P<key>.+)/events/(?P<type>.+)/(?P<timestamp>\d+)/(?P<ordinal>\d+)",
+    r"/v0/(?P<collection>.+)/(?P<key>.+)/events/(?P<type>.+)/(?P<timestamp>\d+)",
+    r"/v0/(?P<collection>.+)/(?P<key>.+)/events/(?P<type>.+)",
+    r"/v0/(?P<collection>.+)/(?P<key>.+)/refs/(?P<ref>.+)",
+    r"/v0/(?P<collection>.+)/(?P<key>.+)/refs",
+    r"/v0/(?P<collection>.+)/(?P<key>.+)/relations/(?P<kind>.+)/(?P<to_collection>.+)/(?P<to_key>.+)",
+    r"/v0/(?P<collection>.+)/(?P<key>.+)/relations/(?P<kinds>.+)",
+    r"/v0/(?P<collection>.+)/(?P<key>.+)",
+    r"/v0/(?P<collection>.+)"
+]
+
+KEY = 'k' * 200
+
+
+def regex_set_path(obj, response):
+    # the previous implementation of Response._set_path
+    path = response.url[response.url.find('/v0'):]
+    for regex in URL_PATTERNS:
+        location_match = re.match(regex, path)
+        if location_match:
+            for key, value in location_match.groupdict().items():
+                setattr(obj, key, value)
+            break
+    for regex in URL_PATTERNS:
+        location_match = re.match(regex, response.headers.get('location', ''))
+        if not location_match:
+            location_match = re.match(
+                regex, response.headers.get('content-location', ''))
+        if location_match:
+            for key, value in location_match.groupdict().items():
+                setattr(obj, key, value)
+            break
+    etag_match = re.match('"(?P<ref>.+)"', response.headers.get('etag', ''))
+    if etag_match:
+        for key, value in etag_match.groupdict().items():
+            setattr(obj, key, value)
+
+
+def make_response(path, headers):
+    response = requests.Response()
+    response.status_code = 200
+    response.url = 'https://api.orchestrate.io' + path
+    response.headers.update(headers)
+    response._content = b''
+    return response
+
+
+CASES = {
+    'put': make_response('/v0/users/%s' % KEY, {
+        'Location': '/v0/users/%s/refs/0eb1fe8dbb25ba93' % KEY,
+        'ETag': '"0eb1fe8dbb25ba93"'
+    }),
+    'event': make_response('/v0/users/%s/events/log/1404973704558/4' % KEY, {
+        'ETag': '"82eafab14dc84ed3"'
+    }),
+    'list': make_response('/v0/users?limit=100&afterKey=%s' % KEY, {}),
+}
+
+
+class Holder(object):
+    pass
+
+
+def run(number=20000):
+    results = {}
+    for name, response in sorted(CASES.items()):
+        before = timeit.timeit(
+            lambda: regex_set_path(Holder(), response), number=number)
+        after = timeit.timeit(
+            lambda: Response(response).collection, number=number)
+        unread = timeit.timeit(lambda: Response(response), number=number)
+        results[name] = {
+            'regex_us': before / number * 1e6,
+            'router_us': after / number * 1e6,
+            'unread_us': unread / number * 1e6,
+        }
+    return results
+
+
+if __name__ == '__main__':
+    for name, result in sorted(run().items()):
+        print('%-6s regex %7.2fus   router %6.2fus   attributes unread %5.2fus' % (
+            name, result['regex_us'], result['router_us'], result['unread_us']))
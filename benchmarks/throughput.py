@@ -0,0 +1,52 @@
+"""
+End-to-end requests per second against the local stand-in server, for
+sequential requests on a `Client`, concurrent ones through
+`Client.asynchronous`, and `AsyncioClient` where available. The stand-in
+can add `latency` to each request, to show what concurrency buys when
+the service, rather than the client, is the bottleneck.
+
+    python -m benchmarks.throughput
+"""
+import sys
+import time
+import porc
+from porc.testing import Orchestrate, serve
+
+
+def sync(url, requests):
+    client = porc.Client('API_KEY', url)
+    for i in range(requests):
+        client.get('bench', str(i % 100))
+
+
+def futures(url, requests, concurrency):
+    with porc.Client('API_KEY', url, pool_maxsize=concurrency,
+                     max_workers=concurrency).asynchronous() as client:
+        futures = [client.get('bench', str(i % 100)) for i in range(requests)]
+        [future.result() for future in futures]
+
+
+def rate(fn, *args):
+    start = time.time()
+    fn(*args)
+    return args[1] / (time.time() - start)
+
+
+def run(requests=2000, concurrency=16, latency=0):
+    results = {}
+    state = Orchestrate()
+    for i in range(100):
+        state.handle('PUT', ['bench', str(i)], {}, {}, {'i': i})
+    state.latency = latency
+    with serve(state) as url:
+        results['sync_rps'] = rate(sync, url, requests)
+        results['async_rps'] = rate(futures, url, requests, concurrency)
+        if sys.version_info >= (3, 7):
+            from ._aio import asyncio_client
+            results['asyncio_rps'] = rate(asyncio_client, url, requests, concurrency)
+    return results
+
+
+if __name__ == '__main__':
+    for name, value in sorted(run().items()):
+        print('%-20s %9.1f/s' % (name, value))
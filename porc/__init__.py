@@ -1,10 +1,19 @@
+import sys
 from .version import VERSION
 __version__ = VERSION
 
+from .cache import Cache
 from .client import Client
+from .events import EventWriter
+from .instrument import Histograms, Observer
 from .pages import Pages
 from .patch import Patch
+from .ratelimit import RateLimiter
 from .resource import Resource
-from .response import Response
+from .response import LeanResponse, Response
+from .retry import Retry
 from .search import Search
-from . import util
+from . import columns, util
+
+if sys.version_info >= (3, 6):
+    from .aio import AsyncioClient, AsyncPages
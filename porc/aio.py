@@ -0,0 +1,392 @@
+"""
+An asyncio-native client. Every request method of `Client` returns a
+coroutine instead of a `Response`, and all requests share one event loop
+and one connection pool rather than holding a thread each.
+
+Requires python 3.6+ and `aiohttp`.
+"""
+import asyncio
+import base64
+import datetime
+import requests
+from itertools import islice
+from requests.structures import CaseInsensitiveDict
+from .client import Client, _Traversal, _Update
+from .events import _timestamp, _Windows
+from .instrument import clock
+from .pages import search_key
+from .ratelimit import BACKGROUND
+from .response import LeanResponse, Response, restored, stored
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+def _to_response(resp, content):
+    """
+    Copies an `aiohttp` response into a `requests.Response`, so both
+    clients hand back the same `Response` objects.
+    """
+    response = requests.Response()
+    response.status_code = resp.status
+    response.reason = resp.reason
+    response.url = str(resp.url)
+    response.headers = CaseInsensitiveDict(resp.headers)
+    response.encoding = resp.charset or 'utf-8'
+    response._content = content
+    return Response(response)
+
+
+class AsyncioClient(Client):
+    """
+    Usage:
+
+        async with AsyncioClient(API_KEY) as client:
+            responses = await asyncio.gather(*[
+                client.get('a_collection', key) for key in keys
+            ])
+    """
+
+    def __init__(self, api_key, url=None, max_connections=100, **kwargs):
+        if aiohttp is None:
+            raise ImportError("AsyncioClient requires aiohttp: pip install aiohttp")
+        self.max_connections = max_connections
+        self._http = None
+        self._stats = dict(requests=0, connections=0)
+        super(AsyncioClient, self).__init__(api_key, url, **kwargs)
+
+    def _http_session(self):
+        # aiohttp sessions must be created inside the running event loop
+        if self._http is None or self._http.closed:
+            headers = dict(self.opts.get('headers', {}))
+            credentials = ('%s:%s' % self.opts['auth']).encode('utf-8')
+            headers['Authorization'] = 'Basic ' + base64.b64encode(credentials).decode('ascii')
+            connector = dict(limit=self.max_connections, force_close=not self.keep_alive)
+            if self.keep_alive and self.keep_alive is not True:
+                connector['keepalive_timeout'] = self.keep_alive
+            session = dict(headers=headers, trace_configs=[self._trace()])
+            if self.timeout is not None:
+                session['timeout'] = aiohttp.ClientTimeout(total=self.timeout)
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(**connector), **session)
+        return self._http
+
+    def _trace(self):
+        trace = aiohttp.TraceConfig()
+
+        def counter(name):
+            async def count(session, context, params):
+                self._stats[name] += 1
+            return count
+
+        trace.on_request_start.append(counter('requests'))
+        trace.on_connection_create_end.append(counter('connections'))
+        return trace
+
+    def pool_stats(self):
+        stats = dict(self._stats)
+        stats['reused'] = stats['requests'] - stats['connections']
+        return stats
+
+    def _request(self, method, path = [], body = None, headers = {}):
+        uri, opts = self._prepare(method, path, body, headers)
+        return self._send(method, uri, opts, True)
+
+    async def _send(self, method, uri, opts, use_async, priority=None):
+        # coroutines share a thread, so `prioritized` doesn't apply here
+        priority = self.priority if priority is None else priority
+        retry = self.retry
+        safe = retry is not None and retry.idempotent(method, opts['headers'])
+        if retry is not None:
+            retry.started()
+        attempt = 0
+        while True:
+            attempt += 1
+            queued = clock()
+            if self.rate_limiter is not None:
+                await self._admit(priority)
+            started = clock()
+            try:
+                response = await self._fetch(method, uri, opts)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                self._observe(method, uri, opts, attempt, started - queued, started, error=e)
+                delay = retry.delay(attempt) if safe else None
+                if delay is None:
+                    raise
+            else:
+                self._observe(method, uri, opts, attempt, started - queued, started, response)
+                delay = retry.delay(attempt, response) if safe else None
+                if delay is None:
+                    return LeanResponse(response) if self.lean else response
+            await asyncio.sleep(delay)
+
+    async def _admit(self, priority):
+        # waits for the rate limiter without blocking the event loop
+        limiter = self.rate_limiter
+        ticket = limiter._enter(priority)
+        try:
+            while True:
+                wait = limiter._poll(ticket)
+                if not wait:
+                    return
+                await asyncio.sleep(wait)
+        finally:
+            limiter._leave(ticket)
+
+    async def _fetch(self, method, uri, opts):
+        started = clock()
+        async with self._http_session().request(
+                method, uri, params=opts.get('params'), data=opts.get('data'),
+                headers=opts['headers']) as resp:
+            headers = clock()
+            content = await resp.read()
+        # aiohttp decompresses as it reads, so take the wire size from the
+        # headers; chunked responses only report their decompressed size
+        wire = resp.headers.get('Content-Length')
+        self._count_bytes('received', len(content),
+                          int(wire) if wire is not None else len(content))
+        response = _to_response(resp, content)
+        response.response.elapsed = datetime.timedelta(seconds=headers - started)
+        return response
+
+    async def _then(self, result, fn):
+        return fn(await result)
+
+    async def _resolved(self, value):
+        return value
+
+    def _pages(self, path, params):
+        return AsyncPages(self, path, params)
+
+    async def _many(self, method, collection, items, concurrency):
+        items = iter(items)
+        pending = {}
+
+        def submit(item):
+            args = item if isinstance(item, tuple) else (item,)
+            task = asyncio.ensure_future(method(collection, *args))
+            pending[task] = args[0]
+
+        for item in islice(items, concurrency):
+            submit(item)
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                finished = [(pending.pop(task), task) for task in done]
+                for item in islice(items, len(finished)):
+                    submit(item)
+                for key, task in finished:
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        result = e
+                    yield key, result
+        finally:
+            # the caller stopped iterating early
+            for task in pending:
+                task.cancel()
+
+    async def update(self, collection, key, fn, default=None, reads=None,
+                     attempts=5, backoff=0.05, max_backoff=1.0):
+        # the steps of `Client.update`, awaiting each request
+        update = _Update(self, collection, key, fn, default, reads,
+                         attempts, backoff, max_backoff)
+        request = update.read
+        while request is not None:
+            delay, request = update.received(await request())
+            if delay:
+                await asyncio.sleep(delay)
+        return update.result
+
+    async def scan_events(self, collection, key, event_type, start, end=None, windows=8,
+                          concurrency=8, limit=100, ascending=False, adaptive=False,
+                          window_events=1000):
+        """
+        Like `Client.scan_events`, as an async generator.
+        """
+        scan = _Windows(_timestamp(start), _timestamp(end), windows, ascending,
+                        adaptive, window_events)
+
+        async def fetch(window):
+            pages = self.list_events(collection, key, event_type, limit=limit,
+                                     startEvent=window[0], beforeEvent=window[1])
+            events = [event async for event in pages.items()]
+            scan.observed(window, len(events))
+            if ascending:
+                events.reverse()
+            return events
+
+        pending = []
+
+        def submit():
+            window = scan.next()
+            if window is not None:
+                pending.append(asyncio.ensure_future(fetch(window)))
+
+        for _ in range(concurrency):
+            submit()
+        try:
+            while pending:
+                events = await pending.pop(0)
+                submit()
+                for event in events:
+                    yield event
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def traverse(self, seeds, kinds, depth=None, max_fanout=None, concurrency=10):
+        """
+        Like `Client.traverse`, as an async generator.
+        """
+        traversal = _Traversal(seeds, kinds, depth, max_fanout)
+        slots = asyncio.Semaphore(concurrency)
+        for depth, kinds, frontier in traversal.levels():
+            async def related(node):
+                items = []
+                async with slots:
+                    for kind in kinds:
+                        pages = self._pages(list(node) + ['relations', kind],
+                                            dict(limit=traversal.limit))
+                        items.extend([item async for item in
+                                      pages.items(traversal.remaining(items))])
+                return node, items
+
+            tasks = [asyncio.ensure_future(related(node)) for node in frontier]
+            try:
+                for task in asyncio.as_completed(tasks):
+                    node, items = await task
+                    for item in traversal.found(items):
+                        yield depth, node, item
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, type, value, stacktrace):
+        await self.close()
+
+
+class AsyncPages(object):
+    """
+    The asynchronous counterpart of `Pages`:
+
+        async for page in client.list('a_collection'):
+            page.raise_for_status()
+    """
+
+    def __init__(self, resource, path, params):
+        self.initialPath = path
+        self.initialParams = params
+        self.nextPath = path
+        self.prevPath = None
+        self.resource = resource
+        self.params = params
+        self.cursor = None
+        self.priority = BACKGROUND
+        self.cache = None
+
+    async def _move(self, path, querydict = {}, headers = {}):
+        if path is None:
+            raise StopAsyncIteration
+
+        params = self.params.copy()
+        params.update(querydict)
+
+        uri, opts = self.resource._prepare('GET', path, params, dict(headers))
+        key = response = None
+        if self.cache is not None and not headers:
+            key = search_key(uri, opts.get('params') or {})
+            cached = self.cache.get(key) if key is not None else None
+            if cached is not None:
+                self.cache.record(hit=True)
+                response = restored(cached)
+        if response is None:
+            response = await self.resource._send('GET', uri, opts, True, self.priority)
+            if key is not None:
+                self.cache.record(hit=False)
+                if response.status_code == 200:
+                    self.cache.set(key, stored(response))
+
+        self.nextPath = response.links.get('next', {}).get('url')
+        self.prevPath = response.links.get('prev', {}).get('url')
+        self.params = {}
+
+        return response
+
+    def reset(self):
+        self.nextPath = self.initialPath
+        self.prevPath = None
+        self.params = self.initialParams
+
+    async def next(self, querydict={}, **headers):
+        """
+        Gets the next page of results.
+        Raises `StopAsyncIteration` when there are no more results.
+        """
+        return await self._move(self.nextPath, querydict, headers)
+
+    async def prev(self, querydict={}, **headers):
+        """
+        Gets the previous page of results.
+        Raises `StopAsyncIteration` when there are no more results.
+        """
+        return await self._move(self.prevPath, querydict, headers)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.next()
+
+    async def items(self, max_items=None, cursor=None):
+        """
+        Iterates over the items of every page, one at a time.
+        See `Pages.items`; the cursor is kept on `AsyncPages.cursor`.
+        """
+        skip = 0
+        if cursor is not None:
+            if isinstance(cursor, (list, tuple)):
+                cursor, skip = cursor
+            self.nextPath = cursor
+            self.prevPath = None
+            self.params = {}
+
+        count = 0
+        while max_items is None or count < max_items:
+            try:
+                response = await self.next()
+            except StopAsyncIteration:
+                self.cursor = None
+                return
+            response.raise_for_status()
+            url = response.url
+            results = response['results'] or []
+            del response
+
+            for index in range(skip, len(results)):
+                if max_items is not None and count >= max_items:
+                    return
+                self.cursor = (url, index)
+                yield results[index]
+                count += 1
+                self.cursor = (url, index + 1)
+            skip = 0
+            self.cursor = (self.nextPath, 0) if self.nextPath else None
+
+    async def all(self):
+        results = []
+        async for response in self:
+            response.raise_for_status()
+            results.extend(response['results'])
+        return results
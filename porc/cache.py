@@ -0,0 +1,90 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class Cache(object):
+    """
+    A thread-safe, least-recently-used cache holding up to `size`
+    entries. If `ttl` is given, entries expire that many seconds after
+    they were stored.
+
+        client = Client(API_KEY, cache=Cache(size=10000, ttl=300))
+        client.get('a_collection', 'a_key')
+        print client.cache.stats()
+    """
+
+    def __init__(self, size=1024, ttl=None):
+        self.size = size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the value stored under `key`, or `None`.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires < time.time():
+                del self._entries[key]
+                return None
+            # mark as most recently used
+            del self._entries[key]
+            self._entries[key] = entry
+            return value
+
+    def set(self, key, value):
+        expires = time.time() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, expires)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate(self, *prefix):
+        """
+        Removes every entry whose key is a tuple starting with `prefix`.
+        """
+        n = len(prefix)
+        with self._lock:
+            for key in [k for k in self._entries if k[:n] == prefix]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def record(self, hit, revalidated=False):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            if revalidated:
+                self.revalidations += 1
+
+    def stats(self):
+        """
+        Returns the cache's counters as a dict. `revalidations` counts
+        hits that needed a round-trip to confirm the entry was current.
+        """
+        with self._lock:
+            return dict(size=len(self._entries), hits=self.hits,
+                        misses=self.misses, revalidations=self.revalidations,
+                        evictions=self.evictions)
+
+    def __len__(self):
+        return len(self._entries)
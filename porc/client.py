@@ -1,15 +1,25 @@
+import copy
+import threading
+import time
+from concurrent.futures import Future
 from datetime import datetime
 from .resource import Resource
+from .response import restored, stored
 from .version import VERSION
 from .pages import Pages
-from .patch import Patch
+from .patch import Patch, diff, lookup, string_types
+from .ratelimit import BACKGROUND
+from .retry import backoff
 from .search import Search
-from . import util
+from . import events, util
 
 class Client(Resource):
-    def __init__(self, api_key, url = None, use_async = False, **kwargs):
+    def __init__(self, api_key, url = None, use_async = False, cache = None,
+                 search_cache = None, **kwargs):
         self.api_key = api_key
         self.url = url
+        self.cache = cache
+        self.search_cache = search_cache
 
         # If no url is provided, use the default
         if url is None:
@@ -43,10 +53,71 @@ class Client(Resource):
             path = [collection, key, 'refs', ref]
         else:
             path = [collection, key]
-        return self._request('GET', path)
+        if self.cache is None:
+            return self._request('GET', path)
+        return self._cached_get(collection, key, ref, path)
+
+    def _cached_get(self, collection, key, ref, path):
+        headers = dict()
+        if ref:
+            # a ref names an immutable version, so no need to ask
+            cached = self.cache.get((collection, key, ref))
+            if cached is not None:
+                self.cache.record(hit=True)
+                return self._resolved(restored(cached))
+        else:
+            cached = self.cache.get((collection, key))
+            if cached is not None:
+                headers['If-None-Match'] = '"%s"' % cached[0]
+                cached = cached[1]
+
+        def store(response):
+            if response.status_code == 304 and cached is not None:
+                self.cache.record(hit=True, revalidated=True)
+                return restored(cached)
+            self.cache.record(hit=False)
+            if response.status_code == 200 and getattr(response, 'ref', None):
+                value = stored(response)
+                self.cache.set((collection, key, response.ref), value)
+                if not ref:
+                    self.cache.set((collection, key), (response.ref, value))
+            return response
+
+        return self._then(self._request('GET', path, None, headers), store)
+
+    def _invalidate(self, collection, key=None, ref=None, purge=False):
+        self._invalidate_searches(collection)
+        if self.cache is None:
+            return
+        if key is None:
+            self.cache.invalidate(collection)
+        elif purge:
+            self.cache.invalidate(collection, key)
+        else:
+            self.cache.discard((collection, key))
+            if ref:
+                self.cache.discard((collection, key, ref))
+
+    def _invalidate_searches(self, collection):
+        # any write may change what a search of the collection finds
+        if self.search_cache is not None:
+            self.search_cache.invalidate(collection)
+
+    def _written(self, response, invalidate, *args, **kwargs):
+        """
+        Invalidates again once a write completes, since reads made while
+        it was in flight may have cached what it replaced.
+        """
+        def done(response):
+            invalidate(*args, **kwargs)
+            return response
+
+        return self._then(response, done)
 
     def post(self, collection, body):
-        return self._request('POST', [collection], body)
+        self._invalidate_searches(collection)
+        return self._written(self._request('POST', [collection], body),
+                             self._invalidate_searches, collection)
 
     def put(self, collection, key, body, ref=None):
         opts = dict()
@@ -54,7 +125,9 @@ class Client(Resource):
             opts['If-Match'] = ref.center(len(ref) + 2, '"')
         elif ref == False:
             opts['If-None-Match'] = '"*"'
-        return self._request('PUT', [collection, key], body, opts)
+        self._invalidate(collection, key)
+        return self._written(self._request('PUT', [collection, key], body, opts),
+                             self._invalidate, collection, key)
 
     def patch(self, collection, key, body_or_patch, ref=None):
         opts = {'Content-Type': 'application/json-patch+json'}
@@ -69,7 +142,9 @@ class Client(Resource):
         else:
             body = body_or_patch
 
-        return self._request('PATCH', [collection, key], body, opts)
+        self._invalidate(collection, key)
+        return self._written(self._request('PATCH', [collection, key], body, opts),
+                             self._invalidate, collection, key)
 
     def patch_merge(self, collection, key, body, ref=None):
         opts = {'Content-Type': 'application/merge-patch+json'}
@@ -79,9 +154,12 @@ class Client(Resource):
             # If-None-Match is not relevant for a PATCH request.
             opts['If-None-Match'] = '"*"'
 
-        return self._request('PATCH', [collection, key], body, opts)
+        self._invalidate(collection, key)
+        return self._written(self._request('PATCH', [collection, key], body, opts),
+                             self._invalidate, collection, key)
 
     def delete(self, collection, key=None, ref=None):
+        self._invalidate(collection, key, ref, purge=not ref)
         if key:
             opts = dict()
             params = dict()
@@ -89,15 +167,128 @@ class Client(Resource):
                 opts['If-Match'] = ref.center(len(ref) + 2, '"')
             else:
                 params['purge'] = True
-            return self._request('DELETE', [collection, key], params, opts)
+            response = self._request('DELETE', [collection, key], params, opts)
         else:
-            return self._request('DELETE', [collection], dict(force=True))
+            response = self._request('DELETE', [collection], dict(force=True))
+        return self._written(response, self._invalidate, collection, key, ref,
+                             purge=not ref)
+
+    def _many(self, method, collection, items, concurrency):
+        def call(item):
+            args = item if isinstance(item, tuple) else (item,)
+            with self.prioritized(BACKGROUND):
+                result = method(collection, *args)
+            # asynchronous clients return futures; wait on them in the
+            # worker so the concurrency limit still holds
+            if isinstance(result, Future):
+                result = result.result()
+            return result
+
+        for item, result in util.bounded(call, items, concurrency):
+            yield (item[0] if isinstance(item, tuple) else item), result
+
+    def get_many(self, collection, keys, concurrency=10):
+        """
+        Gets many items, running at most `concurrency` requests at once.
+        `keys` may contain keys or `(key, ref)` tuples.
+
+        Yields `(key, response)` pairs as the requests complete. If a
+        request raised, `response` is the exception instead.
+        """
+        return self._many(self.get, collection, keys, concurrency)
+
+    def put_many(self, collection, items, concurrency=10):
+        """
+        Puts many items, running at most `concurrency` requests at once.
+        `items` contains `(key, body)` or `(key, body, ref)` tuples.
+
+        Yields `(key, response)` pairs as the requests complete. If a
+        request raised, `response` is the exception instead.
+        """
+        return self._many(self.put, collection, items, concurrency)
+
+    def patch_many(self, collection, patches, concurrency=10):
+        """
+        Patches many items, running at most `concurrency` requests at once.
+        `patches` contains `(key, patch)` or `(key, patch, ref)` tuples,
+        where `patch` is a `Patch` or a list of operations.
+
+        Yields `(key, response)` pairs as the requests complete. If a
+        request raised, `response` is the exception instead. A `412`
+        status means the item changed since `ref`; a `409` means the
+        patch could not be applied, such as when a `test` failed.
+        """
+        return self._many(self.patch, collection, patches, concurrency)
+
+    def delete_many(self, collection, keys, concurrency=10):
+        """
+        Deletes many items, running at most `concurrency` requests at once.
+        `keys` may contain keys or `(key, ref)` tuples.
+
+        Yields `(key, response)` pairs as the requests complete. If a
+        request raised, `response` is the exception instead.
+        """
+        return self._many(self.delete, collection, keys, concurrency)
+
+    def update(self, collection, key, fn, default=None, reads=None,
+               attempts=5, backoff=0.05, max_backoff=1.0):
+        """
+        Reads an item, passes its value to `fn`, and writes back what `fn`
+        returns, conditioned on the ref that was read. `fn` is called with
+        a copy, which it may also change in place and return `None`. If
+        the value is unchanged, nothing is written.
+
+        If the item changed in between, the write fails with `412`. Then
+        if `reads` lists the paths `fn` depends on, the change is sent as
+        a `Patch` that tests those fields still hold what `fn` saw, so
+        writes to other fields don't force another round. Otherwise, or if
+        the test fails too, backs off as `porc.retry.backoff` does and
+        tries again, reading the item at most `attempts` times.
+
+        If the item doesn't exist, `fn` is passed a copy of `default` and
+        the item is created, unless `default` is `None`.
+
+        Returns the response of the write that succeeded, of the read if
+        nothing changed, or of the last request that failed.
+        """
+        update = _Update(self, collection, key, fn, default, reads,
+                         attempts, backoff, max_backoff)
+        if not self.use_async:
+            request = update.read
+            while request is not None:
+                delay, request = update.received(request())
+                if delay:
+                    time.sleep(delay)
+            return update.result
+
+        future = Future()
+
+        def run(request):
+            request().add_done_callback(done)
+
+        def done(finished):
+            try:
+                delay, request = update.received(finished.result())
+                if request is None:
+                    future.set_result(update.result)
+                elif delay:
+                    threading.Timer(delay, run, [request]).start()
+                else:
+                    run(request)
+            except Exception as e:
+                future.set_exception(e)
+
+        run(update.read)
+        return future
 
     def refs(self, collection, key, **params):
         return self._request('GET', [collection, key, 'refs'], params)
 
+    def _pages(self, path, params):
+        return Pages(self.opts, self.uri, path, params, resource=self)
+
     def list(self, collection, **params):
-        return Pages(self.opts, self.uri, [collection], params)
+        return self._pages([collection], params)
 
     def search(self, collection, query_or_search, **params):
         if isinstance(query_or_search, Search):
@@ -105,19 +296,68 @@ class Client(Resource):
         else:
             params['query'] = query_or_search
 
-        return Pages(self.opts, self.uri, [collection], params)
+        pages = self._pages([collection], params)
+        pages.cache = self.search_cache
+        return pages
+
+    def iter_items(self, collection, query_or_search=None, max_items=None,
+                   cursor=None, **params):
+        """
+        Iterates over the items of a collection listing, or of a search
+        if `query_or_search` is given, one item at a time.
+        See `Pages.items`.
+        """
+        if query_or_search is None:
+            pages = self.list(collection, **params)
+        else:
+            pages = self.search(collection, query_or_search, **params)
+        return pages.items(max_items, cursor)
 
     def get_relations(self, collection, key, *relations):
         path = [collection, key, 'relations'] + list(relations)
         return self._request('GET', path)
 
+    def traverse(self, seeds, kinds, depth=None, max_fanout=None, concurrency=10):
+        """
+        Walks the relations out of `seeds`, a list of `(collection, key)`
+        pairs, breadth first. `kinds` is a kind of relation to follow at
+        every hop, or a list with the kind, or a tuple of kinds, to follow
+        at each hop in turn. `depth` limits the number of hops; it
+        defaults to 1 for a single kind and to the length of a list.
+
+        At most `max_fanout` relations are followed out of each item. Each
+        hop lists the relations of every item found by the one before, up
+        to `concurrency` at once, and yields `(depth, (collection, key),
+        item)` as they arrive, for every item not found before, where
+        `(collection, key)` is the item related to it.
+        """
+        traversal = _Traversal(seeds, kinds, depth, max_fanout)
+        for depth, kinds, frontier in traversal.levels():
+            def related(node):
+                items = []
+                for kind in kinds:
+                    pages = self._pages(list(node) + ['relations', kind],
+                                        dict(limit=traversal.limit))
+                    items.extend(pages.items(traversal.remaining(items)))
+                return items
+
+            for node, items in util.bounded(related, frontier, concurrency):
+                if isinstance(items, Exception):
+                    raise items
+                for item in traversal.found(items):
+                    yield depth, node, item
+
     def put_relation(self, collection, key, relation, to_collection, to_key):
+        self._invalidate_searches(collection)
         path = [collection, key, 'relation', relation, to_collection, to_key]
-        return self._request('PUT', path)
+        return self._written(self._request('PUT', path),
+                             self._invalidate_searches, collection)
 
     def delete_relation(self, collection, key, relation, to_collection, to_key):
+        self._invalidate_searches(collection)
         path = [collection, key, 'relation', relation, to_collection, to_key]
-        return self._request('DELETE', path, dict(purge=True))
+        return self._written(self._request('DELETE', path, dict(purge=True)),
+                             self._invalidate_searches, collection)
 
     def get_event(self, collection, key, event_type, timestamp, ordinal):
         if isinstance(timestamp, datetime):
@@ -126,23 +366,28 @@ class Client(Resource):
         return self._request('GET', path)
 
     def post_event(self, collection, key, event_type, data, timestamp=None):
+        self._invalidate_searches(collection)
         path = [collection, key, 'events', event_type]
         if timestamp:
             if isinstance(timestamp, datetime):
                 timestamp = util.datetime_to_timestamp(timestamp)
             path.append(timestamp)
-        return self._request('POST', path, data)
+        return self._written(self._request('POST', path, data),
+                             self._invalidate_searches, collection)
 
     def put_event(self, collection, key, event_type, timestamp, ordinal, data, ref=None):
+        self._invalidate_searches(collection)
         if isinstance(timestamp, datetime):
             timestamp = util.datetime_to_timestamp(timestamp)
         path = [collection, key, 'events', event_type, timestamp, ordinal]
         headers = dict()
         if ref:
             headers['If-Match'] = ref.center(len(ref) + 2, '"')
-        return self._request('PUT', path, data, headers=headers)
+        return self._written(self._request('PUT', path, data, headers=headers),
+                             self._invalidate_searches, collection)
 
     def delete_event(self, collection, key, event_type, timestamp, ordinal, ref=None):
+        self._invalidate_searches(collection)
         if isinstance(timestamp, datetime):
             timestamp = util.datetime_to_timestamp(timestamp)
         path = [collection, key, 'events', event_type, timestamp, ordinal]
@@ -150,17 +395,178 @@ class Client(Resource):
         params = dict(purge=True)
         if ref:
             headers['If-Match'] = ref.center(len(ref) + 2, '"')
-        return self._request('DELETE', path, params, headers=headers)
+        return self._written(self._request('DELETE', path, params, headers=headers),
+                             self._invalidate_searches, collection)
 
     def list_events(self, collection, key, event_type, **params):
         path = [collection, key, 'events', event_type]
         for param in ['startEvent', 'afterEvent', 'beforeEvent', 'endEvent']:
             if param in params and isinstance(params[param], datetime):
                 params[param] = util.datetime_to_timestamp(params[param])
-        return Pages(self.opts, self.uri, path, params)
-
-    def async(self):
-        return Async(self.api_key, self.url, **self.opts)
+        return self._pages(path, params)
+
+    def scan_events(self, collection, key, event_type, start, end=None, windows=8,
+                    concurrency=8, limit=100, ascending=False, adaptive=False,
+                    window_events=1000):
+        """
+        Iterates over the events from `start` to `end`, both inclusive and
+        given as datetimes or milliseconds since the epoch; `end` defaults
+        to now. The range is split into `windows` spans of time, which are
+        listed up to `concurrency` at once, and their events yielded newest
+        first, like `list_events`, or oldest first with `ascending`.
+
+        With `adaptive`, the range is instead covered by windows sized to
+        hold about `window_events` events, at the density of the windows
+        listed so far, so sparse stretches take few requests and dense
+        ones are split between threads.
+        """
+        return events.scan_events(self, collection, key, event_type, start, end,
+                                  windows, concurrency, limit, ascending,
+                                  adaptive, window_events)
+
+    def asynchronous(self):
+        opts = dict(self.opts, **self.config)
+        return Async(self.api_key, self.url, cache=self.cache,
+                     search_cache=self.search_cache, **opts)
+
+# `async` became a reserved word in python 3.7, so it can no longer be
+# declared with `def`; keep it reachable for existing callers.
+setattr(Client, 'async', Client.asynchronous)
+
+
+class _Update(object):
+    """
+    The steps of `Client.update`. `received` takes the response to the
+    last request and returns the seconds to wait and the next request to
+    make, or `None` once `result` is set.
+    """
+
+    def __init__(self, client, collection, key, fn, default, reads,
+                 attempts, backoff, max_backoff):
+        self.client = client
+        self.collection = collection
+        self.key = key
+        self.fn = fn
+        self.default = default
+        self.reads = reads
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.attempt = 0
+        self.result = None
+        self._handle = self._read
+
+    def read(self):
+        self.attempt += 1
+        self._handle = self._read
+        return self.client.get(self.collection, self.key)
+
+    def received(self, response):
+        return self._handle(response)
+
+    def _done(self, response):
+        self.result = response
+        return None, None
+
+    def _read(self, response):
+        if response.status_code == 404 and self.default is not None:
+            self.value, ref = self.default, False
+        elif response.status_code != 200:
+            return self._done(response)
+        else:
+            self.value, ref = response.json, response.ref
+        changed = copy.deepcopy(self.value)
+        result = self.fn(changed)
+        self.changed = changed if result is None else result
+        if ref and self.changed == self.value:
+            return self._done(response)
+        self._handle = self._put if ref else self._created
+        return 0, lambda: self.client.put(self.collection, self.key, self.changed, ref)
+
+    def _created(self, response):
+        # someone else created the item first
+        if response.status_code == 412:
+            return self._conflict(response)
+        return self._done(response)
+
+    def _put(self, response):
+        if response.status_code != 412:
+            return self._done(response)
+        patch = self._patch()
+        if patch is None:
+            return self._conflict(response)
+        self._handle = self._patched
+        return 0, lambda: self.client.patch(self.collection, self.key, patch)
+
+    def _patch(self):
+        # tests that the fields `fn` read are unchanged, then applies the
+        # change; returns `None` if that can't be expressed as a patch
+        if self.reads is None or not isinstance(self.changed, dict):
+            return None
+        patch = Patch()
+        try:
+            for path in self.reads:
+                patch.test(path, lookup(self.value, path))
+        except KeyError:
+            return None
+        return diff(self.value, self.changed, patch)
+
+    def _patched(self, response):
+        if response.status_code == 409:
+            return self._conflict(response)
+        return self._done(response)
+
+    def _conflict(self, response):
+        if self.attempt >= self.attempts:
+            return self._done(response)
+        return backoff(self.attempt, self.backoff, self.max_backoff), self.read
+
+
+class _Traversal(object):
+    """
+    The bookkeeping of `Client.traverse`: the kinds to follow at each
+    hop, the items seen so far, and the frontier of the next hop.
+    """
+
+    def __init__(self, seeds, kinds, depth, max_fanout):
+        if isinstance(kinds, string_types):
+            kinds = [kinds] * (depth or 1)
+        self.kinds = [(kind,) if isinstance(kind, string_types) else tuple(kind)
+                      for kind in kinds]
+        if depth is not None and depth > len(self.kinds):
+            raise ValueError("No kinds given for hops past %d" % len(self.kinds))
+        self.depth = len(self.kinds) if depth is None else depth
+        self.max_fanout = max_fanout
+        # Orchestrate lists up to 100 results per page
+        self.limit = min(max_fanout or 100, 100)
+        self.visited = set()
+        self.frontier = []
+        for seed in seeds:
+            if tuple(seed) not in self.visited:
+                self.visited.add(tuple(seed))
+                self.frontier.append(tuple(seed))
+
+    def levels(self):
+        for depth in range(1, self.depth + 1):
+            if not self.frontier:
+                return
+            frontier, self.frontier = self.frontier, []
+            yield depth, self.kinds[depth - 1], frontier
+
+    def remaining(self, items):
+        if self.max_fanout is None:
+            return None
+        return max(self.max_fanout - len(items), 0)
+
+    def found(self, items):
+        new = []
+        for item in items:
+            node = (item['path']['collection'], item['path']['key'])
+            if node not in self.visited:
+                self.visited.add(node)
+                self.frontier.append(node)
+                new.append(item)
+        return new
 
 
 class Async(Client):
@@ -0,0 +1,180 @@
+"""
+JSON encoding and decoding for request and response bodies.
+
+Uses the standard library's `json` by default. To use a faster library,
+call `use` with one of the names in `PREFERENCE`, with no arguments for
+the fastest installed, or with any object that has `dumps` and `loads`
+functions:
+
+    porc.codec.use('orjson')
+"""
+import codecs
+import importlib
+import json
+import re
+
+PREFERENCE = ['orjson', 'ujson', 'simplejson', 'json']
+
+name = None
+_dumps = None
+_loads = None
+# decode bodies that may hold integers over 64 bits with `json`, since
+# orjson decodes them as floats and ujson refuses them
+_guarded = False
+_LONG_DIGITS = {True: re.compile(br'\d{19}'), False: re.compile(r'\d{19}')}
+
+
+def use(codec=None):
+    """
+    Sets the codec used by every client. `codec` is a module name from
+    `PREFERENCE`, or an object with `dumps` and `loads`. If `None`, uses
+    the first installed module in `PREFERENCE`.
+    """
+    global name, _dumps, _loads, _guarded
+    if codec is None:
+        for candidate in PREFERENCE:
+            try:
+                return use(candidate)
+            except ImportError:
+                continue
+    if isinstance(codec, str):
+        codec = importlib.import_module(codec)
+    name = getattr(codec, '__name__', type(codec).__name__)
+    _dumps = codec.dumps
+    _loads = _json_loads if codec is json else codec.loads
+    _guarded = name in ('orjson', 'ujson')
+
+
+def _json_loads(data):
+    # json only takes bytes from python 3.6
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    return json.loads(data)
+
+
+def dumps(obj):
+    """
+    Encodes `obj` as JSON, always returning UTF-8 `bytes`. Values the
+    codec in use refuses but the standard library encodes, like keys that
+    aren't strings or integers over 64 bits, are encoded with `json`.
+    """
+    try:
+        data = _dumps(obj)
+    except (TypeError, OverflowError):
+        data = json.dumps(obj)
+    if not isinstance(data, bytes):
+        data = data.encode('utf-8')
+    return data
+
+
+def loads(data):
+    """
+    Decodes JSON from `bytes` or text. Bodies with a run of 19 or more
+    digits, which may be an integer the codec in use can't hold, are
+    decoded with `json`, so decoded values don't depend on the codec.
+    """
+    if _guarded and _LONG_DIGITS[isinstance(data, bytes)].search(data):
+        return _json_loads(data)
+    return _loads(data)
+
+
+_WHITESPACE = ' \t\n\r'
+_decoder = json.JSONDecoder()
+
+
+class _Reader(object):
+    """
+    Decodes JSON values one at a time from a stream of `bytes` chunks,
+    only holding the text not yet decoded.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.text = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.done = False
+
+    def _more(self):
+        if self.done:
+            raise ValueError("Unexpected end of JSON stream")
+        # drop what was already decoded before growing the buffer
+        self.buffer = self.buffer[self.pos:]
+        self.pos = 0
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.done = True
+            self.buffer += self.text.decode(b'', True)
+        else:
+            self.buffer += self.text.decode(chunk)
+
+    def peek(self):
+        # skips whitespace, returning the next character
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            self._more()
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError("Expected %r at %r" % (char, self.buffer[self.pos:self.pos + 20]))
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            size = len(self.buffer)
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                value, end = None, None
+            # a number at the end of the buffer may go on in the next
+            # chunk, so only trust values followed by something
+            if end is not None and (end < size or self.done):
+                self.pos = end
+                return value
+            # read until the buffer doubles, so large values that span
+            # many chunks aren't decoded over and over
+            target = 2 * (size - self.pos)
+            self._more()
+            while not self.done and len(self.buffer) - self.pos < target:
+                self._more()
+
+
+def iter_array(chunks, field):
+    """
+    Yields the elements of the array under `field` in a JSON object read
+    from `chunks` of UTF-8 `bytes`, each as soon as it has arrived, so only
+    about one element is held in memory at a time. Other fields are
+    skipped. Decodes with the standard library, whichever codec is in use.
+
+        for item in iter_array(response.iter_content(65536), 'results'):
+            ...
+    """
+    reader = _Reader(chunks)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        if key == field and reader.peek() == '[':
+            reader.expect('[')
+            if reader.peek() != ']':
+                while True:
+                    yield reader.value()
+                    if reader.peek() != ',':
+                        break
+                    reader.expect(',')
+            reader.expect(']')
+        else:
+            reader.value()
+        if reader.peek() != ',':
+            break
+        reader.expect(',')
+    reader.expect('}')
+
+
+use('json')
@@ -0,0 +1,131 @@
+"""
+Decodes search results and aggregates into columns: one `array.array`
+per field, or NumPy array when NumPy is installed, rather than a dict
+per item.
+
+    pages = client.search('cars', porc.Search().query('*').aggregate('stats', 'price'))
+    cols = pages.columns(['price', 'year'])
+    cols['price'].mean()  # with NumPy
+
+Missing and non-numeric values are decoded as NaN, so every column of
+a decode has one entry per item, in order.
+"""
+from array import array
+from .patch import segments
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+NAN = float('nan')
+
+try:
+    array('q')
+    COUNT = 'q'
+except ValueError:
+    # python 2
+    COUNT = 'l'
+
+
+def _numpy(use_numpy):
+    if use_numpy is None:
+        return numpy is not None
+    if use_numpy and numpy is None:
+        raise ImportError("NumPy columns require numpy: pip install numpy")
+    return bool(use_numpy)
+
+
+def _convert(column, use_numpy):
+    # NumPy arrays share the column's buffer rather than copying it
+    if not use_numpy:
+        return column
+    if not len(column):
+        return numpy.array([], dtype=column.typecode)
+    return numpy.frombuffer(column, dtype=column.typecode)
+
+
+def _number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return NAN
+
+
+def _parts(field):
+    parts = segments(field)
+    if parts[0] == 'value' and len(parts) > 1:
+        parts = parts[1:]
+    return parts
+
+
+def _value(item, parts):
+    value = item.get('value')
+    for part in parts:
+        if not isinstance(value, dict) or part not in value:
+            return NAN
+        value = value[part]
+    return _number(value)
+
+
+def from_items(items, fields, use_numpy=None):
+    """
+    Decodes the numeric `fields` of search or listing results into a
+    dict of columns, keyed by field. Fields are paths into each item's
+    `value`, with or without the `value.` prefix.
+
+    `items` is consumed one at a time, so it can be a streamed
+    `Pages.items` iterator. With `use_numpy=None`, NumPy arrays are
+    returned if NumPy is installed; `True` requires it, and `False`
+    always returns `array.array('d')` columns.
+    """
+    use_numpy = _numpy(use_numpy)
+    paths = [(field, _parts(field)) for field in fields]
+    columns = dict((field, array('d')) for field in fields)
+    appends = [(columns[field].append, parts) for field, parts in paths]
+    for item in items:
+        for append, parts in appends:
+            append(_value(item, parts))
+    return dict((field, _convert(column, use_numpy))
+                for field, column in columns.items())
+
+
+def from_aggregates(aggregates, use_numpy=None):
+    """
+    Decodes the `aggregates` of a search response into a dict keyed by
+    `field_name:aggregate_kind`, ex: `value.price:range`:
+
+    * `stats` gives a dict of its statistics, and `count`
+    * `range` and `distance` give `min`, `max` and `count` columns, one
+      entry per bucket, with NaN for open bounds
+    * `time_series` gives a list of `bucket` labels and a `count` column
+
+    Other kinds are passed through as returned. `use_numpy` is as for
+    `from_items`.
+    """
+    use_numpy = _numpy(use_numpy)
+    decoded = {}
+    for aggregate in aggregates or []:
+        kind = aggregate.get('aggregate_kind')
+        name = '%s:%s' % (aggregate.get('field_name'), kind)
+        buckets = aggregate.get('buckets') or []
+        if kind == 'stats':
+            stats = dict(aggregate.get('statistics') or {})
+            stats['count'] = aggregate.get('value_count')
+            decoded[name] = stats
+        elif kind in ('range', 'distance'):
+            columns = dict(min=array('d'), max=array('d'), count=array(COUNT))
+            for bucket in buckets:
+                columns['min'].append(_number(bucket.get('min')))
+                columns['max'].append(_number(bucket.get('max')))
+                columns['count'].append(bucket.get('count', 0))
+            decoded[name] = dict((key, _convert(column, use_numpy))
+                                 for key, column in columns.items())
+        elif kind == 'time_series':
+            counts = array(COUNT, [bucket.get('count', 0) for bucket in buckets])
+            decoded[name] = {
+                'bucket': [bucket.get('bucket') for bucket in buckets],
+                'count': _convert(counts, use_numpy)
+            }
+        else:
+            decoded[name] = aggregate
+    return decoded
@@ -0,0 +1,315 @@
+"""
+Writing events at a high rate, and reading them back in parallel:
+
+    with EventWriter(client) as writer:
+        for reading in readings:
+            writer.add('sensors', reading.sensor, 'reading', reading.value)
+
+Events are buffered and written in the background with `POST`, under a
+timestamp generated locally, and sent again when a request fails, so
+an event whose response was lost may be written twice.
+
+    for event in scan_events(client, 'sensors', 'a_sensor', 'reading', start, end):
+        ...
+
+Splits a range of events into windows of time, and lists them at once.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from . import util
+from .ratelimit import BACKGROUND
+from .retry import Retry, backoff, retry_after
+
+
+class EventWriter(object):
+    """
+    Buffers events per collection, key and type, and writes them once
+    `max_events` are buffered, or every `interval` seconds, running up to
+    `concurrency` requests at once.
+
+    Delivery is at least once: an event that failed to connect, or was
+    answered with one of `Retry.STATUSES`, is tried up to `attempts`
+    times per flush, waiting between rounds as `Retry` does, including
+    for a `Retry-After` header, and stays buffered for the next flush
+    after that. A `Retry-After` of more than `max_retry_after` seconds
+    ends the flush. An event refused with any
+    other status is dropped, and counted as `rejected`. Closing the
+    writer, or leaving its `with` block, flushes what is left and raises
+    the last error if any event could still not be written.
+
+    Sending an event again may write it twice, if the first request was
+    written but its response lost, since Orchestrate picks the ordinal of
+    each event. Timestamps default to the time an event was added, never
+    going back if the clock does.
+    """
+
+    def __init__(self, client, max_events=500, interval=1.0, concurrency=10,
+                 attempts=5, backoff=0.1, max_backoff=10.0, max_retry_after=60.0):
+        self.client = client
+        self.max_events = max_events
+        self.interval = interval
+        self.concurrency = concurrency
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.error = None
+        self._buffers = {}
+        self._buffered = 0
+        self._counts = dict(added=0, written=0, retries=0, rejected=0, flushes=0)
+        self._timestamp = 0
+        self._lock = threading.Lock()
+        self._flushing = threading.Lock()
+        self._closed = threading.Event()
+        self._timer = None
+
+    def _next(self, timestamp):
+        # called with the lock held
+        if timestamp is None:
+            timestamp = self._timestamp = max(util.datetime_to_timestamp(), self._timestamp)
+        elif isinstance(timestamp, datetime):
+            timestamp = util.datetime_to_timestamp(timestamp)
+        return timestamp
+
+    def add(self, collection, key, event_type, data, timestamp=None):
+        """
+        Buffers an event, returning its timestamp. `timestamp`
+        may be a `datetime` or milliseconds since the epoch. Flushes in the
+        calling thread when the buffer is full, so callers adding events
+        faster than they can be written are slowed down to match.
+        """
+        if self._closed.is_set():
+            raise ValueError("EventWriter is closed")
+        with self._lock:
+            timestamp = self._next(timestamp)
+            group = (collection, key, event_type)
+            buffer = self._buffers.get(group)
+            if buffer is None:
+                buffer = self._buffers[group] = deque()
+            buffer.append((timestamp, data))
+            self._buffered += 1
+            self._counts['added'] += 1
+            full = self._buffered >= self.max_events
+            if self._timer is None and self.interval:
+                self._timer = threading.Thread(target=self._tick)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+        return timestamp
+
+    def _tick(self):
+        while not self._closed.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                # the events stay buffered; `error` holds what went wrong
+                pass
+
+    def _drain(self):
+        with self._lock:
+            events = [group + event for group, buffer in self._buffers.items()
+                      for event in buffer]
+            self._buffers = {}
+            self._buffered = 0
+        return events
+
+    def _post(self, event):
+        collection, key, event_type, timestamp, data = event
+        with self.client.prioritized(BACKGROUND):
+            result = self.client.post_event(collection, key, event_type, data, timestamp)
+        if isinstance(result, Future):
+            result = result.result()
+        return result
+
+    def flush(self):
+        """
+        Writes every buffered event, returning how many were written.
+        Raises the last error if some could not be, after putting them
+        back in the buffer.
+        """
+        with self._flushing:
+            pending = self._drain()
+            if not pending:
+                return 0
+            written = 0
+            attempt = 0
+            while True:
+                attempt += 1
+                failed = []
+                wait = backoff(attempt, self.backoff, self.max_backoff)
+                for event, result in util.bounded(self._post, pending, self.concurrency):
+                    if isinstance(result, Exception):
+                        self.error = result
+                        failed.append(event)
+                    elif result.status_code in Retry.STATUSES:
+                        self.error = _status_error(result)
+                        failed.append(event)
+                        wait = max(wait, retry_after(result) or 0)
+                    elif result.status_code >= 400:
+                        self.error = _status_error(result)
+                        self._count('rejected')
+                    else:
+                        written += 1
+                pending = failed
+                if not pending or attempt >= self.attempts or wait > self.max_retry_after:
+                    break
+                self._count('retries', len(pending))
+                time.sleep(wait)
+            self._count('written', written)
+            self._count('flushes')
+            if pending:
+                self._requeue(pending)
+                raise self.error
+            return written
+
+    def _requeue(self, events):
+        with self._lock:
+            for event in reversed(events):
+                group = event[:3]
+                buffer = self._buffers.get(group)
+                if buffer is None:
+                    buffer = self._buffers[group] = deque()
+                buffer.appendleft(event[3:])
+            self._buffered += len(events)
+
+    def _count(self, name, count=1):
+        with self._lock:
+            self._counts[name] += count
+
+    def close(self):
+        """
+        Stops the background flushes and writes what is left.
+        """
+        self._closed.set()
+        if self._timer is not None:
+            self._timer.join()
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        if type is None:
+            self.close()
+            return
+        try:
+            self.close()
+        except Exception:
+            # keep the error already leaving the block; what could not be
+            # written is still in the buffer, and counted in `stats`
+            pass
+
+    def stats(self):
+        """
+        Returns the events `added`, `written`, `rejected` and still
+        `buffered`, and the `retries` and `flushes` made.
+        """
+        with self._lock:
+            stats = dict(self._counts)
+            stats['buffered'] = self._buffered
+            return stats
+
+
+def _status_error(response):
+    try:
+        response.raise_for_status()
+    except Exception as e:
+        return e
+
+
+def _timestamp(value):
+    if value is None:
+        return util.datetime_to_timestamp()
+    if isinstance(value, datetime):
+        return util.datetime_to_timestamp(value)
+    return int(value)
+
+
+class _Windows(object):
+    """
+    Hands out the windows of a scan, `[start, before)` in milliseconds,
+    from the end the results are ordered from. With `adaptive`, sizes
+    each window to hold about `window_events` events, at the density
+    seen in the windows scanned so far.
+    """
+
+    def __init__(self, start, end, windows, ascending, adaptive, window_events):
+        self.low = start
+        self.high = end + 1
+        self.span = max(1, -(-(self.high - self.low) // windows))
+        self.ascending = ascending
+        self.adaptive = adaptive
+        self.window_events = window_events
+        self.scanned = 0
+        self.events = 0
+        self._lock = threading.Lock()
+
+    def next(self):
+        with self._lock:
+            if self.low >= self.high:
+                return None
+            span = self.span
+            if self.adaptive and self.scanned:
+                if self.events:
+                    span = int(self.window_events * self.scanned / float(self.events))
+                else:
+                    # nothing seen yet; cover more ground
+                    span = self.scanned * 2
+                span = max(1, span)
+            if self.ascending:
+                window = (self.low, min(self.low + span, self.high))
+                self.low = window[1]
+            else:
+                window = (max(self.high - span, self.low), self.high)
+                self.high = window[0]
+            return window
+
+    def observed(self, window, count):
+        with self._lock:
+            self.scanned += window[1] - window[0]
+            self.events += count
+
+
+def scan_events(client, collection, key, event_type, start, end=None, windows=8,
+                concurrency=8, limit=100, ascending=False, adaptive=False,
+                window_events=1000):
+    """
+    Lists the events from `start` to `end`, both inclusive, by splitting
+    that time into `windows` and listing up to `concurrency` of them at
+    once. See `Client.scan_events`.
+    """
+    scan = _Windows(_timestamp(start), _timestamp(end), windows, ascending,
+                    adaptive, window_events)
+
+    def fetch(window):
+        pages = client.list_events(collection, key, event_type, limit=limit,
+                                   startEvent=window[0], beforeEvent=window[1])
+        events = list(pages.items())
+        scan.observed(window, len(events))
+        if ascending:
+            events.reverse()
+        return events
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = deque()
+
+        def submit():
+            window = scan.next()
+            if window is not None:
+                pending.append(executor.submit(fetch, window))
+
+        for _ in range(concurrency):
+            submit()
+        try:
+            while pending:
+                events = pending.popleft().result()
+                submit()
+                for event in events:
+                    yield event
+        finally:
+            for future in pending:
+                future.cancel()
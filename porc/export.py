@@ -0,0 +1,315 @@
+"""
+Exports a collection to newline-delimited JSON, and imports it back:
+
+    python -m porc.export a_collection a_collection.ndjson.gz --events log
+    python -m porc.import a_collection a_collection.ndjson.gz
+
+Each line holds one record, either an item with its ref, or an event with
+its timestamp and ordinal:
+
+    {"kind": "item", "key": "a_key", "ref": "...", "value": {...}}
+    {"kind": "event", "key": "a_key", "type": "log", "timestamp": ..., "ordinal": ..., "value": {...}}
+
+Files ending in `.gz` are compressed. Both commands keep a checkpoint
+next to their file, so a run that was interrupted picks up where it left
+off when started again with the same arguments.
+"""
+import argparse
+import gzip
+import os
+import sys
+import time
+from itertools import islice
+import requests
+from . import codec, util
+from .client import Client
+from .retry import Retry
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+def _load(checkpoint):
+    if not os.path.exists(checkpoint):
+        return None
+    with open(checkpoint, 'rb') as f:
+        return codec.loads(f.read())
+
+
+def _save(checkpoint, state):
+    # write then rename, so a crash never leaves half a checkpoint
+    temporary = checkpoint + '.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(codec.dumps(state))
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    os.rename(temporary, checkpoint)
+
+
+def _clear(checkpoint):
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+
+class Progress(object):
+    """
+    Counts the items processed, writing the rate to `out` at most every
+    `interval` seconds.
+    """
+
+    def __init__(self, label, out=sys.stderr, interval=5):
+        self.label = label
+        self.out = out
+        self.interval = interval
+        self.count = 0
+        self.started = time.time()
+        self._reported = self.started
+
+    def add(self, count=1):
+        self.count += count
+        now = time.time()
+        if self.out is not None and now - self._reported >= self.interval:
+            self._reported = now
+            self.report()
+
+    def rate(self):
+        return self.count / max(time.time() - self.started, 1e-9)
+
+    def report(self):
+        if self.out is not None:
+            self.out.write('%s: %d items, %.1f items/sec\n' % (
+                self.label, self.count, self.rate()))
+            self.out.flush()
+
+    def stats(self):
+        return dict(items=self.count, seconds=time.time() - self.started,
+                    rate=self.rate())
+
+
+def _record(kind, key, value, **fields):
+    fields.update(kind=kind, key=key, value=value)
+    return codec.dumps(fields) + b'\n'
+
+
+def _events(client, collection, limit):
+    def fetch(pair):
+        key, event_type = pair
+        return list(client.list_events(collection, key, event_type, limit=limit).items())
+    return fetch
+
+
+def export_collection(client, collection, path, events=(), limit=100,
+                      checkpoint=None, checkpoint_every=1000, progress=None,
+                      concurrency=10):
+    """
+    Writes every item of `collection`, and its events of the types in
+    `events`, to `path`. Returns the number of items, the seconds taken
+    and the items per second.
+
+    The events of each page of items are listed with up to `concurrency`
+    requests at once, and written after their item, in order.
+
+    Every `checkpoint_every` items, the position in the listing and the
+    size of the file so far are saved to `checkpoint` (by default, `path`
+    plus `.checkpoint`). If that file exists, the export truncates `path`
+    to the saved size and resumes from the saved position.
+    """
+    checkpoint = checkpoint or path + '.checkpoint'
+    progress = progress or Progress('export %s' % collection)
+    state = _load(checkpoint)
+    if state is None:
+        state = dict(cursor=None, count=0, size=0)
+    with open(path, 'ab') as f:
+        # drop whatever was written after the last checkpoint
+        f.truncate(state['size'])
+    progress.count = state['count']
+
+    items = client.list(collection, limit=limit).prefetch().items(cursor=state['cursor'])
+    out = _open(path, 'ab')
+    fetch = _events(client, collection, limit)
+    try:
+        while True:
+            # a page of items, each with the cursor pointing at it
+            batch = [(item, items.cursor) for item in islice(items, limit)]
+            if not batch:
+                break
+            found = dict()
+            pairs = [(item['path']['key'], event_type)
+                     for item, _ in batch for event_type in events]
+            for pair, result in util.bounded(fetch, pairs, concurrency):
+                if isinstance(result, Exception):
+                    raise result
+                found[pair] = result
+            for item, (url, index) in batch:
+                key = item['path']['key']
+                out.write(_record('item', key, item['value'], ref=item['path']['ref']))
+                for event_type in events:
+                    for event in found.pop((key, event_type)):
+                        out.write(_record(
+                            'event', key, event['value'], type=event_type,
+                            timestamp=event['timestamp'], ordinal=event['ordinal']))
+                progress.add()
+                if progress.count % checkpoint_every == 0:
+                    # closing ends the gzip stream, so the file can be cut here
+                    out.close()
+                    _save(checkpoint, dict(cursor=[url, index + 1], count=progress.count,
+                                           size=os.path.getsize(path)))
+                    out = _open(path, 'ab')
+    finally:
+        out.close()
+    _clear(checkpoint)
+    progress.report()
+    return progress.stats()
+
+
+def _retrying(client, request):
+    """
+    Sends a write with `request()`, retrying it under the client's `retry`
+    policy. The policy only retries writes conditioned on a ref, but an
+    import retries every write: putting a whole value again leaves the
+    same result, and an event posted again is at worst written twice.
+    """
+    retry = client.retry
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            response = request()
+        except (requests.ConnectionError, requests.Timeout):
+            delay = retry.delay(attempt) if retry is not None else None
+            if delay is None:
+                raise
+        else:
+            delay = retry.delay(attempt, response) if retry is not None else None
+            if delay is None:
+                return response
+            response.close()
+        time.sleep(delay)
+
+
+def _write(client, collection):
+    def write(line):
+        number, data = line
+        if not data.strip():
+            return None
+        record = codec.loads(data)
+        kind = record['kind']
+        if kind == 'item':
+            request = lambda: client.put(collection, record['key'], record['value'])
+        elif kind == 'event':
+            # orchestrate picks the ordinal of a new event
+            request = lambda: client.post_event(
+                collection, record['key'], record['type'], record['value'],
+                record['timestamp'])
+        else:
+            raise ValueError("Unknown record kind %r on line %d" % (kind, number + 1))
+        response = _retrying(client, request)
+        response.raise_for_status()
+        return response
+    return write
+
+
+def import_collection(client, collection, path, concurrency=10, checkpoint=None,
+                      checkpoint_every=1000, progress=None, errors=sys.stderr):
+    """
+    Writes the records in `path` to `collection`, running up to
+    `concurrency` requests at once. Returns the number of records written
+    as `items`, the seconds taken, the items per second, and the number
+    of records that `failed`; each failure is also reported to `errors`.
+
+    Every `checkpoint_every` records, saves to `checkpoint` (by default,
+    `path` plus `.checkpoint`) the line before which every record has
+    been written; if that file exists, the import resumes from there.
+    Records past it may be written twice, which leaves the same item but
+    may duplicate an event.
+    """
+    checkpoint = checkpoint or path + '.checkpoint'
+    progress = progress or Progress('import %s' % collection)
+    state = _load(checkpoint) or dict(line=0)
+    # the first line not yet written, and the lines written after it
+    line = state['line']
+    written = set()
+    failed = 0
+
+    with _open(path, 'rb') as f:
+        lines = islice(enumerate(f), line, None)
+        results = util.bounded(_write(client, collection), lines, concurrency)
+        try:
+            for (number, _), result in results:
+                if isinstance(result, Exception):
+                    failed += 1
+                    if errors is not None:
+                        errors.write('line %d: %s\n' % (number + 1, result))
+                    continue
+                written.add(number)
+                while line in written:
+                    written.remove(line)
+                    line += 1
+                if result is not None:
+                    progress.add()
+                    if progress.count % checkpoint_every == 0:
+                        _save(checkpoint, dict(line=line))
+        except BaseException:
+            _save(checkpoint, dict(line=line))
+            raise
+
+    if failed:
+        # retry from the first failure next time
+        _save(checkpoint, dict(line=line))
+    else:
+        _clear(checkpoint)
+    progress.report()
+    stats = progress.stats()
+    stats['failed'] = failed
+    return stats
+
+
+def _parser(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('collection')
+    parser.add_argument('path', help="newline-delimited JSON file, compressed if it ends in .gz")
+    parser.add_argument('--api-key', default=os.environ.get('ORCHESTRATE_API_KEY'),
+                        help="defaults to $ORCHESTRATE_API_KEY")
+    parser.add_argument('--url', default=None, help="the Orchestrate API's url")
+    parser.add_argument('--checkpoint', default=None,
+                        help="checkpoint file (default: PATH.checkpoint)")
+    parser.add_argument('--checkpoint-every', type=int, default=1000)
+    parser.add_argument('--retries', type=int, default=3,
+                        help="attempts per request (default: 3)")
+    parser.add_argument('--concurrency', type=int, default=10,
+                        help="requests to run at once")
+    return parser
+
+
+def _client(args, concurrency=10):
+    if not args.api_key:
+        sys.exit("No API key: pass --api-key or set ORCHESTRATE_API_KEY")
+    return Client(args.api_key, args.url, pool_maxsize=concurrency,
+                  retry=Retry(attempts=args.retries))
+
+
+def main(argv=None):
+    parser = _parser("Exports a collection to newline-delimited JSON.")
+    parser.add_argument('--events', action='append', default=[], metavar='TYPE',
+                        help="also export events of this type; may be repeated")
+    parser.add_argument('--limit', type=int, default=100, help="items per page")
+    args = parser.parse_args(argv)
+    export_collection(_client(args, args.concurrency), args.collection, args.path,
+                      args.events, args.limit, args.checkpoint, args.checkpoint_every,
+                      concurrency=args.concurrency)
+
+
+def import_main(argv=None):
+    parser = _parser("Imports a collection from newline-delimited JSON.")
+    args = parser.parse_args(argv)
+    stats = import_collection(_client(args, args.concurrency), args.collection,
+                              args.path, args.concurrency, args.checkpoint,
+                              args.checkpoint_every)
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,12 @@
+"""
+Imports a collection exported with `python -m porc.export`:
+
+    python -m porc.import a_collection a_collection.ndjson.gz
+
+See `porc.export` for the file format and options.
+"""
+import sys
+from .export import import_main
+
+if __name__ == '__main__':
+    sys.exit(import_main())
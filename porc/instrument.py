@@ -0,0 +1,192 @@
+"""
+Observing the requests a client makes:
+
+    histograms = porc.instrument.Histograms()
+    client = Client(API_KEY, observers=[histograms])
+    ...
+    print(histograms.stats())
+
+Observers receive a `Sample` for every HTTP request, retries included,
+once its response has been read, and again when its body is decoded.
+"""
+import math
+import threading
+import time
+
+try:
+    clock = time.perf_counter
+except AttributeError:
+    # python 2
+    clock = time.time
+
+
+class Sample(object):
+    """
+    What happened to one HTTP request:
+
+    * `method`, `url`, and `route`, the url's template, like
+      `/v0/{collection}/{key}/refs/{ref}`
+    * `status`, or `None` if the request raised `error`
+    * `attempt`, counting from 1, when the client retries
+    * `sent` and `received`, the bytes of the request and response bodies
+      before compression and after decompression; `received` is `None` for
+      responses streamed to the caller
+    * `wait`, the seconds spent before sending: queued for a worker
+      thread, for asynchronous requests, and waiting on a rate limiter
+    * `ttfb`, the seconds from sending until the response headers
+      arrived, which includes connecting and the server's time
+    * `elapsed`, the seconds from sending until the body was read
+    * `decode`, the seconds spent decoding the body as JSON, or `None`
+      until it is decoded
+    """
+
+    __slots__ = ['method', 'url', 'route', 'status', 'error', 'attempt', 'sent',
+                 'received', 'wait', 'ttfb', 'elapsed', 'decode', '_observers']
+
+    def __init__(self, observers, method, url, route, status=None, error=None,
+                 attempt=1, sent=0, received=None, wait=0.0, ttfb=None, elapsed=0.0):
+        self._observers = observers
+        self.method = method
+        self.url = url
+        self.route = route
+        self.status = status
+        self.error = error
+        self.attempt = attempt
+        self.sent = sent
+        self.received = received
+        self.wait = wait
+        self.ttfb = ttfb
+        self.elapsed = elapsed
+        self.decode = None
+
+    def completed(self):
+        for observer in self._observers:
+            observer.request(self)
+
+    def decoded(self, seconds):
+        self.decode = seconds
+        for observer in self._observers:
+            observer.decoded(self)
+
+
+class Observer(object):
+    """
+    Receives the samples of a client's requests. Subclasses override
+    either method; both may be called from several threads at once.
+    """
+
+    def request(self, sample):
+        """
+        Called when a request completed, or raised.
+        """
+
+    def decoded(self, sample):
+        """
+        Called when a response body was decoded, with `sample.decode` set.
+        """
+
+
+class Histogram(object):
+    """
+    Counts values in buckets that grow by `growth` times from `smallest`
+    up, estimating percentiles within that factor in constant memory.
+    """
+
+    def __init__(self, growth=1.05, smallest=1e-6):
+        self.growth = growth
+        self.smallest = smallest
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        index = 0
+        if value > self.smallest:
+            index = int(math.log(value / self.smallest) / math.log(self.growth)) + 1
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percent):
+        """
+        Returns an upper bound for the given percentile of the values,
+        or `None` if there are none.
+        """
+        if not self.count:
+            return None
+        rank = max(1, int(math.ceil(self.count * percent / 100.0)))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.smallest * self.growth ** index, self.max)
+        return self.max
+
+    def summary(self, percentiles=(50, 90, 99)):
+        summary = dict(('p%g' % p, self.percentile(p)) for p in percentiles)
+        summary.update(count=self.count, max=self.max,
+                       mean=self.total / self.count if self.count else None)
+        return summary
+
+
+class Histograms(Observer):
+    """
+    Aggregates samples in memory, per method and route: the count of
+    each status, errors, bytes sent and received, and histograms of
+    `elapsed`, `ttfb`, `wait` and `decode` times.
+    """
+
+    TIMINGS = ['elapsed', 'ttfb', 'wait', 'decode']
+
+    def __init__(self, growth=1.05):
+        self.growth = growth
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, sample):
+        name = '%s %s' % (sample.method, sample.route)
+        entry = self._routes.get(name)
+        if entry is None:
+            entry = self._routes[name] = dict(
+                statuses={}, errors=0, sent=0, received=0,
+                **dict((timing, Histogram(self.growth)) for timing in self.TIMINGS))
+        return entry
+
+    def request(self, sample):
+        with self._lock:
+            entry = self._entry(sample)
+            if sample.error is not None:
+                entry['errors'] += 1
+            else:
+                entry['statuses'][sample.status] = entry['statuses'].get(sample.status, 0) + 1
+            entry['sent'] += sample.sent
+            entry['received'] += sample.received or 0
+            for timing in ['elapsed', 'ttfb', 'wait']:
+                value = getattr(sample, timing)
+                if value is not None:
+                    entry[timing].add(value)
+
+    def decoded(self, sample):
+        with self._lock:
+            self._entry(sample)['decode'].add(sample.decode)
+
+    def stats(self, percentiles=(50, 90, 99)):
+        """
+        Returns a dict from `'METHOD route'` to that route's counters and,
+        for each timing, its count, mean, max and percentiles in seconds.
+        """
+        with self._lock:
+            stats = {}
+            for name, entry in self._routes.items():
+                stats[name] = dict(
+                    statuses=dict(entry['statuses']), errors=entry['errors'],
+                    sent=entry['sent'], received=entry['received'],
+                    **dict((timing, entry[timing].summary(percentiles))
+                           for timing in self.TIMINGS))
+            return stats
+
+    def reset(self):
+        with self._lock:
+            self._routes = {}
@@ -1,16 +1,69 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from . import codec, columns
+from .ratelimit import BACKGROUND
 from .resource import Resource
-from collections import Iterator
+from .response import restored, stored
+try:
+    from collections.abc import Iterator
+except ImportError:
+    # python 2
+    from collections import Iterator
+try:
+    from urllib.parse import parse_qsl, unquote, urlparse
+except ImportError:
+    # python 2
+    from urllib import unquote
+    from urlparse import parse_qsl, urlparse
+
+
+def search_key(uri, params):
+    """
+    Returns the key a page of search results is cached under: the
+    collection, then the search's parameters, from both the query string
+    of `uri` and `params`, in order. Returns `None` if it isn't a search.
+    """
+    url = urlparse(uri)
+    query = dict(parse_qsl(url.query))
+    query.update((name, str(value)) for name, value in params.items())
+    if 'query' not in query:
+        return None
+    query['query'] = query['query'].strip()
+    if query.get('offset') == '0':
+        del query['offset']
+    return (unquote(url.path.split('/')[2]),) + tuple(sorted(query.items()))
+
 
 class Pages(Iterator):
-    def __init__(self, opts, url, path, params):
+    # bytes read at a time from a streamed page
+    chunk_size = 64 * 1024
+
+    def __init__(self, opts, url, path, params, resource=None):
         self.initialPath = path
         self.initialParams = params
         self.nextPath = path
         self.prevPath = None
-        self.resource = Resource(url, **opts)
+        # share the client's connection pool when given one
+        self.resource = resource if resource is not None else Resource(url, **opts)
         self.params = params
+        self.depth = 0
+        self._ahead = None
+        self.cursor = None
+        # listings are usually bulk reads; let single requests go first
+        self.priority = BACKGROUND
+        # a `Cache` for the pages of a search, set by `Client.search`
+        self.cache = None
+
+    def _follow(self, response):
+        # Extract the next/prev links
+        self.nextPath = response.links.get('next', {}).get('url')
+        self.prevPath = response.links.get('prev', {}).get('url')
 
-    def _move(self, path, querydict = {}, **headers):
+        # Remove the original params (next, prev now has what we need)
+        self.params = {}
+
+    def _move(self, path, querydict = {}, stream=False, **headers):
         if path is None:
             raise StopIteration
 
@@ -19,17 +72,152 @@ class Pages(Iterator):
         params.update(querydict)
 
         # Get the page
-        response = self.resource._request('GET', path, params, **headers)
+        response = self._get(path, params, headers, stream)
+        self._follow(response)
 
-        # Extract the next/prev links
-        self.nextPath = response.links.get('next', {}).get('url')
-        self.prevPath = response.links.get('prev', {}).get('url')
+        return response
 
-        # Remove the original params (next, prev now has what we need)
-        self.params = {}
+    def _stop(self):
+        # Discard any pages fetched ahead of the caller
+        if self._ahead is not None:
+            self._ahead.close()
+            self._ahead = None
 
+    def _get(self, path, params, headers={}, stream=False):
+        # pages are always fetched synchronously, even for an async client
+        uri, opts = self.resource._prepare('GET', path, params, dict(headers))
+        if stream:
+            opts['stream'] = True
+        key = None
+        if self.cache is not None and not stream and not headers:
+            key = search_key(uri, opts.get('params') or {})
+            cached = self.cache.get(key) if key is not None else None
+            if cached is not None:
+                self.cache.record(hit=True)
+                return restored(cached)
+        response = self.resource._send('GET', uri, opts, False, self.priority)
+        if key is not None:
+            self.cache.record(hit=False)
+            if response.status_code == 200:
+                self.cache.set(key, stored(response))
         return response
 
+    def _stream(self, response):
+        """
+        Yields the results of a page fetched with `stream=True` as they
+        are downloaded, decoding one at a time.
+        """
+        read = [0]
+
+        def chunks():
+            for chunk in response.iter_content(self.chunk_size):
+                read[0] += len(chunk)
+                yield chunk
+
+        try:
+            for item in codec.iter_array(chunks(), 'results'):
+                yield item
+        finally:
+            response.close()
+            self.resource._count_bytes('received', read[0], response.raw.tell())
+
+    def _fetch(self, path, params):
+        # Copies, since requests may run on several threads at once
+        if isinstance(path, list):
+            path = list(path)
+        return self._get(path, dict(params))
+
+    def _after(self, future):
+        response = future.result()
+        if response is None:
+            return None
+        path = response.links.get('next', {}).get('url')
+        return None if path is None else self._fetch(path, {})
+
+    def _chain(self, path, params):
+        """
+        Follows `next` links on a background thread, fetching up to
+        `depth` pages ahead of the one being consumed.
+        """
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # a single worker runs these in order, so each `_after` only
+            # starts once the page it follows has arrived
+            pending = deque([executor.submit(self._fetch, path, params)])
+            try:
+                while True:
+                    while len(pending) <= self.depth:
+                        pending.append(executor.submit(self._after, pending[-1]))
+                    response = pending.popleft().result()
+                    if response is None:
+                        return
+                    yield response
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def _fan_out(self, path, params):
+        """
+        Search pages can be addressed by offset, so once the first page
+        reports `total_count`, fetches up to `depth` of them in parallel.
+        """
+        first = self._fetch(path, params)
+        yield first
+        total = first['total_count']
+        if not first.ok or total is None:
+            return
+
+        limit = int(params.get('limit', 10))
+        offsets = iter(range(int(params.get('offset', 0)) + limit, total, limit))
+        fetch = lambda offset: self._fetch(path, dict(params, offset=offset))
+        with ThreadPoolExecutor(max_workers=self.depth) as executor:
+            pending = deque(executor.submit(fetch, offset)
+                            for offset in islice(offsets, self.depth))
+            try:
+                while pending:
+                    response = pending.popleft().result()
+                    pending.extend(executor.submit(fetch, offset)
+                                   for offset in islice(offsets, 1))
+                    yield response
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def _next_prefetched(self):
+        if self._ahead is None:
+            if self.nextPath is None:
+                raise StopIteration
+            if 'query' in self.params:
+                self._ahead = self._fan_out(self.nextPath, self.params)
+            else:
+                self._ahead = self._chain(self.nextPath, self.params)
+        try:
+            response = next(self._ahead)
+        except StopIteration:
+            self._ahead = None
+            self.nextPath = None
+            raise
+        except Exception:
+            # pick up again after the last page handed out
+            self._ahead = None
+            raise
+        self._follow(response)
+        return response
+
+    def prefetch(self, depth=2):
+        """
+        Fetches pages in the background while the caller is still
+        consuming earlier ones, keeping up to `depth` requests ahead.
+
+            items = client.list('a_collection').prefetch(4).all()
+
+        Collection and event listings follow `next` links, so they
+        overlap fetching with the caller's work. Searches fetch pages
+        by offset, `depth` at a time in parallel.
+        """
+        self._stop()
+        self.depth = depth
+        return self
+
     def reset(self):
         """
         Clear the page's current place.
@@ -40,6 +228,7 @@ class Pages(Iterator):
             page_x = page.next().result()
             assert page_x.url == page_1.url
         """
+        self._stop()
         self.nextPath = self.initialPath
         self.prevPath = None
         self.params = self.initialParams
@@ -49,6 +238,9 @@ class Pages(Iterator):
         Gets the next page of results.
         Raises `StopIteration` when there are no more results.
         """
+        if self.depth and not querydict and not headers:
+            return self._next_prefetched()
+        self._stop()
         return self._move(self.nextPath, querydict, **headers)
 
     def __next__(self):
@@ -62,11 +254,111 @@ class Pages(Iterator):
         Note: Only collection searches provide a `prev` value.
         For all others, `prev` will always return `StopIteration`.
         """
+        self._stop()
         return self._move(self.prevPath, querydict, **headers)
 
+    def _items(self, max_items, cursor, stream):
+        skip = 0
+        if cursor is not None:
+            if isinstance(cursor, (list, tuple)):
+                cursor, skip = cursor
+            self._stop()
+            self.nextPath = cursor
+            self.prevPath = None
+            self.params = {}
+
+        count = 0
+        while max_items is None or count < max_items:
+            try:
+                if stream:
+                    # pages are read as they are consumed, never ahead
+                    self._stop()
+                    response = self._move(self.nextPath, stream=True)
+                else:
+                    response = self.next()
+            except StopIteration:
+                self.cursor = None
+                return
+            response.raise_for_status()
+            url = response.url
+            if stream:
+                results = self._stream(response)
+            else:
+                results = response['results'] or []
+            # only the results are kept, so the page can be collected
+            del response
+
+            for index, item in enumerate(results):
+                if index < skip:
+                    continue
+                if max_items is not None and count >= max_items:
+                    return
+                self.cursor = (url, index)
+                yield item
+                count += 1
+                self.cursor = (url, index + 1)
+            skip = 0
+            self.cursor = (self.nextPath, 0) if self.nextPath else None
+
+    def items(self, max_items=None, cursor=None, stream=False):
+        """
+        Iterates over the items of every page, one at a time, without
+        holding on to pages already consumed. Stops after `max_items`.
+
+        `Pages.cursor` (also available on the returned iterator) records
+        where to resume, and can be passed back as `cursor` to continue
+        from there, even from a new `Pages` object.
+
+        With `stream=True`, each page is decoded while it downloads, and
+        items are yielded as soon as they arrive, so only about one item
+        is held in memory at a time. Streamed pages are not prefetched.
+        """
+        return Items(self, max_items, cursor, stream)
+
+    def columns(self, fields, use_numpy=None, stream=True):
+        """
+        Decodes the numeric `fields` of every item into a dict of
+        columns, without keeping the items themselves:
+
+            cols = client.search('cars', 'make:ford').columns(['price', 'year'])
+
+        Pages are streamed by default, so only about one item is held in
+        memory at a time. See `porc.columns.from_items`.
+        """
+        return columns.from_items(self.items(stream=stream), fields, use_numpy)
+
+    def aggregates(self, use_numpy=None):
+        """
+        Fetches the first page of a search, and decodes the aggregates
+        it asked for into columns. See `porc.columns.from_aggregates`.
+        """
+        response = self._get(self.initialPath, dict(self.initialParams))
+        response.raise_for_status()
+        return columns.from_aggregates(response['aggregates'], use_numpy)
+
     def all(self):
         results = []
         for response in self:
             response.raise_for_status()
             results.extend(response['results'])
         return results
+
+
+class Items(Iterator):
+    """
+    An iterator over the items returned by `Pages.items`.
+    """
+
+    def __init__(self, pages, max_items=None, cursor=None, stream=False):
+        self.pages = pages
+        self._items = pages._items(max_items, cursor, stream)
+
+    @property
+    def cursor(self):
+        return self.pages.cursor
+
+    def next(self):
+        return next(self._items)
+
+    def __next__(self):
+        return self.next()
@@ -4,9 +4,89 @@ notation: `"name.first"`. If a path starts with a `'/'`, Orchestrate will be
 interpret it as a [JSON Pointer](http://tools.ietf.org/html/rfc6901), otherwise
 Orchestrate interprets the path as dot notation.
 '''
+try:
+    # python 2
+    string_types = basestring
+except NameError:
+    string_types = str
+
+
+def segments(path):
+    """
+    Splits a patch path, in either notation, into its segments. Raises
+    `ValueError` if the path is malformed.
+    """
+    if not isinstance(path, string_types) or not path:
+        raise ValueError("Patch paths must be non-empty strings: %r" % (path,))
+    if path.startswith('/'):
+        parts = path[1:].split('/')
+        for part in parts:
+            if '~' in part.replace('~0', '').replace('~1', ''):
+                raise ValueError("Invalid escape in JSON Pointer: %r" % path)
+        return tuple(part.replace('~1', '/').replace('~0', '~') for part in parts)
+    parts = path.split('.')
+    if '' in parts:
+        raise ValueError("Empty field name in path: %r" % path)
+    return tuple(parts)
+
+
+def pointer(parts):
+    """
+    Joins path segments into a JSON Pointer, escaping `~` and `/`.
+    """
+    return ''.join('/' + part.replace('~', '~0').replace('/', '~1') for part in parts)
+
+
+def lookup(value, path):
+    """
+    Returns the value at `path` within a JSON object, in either notation.
+    Raises `KeyError` if there is no such field.
+    """
+    for part in segments(path):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            raise KeyError(path)
+    return value
+
+
+def diff(old, new, patch=None, parts=()):
+    """
+    Returns a `Patch` that turns the JSON object `old` into `new`. Nested
+    objects are compared field by field; other values, arrays included,
+    are replaced whole.
+    """
+    patch = Patch() if patch is None else patch
+    for name in old:
+        if name not in new:
+            patch.remove(pointer(parts + (name,)))
+    for name, value in new.items():
+        if name not in old:
+            patch.add(pointer(parts + (name,)), value)
+        elif isinstance(value, dict) and isinstance(old[name], dict):
+            diff(old[name], value, patch, parts + (name,))
+        elif value != old[name] or type(value) != type(old[name]):
+            patch.add(pointer(parts + (name,)), value)
+    return patch
+
+
+def _within(path, other):
+    # whether `path` is `other` or one of its descendants
+    return path[:len(other)] == other
+
+
+def _number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
 class Patch:
-    def __init__(self):
+    def __init__(self, optimize=False):
         self.operations = []
+        self.optimize = optimize
+        # the segments of each operation's path, and `from` path
+        self._paths = []
 
     '''
     Depending on the specified path, creates a field with that value, replaces
@@ -73,5 +153,71 @@ class Patch:
         if from_path:
             op['from'] = from_path
 
-        self.operations.append(op)
+        if self.optimize:
+            self.__coalesce(op)
+        else:
+            self.operations.append(op)
         return self
+
+    '''
+    In optimizing mode, checks the paths of a new operation, then folds it
+    into the earlier operation on the same field it makes redundant,
+    keeping the patch's effect and the conditions under which it fails.
+    An earlier operation is only dropped when the one replacing it fails
+    whenever it would have:
+
+    * an `inc` adds to an earlier `inc`, `add` or `replace` of a number
+    * an `add` or `replace` overwrites an earlier `add` or `replace`
+    * a `remove` drops an earlier `replace`
+
+    An `inc` is kept before a later write, since only it fails if the
+    field is not a number, as is an `add` inside a field that is later
+    overwritten, since only it fails if its parent is missing. Operations
+    on array elements, and any operation separated from the new one by
+    another on the same field or its children, are kept as is.
+    '''
+    def __coalesce(self, op):
+        kind = op['op']
+        path = segments(op['path'])
+        source = segments(op['from']) if 'from' in op else None
+        if kind == 'move' and _within(path, source) and path != source:
+            raise ValueError("Cannot move %r into itself" % op['from'])
+        last = path[-1]
+        if kind in ('add', 'replace', 'inc', 'remove') and not (last.isdigit() or last == '-'):
+            index = len(self.operations)
+            while index > 0:
+                index -= 1
+                earlier = self.operations[index]
+                earlier_path, earlier_source = self._paths[index]
+                touched = [p for p in (earlier_path, earlier_source) if p is not None]
+                if not any(_within(p, path) or _within(path, p) for p in touched):
+                    continue
+                if earlier_source is None and earlier_path == path:
+                    if self.__combine(index, earlier, op):
+                        return
+                break
+        self.operations.append(op)
+        self._paths.append((path, source))
+
+    def __combine(self, index, earlier, op):
+        # returns whether `op` was folded into the patch
+        kind, earlier_kind = op['op'], earlier['op']
+        if kind == 'inc':
+            if earlier_kind == 'inc' or (earlier_kind in ('add', 'replace')
+                                         and _number(earlier.get('value'))):
+                earlier['value'] = earlier.get('value', 1) + op.get('value', 1)
+                return True
+            return False
+        if earlier_kind not in ('add', 'replace'):
+            # an `inc` also fails if the field isn't a number
+            return False
+        if kind == 'remove' and earlier_kind == 'add':
+            # the field may not have existed before the add
+            return False
+        del self.operations[index]
+        del self._paths[index]
+        if kind != 'remove':
+            # an `add` earlier guarantees the field exists; a `replace`
+            # requires it to
+            op['op'] = 'add' if earlier_kind == 'add' else 'replace'
+        return False
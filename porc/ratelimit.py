@@ -0,0 +1,104 @@
+import heapq
+import itertools
+import threading
+import time
+
+# priority classes; requests with lower numbers are admitted first
+INTERACTIVE = 0
+BACKGROUND = 10
+
+try:
+    clock = time.monotonic
+except AttributeError:
+    # python 2
+    clock = time.time
+
+
+class RateLimiter(object):
+    """
+    A token bucket admitting `rate` requests per second on average, and
+    up to `burst` at once after a quiet period. One limiter can be shared
+    by any number of clients and threads:
+
+        limiter = RateLimiter(rate=50, burst=100)
+        client = Client(API_KEY, rate_limiter=limiter)
+
+    When requests have to wait, they are admitted in order of priority,
+    then of arrival. Clients send requests at `INTERACTIVE` priority, and
+    `Pages` and bulk methods at `BACKGROUND` priority, so a bulk export
+    can't hold back requests someone is waiting on.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(rate, 1))
+        self.tokens = self.burst
+        self.admitted = 0
+        self.waited = 0.0
+        self._updated = clock()
+        self._queue = []
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+
+    def _refill(self):
+        now = clock()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    # `_enter`, `_poll` and `_leave` let callers that can't block, like
+    # `AsyncioClient`, wait their turn by polling
+
+    def _enter(self, priority):
+        with self._condition:
+            ticket = (priority, next(self._order), clock())
+            heapq.heappush(self._queue, ticket)
+            return ticket
+
+    def _poll(self, ticket):
+        """
+        Admits `ticket` if it is first in line and a token is available,
+        returning 0. Otherwise returns roughly how long to wait.
+        """
+        with self._condition:
+            self._refill()
+            if self._queue[0] == ticket and self.tokens >= 1:
+                self.tokens -= 1
+                heapq.heappop(self._queue)
+                self.admitted += 1
+                self.waited += clock() - ticket[2]
+                self._condition.notify_all()
+                return 0
+            return max(1 - self.tokens, 1) / self.rate
+
+    def _leave(self, ticket):
+        # only needed when a waiter gives up before being admitted
+        with self._condition:
+            if ticket in self._queue:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._condition.notify_all()
+
+    def acquire(self, priority=INTERACTIVE):
+        """
+        Blocks until a request at `priority` may be sent.
+        """
+        # the condition's lock is reentrant, so it is held throughout
+        with self._condition:
+            ticket = self._enter(priority)
+            try:
+                while True:
+                    wait = self._poll(ticket)
+                    if not wait:
+                        return
+                    self._condition.wait(wait)
+            finally:
+                self._leave(ticket)
+
+    def stats(self):
+        """
+        Returns the number of requests `admitted`, the number `waiting`,
+        and `waited`, the total seconds requests spent waiting.
+        """
+        with self._condition:
+            return dict(admitted=self.admitted, waiting=len(self._queue),
+                        waited=self.waited)
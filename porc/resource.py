@@ -1,6 +1,16 @@
-import json
+import socket
+import threading
+import time
+import zlib
 import requests
-from .response import Response
+from concurrent.futures import Future
+from contextlib import contextmanager
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.connection import HTTPConnection
+from . import codec
+from .instrument import Sample, clock
+from .ratelimit import INTERACTIVE
+from .response import LeanResponse, Response, template
 from requests_futures.sessions import FuturesSession
 
 try:
@@ -12,19 +22,205 @@ except ImportError:
     from urllib.parse import quote, urljoin
 
 
+def socket_options(keep_alive):
+    """
+    Socket options enabling TCP keep-alive. If `keep_alive` is a number,
+    idle connections are probed after that many seconds, where the
+    platform supports it.
+    """
+    options = list(HTTPConnection.default_socket_options)
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    if keep_alive is not True:
+        for name in ['TCP_KEEPIDLE', 'TCP_KEEPINTVL']:
+            if hasattr(socket, name):
+                options.append(
+                    (socket.IPPROTO_TCP, getattr(socket, name), int(keep_alive)))
+    return options
+
+
+class Adapter(HTTPAdapter):
+    """
+    An `HTTPAdapter` that sets the given socket options on every
+    connection it opens, and counts requests and connections.
+    """
+
+    def __init__(self, socket_options=None, **kwargs):
+        self.socket_options = socket_options
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        super(Adapter, self).__init__(**kwargs)
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.socket_options is not None:
+            kwargs['socket_options'] = self.socket_options
+        super(Adapter, self).init_poolmanager(*args, **kwargs)
+
+        # count every socket connected, including reconnects of
+        # connections the server closed while they sat in the pool
+        self.poolmanager.pool_classes_by_scheme = dict(
+            (scheme, self._counting(pool_class)) for scheme, pool_class
+            in self.poolmanager.pool_classes_by_scheme.items())
+
+    def _counting(self, pool_class):
+        adapter = self
+
+        class Connection(pool_class.ConnectionCls):
+            def connect(self):
+                adapter._count('connections')
+                return super(Connection, self).connect()
+
+        return type(pool_class.__name__, (pool_class,), dict(ConnectionCls=Connection))
+
+    def send(self, request, **kwargs):
+        self._count('requests')
+        return super(Adapter, self).send(request, **kwargs)
+
+
+def compress(data, encoding):
+    """
+    Compresses a request body with the given `Content-Encoding`,
+    either 'gzip' or 'deflate'.
+    """
+    # 31 selects a gzip header and trailer, 15 a zlib one, which is
+    # what HTTP calls deflate
+    wbits = 31 if encoding == 'gzip' else 15
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, wbits)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _chained(future, fn):
+    """
+    Returns a future of `fn` applied to the result of `future`.
+    """
+    chained = Future()
+
+    def done(finished):
+        try:
+            chained.set_result(fn(finished.result()))
+        except Exception as e:
+            chained.set_exception(e)
+
+    future.add_done_callback(done)
+    return chained
+
+
 class Resource(object):
-    def __init__(self, uri, use_async=False, **kwargs):
+    def __init__(self, uri, use_async=False, pool_connections=10,
+                 pool_maxsize=10, max_workers=None, keep_alive=True,
+                 timeout=None, retry=None, rate_limiter=None, compress=None,
+                 compress_min_size=1024, observers=(), lean=False, **kwargs):
         self.uri = uri
         self.opts = kwargs
-        self.session = requests.Session()
-        self.async_session = FuturesSession()
         self.use_async = use_async
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.retry = retry
+        self.rate_limiter = rate_limiter
+        self.priority = INTERACTIVE
+        self.compress = 'gzip' if compress is True else compress
+        self.compress_min_size = compress_min_size
+        self.observers = list(observers)
+        self.lean = lean
+        # connection settings, handed on to clients derived from this one
+        self.config = dict(pool_connections=pool_connections,
+                           pool_maxsize=pool_maxsize, max_workers=max_workers,
+                           keep_alive=keep_alive, timeout=timeout, retry=retry,
+                           rate_limiter=rate_limiter, compress=compress,
+                           compress_min_size=compress_min_size,
+                           observers=self.observers, lean=lean)
+        self._transfer = dict(sent=0, sent_wire=0, received=0, received_wire=0)
         kwargs['hooks'] = {
             "response": self._handle_response
         }
-        for obj in [self.session, self.async_session]:
-            for key, value in kwargs.items():
-                setattr(obj, key, value)
+        # sessions are only created once a request needs them
+        self._session = None
+        self._async_session = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _configure(self, session):
+        for key, value in self.opts.items():
+            setattr(session, key, value)
+        adapter = Adapter(
+            socket_options=socket_options(self.keep_alive) if self.keep_alive else None,
+            pool_connections=self.config['pool_connections'],
+            pool_maxsize=self.config['pool_maxsize'])
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._configure(requests.Session())
+        return self._session
+
+    @property
+    def async_session(self):
+        if self._async_session is None:
+            with self._lock:
+                if self._async_session is None:
+                    max_workers = self.config['max_workers']
+                    if max_workers:
+                        session = FuturesSession(max_workers=max_workers)
+                    else:
+                        session = FuturesSession()
+                    self._async_session = self._configure(session)
+        return self._async_session
+
+    def pool_stats(self):
+        """
+        Counts the requests sent through this resource's connection pools
+        and the connections opened to serve them; `reused` is how many
+        requests went over an already open connection.
+        """
+        stats = dict(requests=0, connections=0)
+        for session in [self._session, self._async_session]:
+            if session is None:
+                continue
+            for adapter in set(session.adapters.values()):
+                if isinstance(adapter, Adapter):
+                    stats['requests'] += adapter.requests
+                    stats['connections'] += adapter.connections
+        stats['reused'] = stats['requests'] - stats['connections']
+        return stats
+
+    def _count_bytes(self, direction, logical, wire):
+        with self._lock:
+            self._transfer[direction] += logical
+            self._transfer[direction + '_wire'] += wire
+
+    def transfer_stats(self):
+        """
+        Counts the body bytes this resource has `sent` and `received`,
+        before compression and after decompression, and how many of them
+        actually crossed the network (`sent_wire` and `received_wire`).
+        """
+        with self._lock:
+            return dict(self._transfer)
+
+    @contextmanager
+    def prioritized(self, priority):
+        """
+        Sends the requests this thread makes inside the block at
+        `priority`, when waiting on the `rate_limiter`.
+
+            with client.prioritized(porc.ratelimit.BACKGROUND):
+                client.put('a_collection', 'a_key', body)
+        """
+        previous = getattr(self._local, 'priority', None)
+        self._local.priority = priority
+        try:
+            yield self
+        finally:
+            self._local.priority = previous
 
     def _make_path(self, path):
         # If the first element of the list isn't v0, insert it
@@ -36,22 +232,27 @@ class Resource(object):
         # Escape the components of the path
         return '/'.join([quote(str(elem), '') for elem in path])
 
-    def _request(self, method, path = [], body = None, headers = {}):
+    def _prepare(self, method, path, body, headers):
         """
-        Executes the request based on the given body and headers
-        along with options set on the object.
+        Builds the uri and the keyword arguments for the request
+        based on the given path, body and headers.
         """
         if isinstance(path, list):
             path = self._make_path(path)
 
         uri = urljoin(self.uri, path)
 
+        # callers often pass the shared default `{}`, so never change theirs
+        headers = dict(headers)
         header_names= set(name.lower() for name in headers)
         if "accept-encoding" not in header_names:
-            headers['Accept-Encoding'] = 'gzip'
+            headers['Accept-Encoding'] = 'gzip, deflate'
+        if not self.keep_alive:
+            headers['Connection'] = 'close'
 
         opts = dict(headers=headers)
-        session = self.async_session if self.use_async else self.session
+        if self.timeout is not None:
+            opts['timeout'] = self.timeout
         # normalize body according to method and type
         if body != None:
             if method.lower() in ['head', 'get', 'delete']:
@@ -64,9 +265,122 @@ class Resource(object):
                             body[key] = 'false'
                 opts['params'] = body
             else:
-                opts['data'] = json.dumps(body)
+                data = codec.dumps(body)
+                size = len(data)
+                if (self.compress and size >= self.compress_min_size
+                        and "content-encoding" not in header_names):
+                    data = compress(data, self.compress)
+                    headers['Content-Encoding'] = self.compress
+                self._count_bytes('sent', size, len(data))
+                opts['data'] = data
+
+        return uri, opts
 
-        return session.request(method, uri, **opts)
+    def _request(self, method, path = [], body = None, headers = {}):
+        """
+        Executes the request based on the given body and headers
+        along with options set on the object.
+        """
+        uri, opts = self._prepare(method, path, body, headers)
+        return self._send(method, uri, opts, self.use_async)
+
+    def _priority(self, priority):
+        if priority is None:
+            priority = getattr(self._local, 'priority', None)
+        return self.priority if priority is None else priority
+
+    def _send(self, method, uri, opts, use_async, priority=None):
+        session = self.async_session if use_async else self.session
+        if self.retry is None and self.rate_limiter is None and not self.observers:
+            response = session.request(method, uri, **opts)
+        elif use_async:
+            # wait for the limiter and retry on the session's worker thread
+            response = session.executor.submit(
+                self._retrying, session, method, uri, opts,
+                self._priority(priority), clock())
+        else:
+            response = self._retrying(session, method, uri, opts,
+                                      self._priority(priority), clock())
+        if not self.lean or opts.get('stream'):
+            return response
+        # only once requests, retries and observers are done with it
+        return _chained(response, LeanResponse) if use_async else LeanResponse(response)
+
+    def _retrying(self, session, method, uri, opts, priority, queued):
+        retry = self.retry
+        safe = retry is not None and retry.idempotent(method, opts['headers'])
+        if retry is not None:
+            retry.started()
+        attempt = 0
+        while True:
+            attempt += 1
+            # every attempt, retries included, counts against the limit
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(priority)
+            started = clock()
+            try:
+                # a plain, blocking request, even on a FuturesSession
+                response = requests.Session.request(session, method, uri, **opts)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._observe(method, uri, opts, attempt, started - queued, started, error=e)
+                delay = retry.delay(attempt) if safe else None
+                if delay is None:
+                    raise
+            else:
+                self._observe(method, uri, opts, attempt, started - queued, started, response)
+                delay = retry.delay(attempt, response) if safe else None
+                if delay is None:
+                    return response
+                response.close()
+            time.sleep(delay)
+            queued = clock()
+
+    def _observe(self, method, uri, opts, attempt, wait, started, response=None, error=None):
+        """
+        Hands a `Sample` of a finished request to the observers.
+        """
+        if not self.observers:
+            return
+        elapsed = clock() - started
+        url = uri if response is None else response.url
+        sample = Sample(self.observers, method, url, template(url[url.find('/v0'):]),
+                        attempt=attempt, sent=len(opts.get('data') or b''),
+                        wait=wait, elapsed=elapsed)
+        if error is not None:
+            sample.error = error
+        else:
+            sample.status = response.status_code
+            sample.ttfb = response.elapsed.total_seconds()
+            if not opts.get('stream'):
+                sample.received = len(response.content)
+            response._sample = sample
+        sample.completed()
+
+    def _then(self, result, fn):
+        """
+        Applies `fn` to the response `_request` returned, even if the
+        request is still running.
+        """
+        if not self.use_async:
+            return fn(result)
+        return _chained(result, fn)
+
+    def _resolved(self, value):
+        """
+        Wraps a value the way `_request` wraps a response.
+        """
+        if not self.use_async:
+            return value
+        future = Future()
+        future.set_result(value)
+        return future
 
     def _handle_response(self, response, *args, **kwargs):
+        if not kwargs.get('stream'):
+            # requests reads the body right after this hook anyway; read
+            # it here to see how much of it was compressed. urllib3
+            # decompresses it chunk by chunk as it arrives.
+            content = response.content
+            wire = response.raw.tell() if hasattr(response.raw, 'tell') else len(content)
+            self._count_bytes('received', len(content), wire)
         return Response(response)
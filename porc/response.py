@@ -1,60 +1,135 @@
-from collections import MutableMapping
-import re
-
-URL_PATTERNS = [
-    "/v0/(?P<collection>.+)/(?P<key>.+)/events/(?P<type>.+)/(?P<timestamp>\d+)/(?P<ordinal>\d+)",
-    "/v0/(?P<collection>.+)/(?P<key>.+)/events/(?P<type>.+)/(?P<timestamp>\d+)",
-    "/v0/(?P<collection>.+)/(?P<key>.+)/events/(?P<type>.+)",
-    "/v0/(?P<collection>.+)/(?P<key>.+)/refs/(?P<ref>.+)",
-    "/v0/(?P<collection>.+)/(?P<key>.+)/refs",
-    "/v0/(?P<collection>.+)/(?P<key>.+)/relations/(?P<kind>.+)/(?P<to_collection>.+)/(?P<to_key>.+)",
-    "/v0/(?P<collection>.+)/(?P<key>.+)/relations/(?P<kinds>.+)",
-    "/v0/(?P<collection>.+)/(?P<key>.+)",
-    "/v0/(?P<collection>.+)"
-]
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    # python 2
+    from collections import MutableMapping
+import copy
+from requests import HTTPError
+from requests.structures import CaseInsensitiveDict
+from requests.utils import parse_header_links
+from . import codec
+from .instrument import clock
+
+try:
+    from functools import lru_cache
+except ImportError:
+    # python 2
+    lru_cache = lambda maxsize: lambda fn: fn
+
+# attributes a response may pick up from its url and headers
+ROUTE_FIELDS = frozenset([
+    'collection', 'key', 'ref', 'type', 'timestamp', 'ordinal',
+    'kind', 'kinds', 'to_collection', 'to_key'
+])
+
+
+@lru_cache(maxsize=1024)
+def route(path):
+    """
+    Splits an Orchestrate path, like `/v0/collection/key/refs/ref`, into
+    a tuple of `(field, value)` pairs. Returns `()` for other paths.
+    """
+    if not path.startswith('/v0/'):
+        return ()
+    segments = path[4:].split('?', 1)[0].split('/')
+    if not segments[0]:
+        return ()
+
+    fields = [('collection', segments[0])]
+    if len(segments) > 1:
+        fields.append(('key', segments[1]))
+    if len(segments) < 4:
+        return tuple(fields)
+
+    kind, rest = segments[2], segments[3:]
+    if kind == 'events':
+        fields.append(('type', rest[0]))
+        if len(rest) > 1 and rest[1].isdigit():
+            fields.append(('timestamp', rest[1]))
+            if len(rest) > 2 and rest[2].isdigit():
+                fields.append(('ordinal', rest[2]))
+    elif kind == 'refs':
+        fields.append(('ref', rest[0]))
+    elif kind in ('relations', 'relation') and len(rest) == 3:
+        fields.extend(zip(('kind', 'to_collection', 'to_key'), rest))
+    elif kind == 'relations':
+        fields.append(('kinds', '/'.join(rest)))
+    return tuple(fields)
+
+
+@lru_cache(maxsize=1024)
+def template(path):
+    """
+    Replaces the names in an Orchestrate path with the fields they stand
+    for, like `/v0/{collection}/{key}/refs/{ref}`, to group requests by
+    endpoint. Searches end in `?query`.
+    """
+    path, _, query = path.partition('?')
+    names = [name for name, _ in route(path)]
+    if not names:
+        return path
+    parts = ['{%s}' % name for name in names[:2]]
+    segments = path[4:].split('/')
+    if len(segments) > 2:
+        parts.append(segments[2])
+        parts.extend('{%s}' % name for name in names[2:])
+    searching = any(param.startswith('query=') for param in query.split('&'))
+    return '/v0/' + '/'.join(parts) + ('?query' if searching else '')
+
+
+def _route_fields(url, headers):
+    """
+    Returns the route fields of a response, from its url and headers.
+    """
+    url = url or ''
+    fields = dict(route(url[url.find('/v0'):]))
+    # headers name the item more precisely than the request url
+    fields.update(route(headers.get('location', '')) or
+                  route(headers.get('content-location', '')))
+    etag = headers.get('etag', '')
+    if etag.startswith('"') and etag.rfind('"') > 1:
+        fields['ref'] = etag[1:etag.rfind('"')]
+    return fields
 
 
 class Response(MutableMapping):
 
     def __init__(self, resp):
         self.response = resp
-        if self.response.text:
-            self.json = self.response.json()
-        else:
-            self.json = dict()
-        self._set_path()
+        self._json = None
+        self._routed = False
+        self._sample = None
+
+    @property
+    def json(self):
+        # decoded on first use, since many bodies are never read
+        if self._json is None:
+            content = self.response.content
+            if self._sample is None:
+                self._json = codec.loads(content) if content else dict()
+            else:
+                started = clock()
+                self._json = codec.loads(content) if content else dict()
+                self._sample.decoded(clock() - started)
+        return self._json
+
+    @json.setter
+    def json(self, value):
+        self._json = value
 
     def _set_path(self):
-        # match the url
-        path = self.response.url[self.response.url.find('/v0'):]
-        for regex in URL_PATTERNS:
-            location_match = re.match(regex, path)
-            if location_match:
-                for key, value in location_match.groupdict().items():
-                    setattr(self, key, value)
-                break
-        # match headers
-        for regex in URL_PATTERNS:
-            # check location
-            location_match = re.match(
-                regex, self.response.headers.get('location', ''))
-            # if not in location, try content-location
-            if not location_match:
-                location_match = re.match(
-                    regex, self.response.headers.get('content-location', ''))
-            # if a match was found in either place, attach it to self
-            if location_match:
-                for key, value in location_match.groupdict().items():
-                    setattr(self, key, value)
-                break
-        # finally, try the etag
-        etag_match = re.match(
-            '"(?P<ref>.+)"', self.response.headers.get('etag', ''))
-        if etag_match:
-            for key, value in etag_match.groupdict().items():
-                setattr(self, key, value)
+        self._routed = True
+        fields = _route_fields(self.response.url, self.response.headers)
+        # keep anything the caller already assigned
+        for name, value in fields.items():
+            self.__dict__.setdefault(name, value)
 
     def __getattr__(self, name):
+        # route attributes are only parsed once one of them is asked for
+        if name in ROUTE_FIELDS and not self.__dict__.get('_routed', True):
+            self._set_path()
+            if name in self.__dict__:
+                return self.__dict__[name]
         return getattr(self.response, name)
 
     def __getitem__(self, key):
@@ -71,3 +146,106 @@ class Response(MutableMapping):
 
     def __len__(self):
         return len(self.json)
+
+
+class LeanResponse(MutableMapping):
+    """
+    A `Response` that keeps only its status, url, route fields, the
+    headers porc reads and the decoded body, releasing the
+    `requests.Response` with its raw bytes, text and connection.
+    Clients made with `lean=True` return these.
+    """
+    __slots__ = ('status_code', 'reason', 'url', 'json', '_headers') + tuple(sorted(ROUTE_FIELDS))
+
+    # the headers kept, by lowercase name
+    HEADERS = ('content-location', 'etag', 'link', 'location', 'retry-after')
+
+    def __init__(self, response):
+        headers = response.headers
+        self.status_code = response.status_code
+        self.reason = response.reason
+        self.url = response.url
+        self._headers = dict((name, headers[name]) for name in self.HEADERS
+                             if name in headers)
+        try:
+            self.json = response.json
+        except ValueError:
+            # not JSON, ex: an error page from a proxy
+            self.json = dict()
+        for name, value in _route_fields(self.url, self._headers).items():
+            setattr(self, name, value)
+
+    @property
+    def headers(self):
+        return CaseInsensitiveDict(self._headers)
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def links(self):
+        links = dict()
+        header = self._headers.get('link')
+        if header:
+            for link in parse_header_links(header):
+                links[link.get('rel') or link.get('url')] = link
+        return links
+
+    def raise_for_status(self):
+        if 400 <= self.status_code < 600:
+            kind = 'Client' if self.status_code < 500 else 'Server'
+            raise HTTPError('%s %s Error: %s for url: %s' % (
+                self.status_code, kind, self.reason, self.url), response=self)
+
+    def close(self):
+        pass
+
+    def copy(self):
+        """
+        Returns a copy of the response, with its own copy of the body.
+        """
+        other = LeanResponse.__new__(LeanResponse)
+        for name in self.__slots__:
+            if hasattr(self, name):
+                setattr(other, name, getattr(self, name))
+        other.json = copy.deepcopy(self.json)
+        return other
+
+    def __repr__(self):
+        return '<LeanResponse [%s]>' % self.status_code
+
+    def __getitem__(self, key):
+        return self.json.get(key)
+
+    def __setitem__(self, key, value):
+        self.json[key] = value
+
+    def __delitem__(self, key):
+        del self.json[key]
+
+    def __iter__(self):
+        return iter(self.json)
+
+    def __len__(self):
+        return len(self.json)
+
+
+def stored(response):
+    """
+    Returns what a cache keeps of `response`, for `restored` to turn
+    back into a response.
+    """
+    if isinstance(response, LeanResponse):
+        return response.copy()
+    return response.response
+
+
+def restored(value):
+    """
+    Returns a response from a value `stored` kept, which the caller is
+    free to change.
+    """
+    if isinstance(value, LeanResponse):
+        return value.copy()
+    return Response(value)
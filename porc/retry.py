@@ -0,0 +1,128 @@
+import random
+import threading
+import time
+from email.utils import mktime_tz, parsedate_tz
+
+
+def backoff(attempt, base, cap):
+    """
+    Returns a random wait before retrying after `attempt` tries: between
+    0 and `base * 2 ** (attempt - 1)` seconds, at most `cap`, so clients
+    that failed together don't retry in lockstep.
+    """
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+def retry_after(response):
+    """
+    Returns the seconds a response's `Retry-After` header asks to wait,
+    or `None`. The header may hold seconds or an HTTP date.
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        date = parsedate_tz(value)
+        if date is None:
+            return None
+        return max(mktime_tz(date) - time.time(), 0)
+
+
+class Retry(object):
+    """
+    A retry policy shared by every request of a client:
+
+        client = Client(API_KEY, retry=Retry(attempts=5))
+
+    Requests answered with one of `statuses`, or that failed to connect
+    or timed out, are tried up to `attempts` times in total. Only
+    requests that are safe to repeat are retried: GET, HEAD and DELETE,
+    and PUT or PATCH conditioned on a ref with `If-Match`.
+
+    Before each retry, waits a random time from the module's `backoff`,
+    given `backoff` and `max_backoff`, so clients don't retry in lockstep;
+    longer if the response carries a `Retry-After` header. If that asks for more than `max_retry_after`
+    seconds, the response is returned without retrying.
+
+    Retries also draw from a budget shared by all requests: every request
+    adds `budget` to it, up to `max_budget`, and every retry takes 1, so
+    when most requests fail, retries stop adding load to the service.
+    """
+
+    STATUSES = frozenset([429, 500, 502, 503, 504])
+    IDEMPOTENT = frozenset(['GET', 'HEAD', 'DELETE'])
+    CONDITIONAL = frozenset(['PUT', 'PATCH'])
+
+    def __init__(self, attempts=3, backoff=0.1, max_backoff=10.0,
+                 statuses=STATUSES, budget=0.2, max_budget=10,
+                 max_retry_after=60.0):
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.statuses = frozenset(statuses)
+        self.budget = budget
+        self.max_budget = max_budget
+        self.tokens = float(max_budget)
+        self.requests = 0
+        self.retries = 0
+        self.exhausted = 0
+        self.throttled = 0
+        self.delay_total = 0.0
+        self._lock = threading.Lock()
+
+    def idempotent(self, method, headers):
+        method = method.upper()
+        if method in self.IDEMPOTENT:
+            return True
+        return method in self.CONDITIONAL and any(
+            name.lower() == 'if-match' for name in headers)
+
+    def started(self):
+        """
+        Records a new request, topping up the retry budget.
+        """
+        with self._lock:
+            self.requests += 1
+            self.tokens = min(self.tokens + self.budget, self.max_budget)
+
+    def delay(self, attempt, response=None):
+        """
+        Decides whether to retry after `attempt` tries, given the last
+        `response`, or `None` if the request raised. Returns the seconds
+        to wait before retrying, or `None` not to retry.
+        """
+        if response is not None and response.status_code not in self.statuses:
+            return None
+        after = retry_after(response) if response is not None else None
+        if after is not None and after > self.max_retry_after:
+            # the caller is better placed to decide whether to wait that long
+            return None
+        with self._lock:
+            if attempt >= self.attempts:
+                self.exhausted += 1
+                return None
+            if self.tokens < 1:
+                self.throttled += 1
+                return None
+            self.tokens -= 1
+            wait = backoff(attempt, self.backoff, self.max_backoff)
+            if after is not None:
+                wait = max(wait, after)
+            self.retries += 1
+            self.delay_total += wait
+            return wait
+
+    def stats(self):
+        """
+        Returns the policy's counters as a dict: `requests` seen,
+        `retries` made, requests that still failed after every attempt
+        (`exhausted`) or were refused a retry by the budget (`throttled`),
+        and `delay`, the total seconds spent waiting to retry.
+        """
+        with self._lock:
+            return dict(requests=self.requests, retries=self.retries,
+                        exhausted=self.exhausted, throttled=self.throttled,
+                        delay=self.delay_total)
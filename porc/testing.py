@@ -0,0 +1,822 @@
+"""
+An in-memory stand-in for the Orchestrate API, for testing and
+benchmarking clients offline:
+
+    with porc.testing.serve() as url:
+        client = porc.Client('key', url)
+
+It implements items and refs, listings with `Link` headers, searches in a
+subset of Lucene syntax with stats, range and time series aggregates, events
+and relations. To make it slower or less reliable, pass options for its
+`Orchestrate` state:
+
+    state = porc.testing.Orchestrate(latency=(0.01, 0.05), error_rate=0.1, seed=1)
+    with porc.testing.serve(state) as url:
+        # the next two requests fail, whatever the error rate
+        state.fail(2, status=429, retry_after=1)
+"""
+import copy
+import fnmatch
+import json
+import random
+import re
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+from contextlib import contextmanager
+from .resource import compress
+
+try:
+    # python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urllib import quote, unquote, urlencode
+    from urlparse import parse_qsl, urlparse
+except ImportError:
+    # python 3
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qsl, quote, unquote, urlencode, urlparse
+
+
+def _now():
+    return int(time.time() * 1000)
+
+
+def _path(*segments):
+    return '/v0/' + '/'.join(quote(str(s), '') for s in segments)
+
+
+def _split(path):
+    # dot notation or JSON pointer, as accepted by Orchestrate
+    if path.startswith('/'):
+        return [p.replace('~1', '/').replace('~0', '~') for p in path[1:].split('/')]
+    return path.split('.')
+
+
+def _lookup(doc, parts):
+    for part in parts:
+        if isinstance(doc, list):
+            doc = doc[int(part)]
+        else:
+            doc = doc[part]
+    return doc
+
+
+def _parent(doc, parts):
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {}) if isinstance(doc, dict) else doc[int(part)]
+    return doc
+
+
+def _apply_patch(doc, operations):
+    for op in operations:
+        parts = _split(op['path'])
+        parent = _parent(doc, parts)
+        last = parts[-1]
+        kind = op['op']
+        if kind in ('add', 'replace'):
+            if isinstance(parent, list):
+                parent.insert(len(parent) if last == '-' else int(last), op['value'])
+            else:
+                parent[last] = op['value']
+        elif kind == 'remove':
+            del parent[int(last) if isinstance(parent, list) else last]
+        elif kind in ('move', 'copy'):
+            source = _split(op['from'])
+            value = copy.deepcopy(_lookup(doc, source))
+            if kind == 'move':
+                del _parent(doc, source)[source[-1]]
+            parent[last] = value
+        elif kind == 'test':
+            if _lookup(doc, parts) != op.get('value'):
+                raise ValueError('test failed: %s' % op['path'])
+        elif kind == 'inc':
+            parent[last] = parent.get(last, 0) + op.get('value', 1)
+        else:
+            raise ValueError('unknown op: %s' % kind)
+    return doc
+
+
+def _merge(doc, patch):
+    for key, value in patch.items():
+        if value is None:
+            doc.pop(key, None)
+        elif isinstance(value, dict) and isinstance(doc.get(key), dict):
+            _merge(doc[key], value)
+        else:
+            doc[key] = value
+    return doc
+
+
+_TOKEN = re.compile(r"""\s*(?:
+    (?P<phrase>"(?:[^"\\]|\\.)*")
+  | (?P<op>&&|\|\||[()\[\]{}:!+-])
+  | (?P<word>(?:[^\s()\[\]{}:"\\]|\\.)+)
+)""", re.X)
+_UNESCAPE = re.compile(r'\\(.)')
+_WORDS = re.compile(r'\w+', re.U)
+
+
+def _scalars(value):
+    if isinstance(value, dict):
+        for item in value.values():
+            for scalar in _scalars(item):
+                yield scalar
+    elif isinstance(value, list):
+        for item in value:
+            for scalar in _scalars(item):
+                yield scalar
+    else:
+        yield value
+
+
+def _number(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def _text(value):
+    if value is True or value is False:
+        return 'true' if value else 'false'
+    return ('%s' % value).lower()
+
+
+class Query(object):
+    """
+    Parses a search query in the subset of Lucene syntax the stand-in
+    understands, into a predicate on search results:
+
+    * terms, `field:term` and `field:(terms)`; fields may be prefixed
+      with `value.`, and `@path.key` and other `@path` fields are allowed
+    * `"phrases"`, `*` and `?` wildcards, and `field:*` for any value
+    * ranges, `field:[low TO high]`, exclusive with braces, open with `*`
+    * `AND`, `OR`, `NOT`, `&&`, `||`, `!`, `+`, `-` and parentheses;
+      terms side by side are joined with `OR`, as in Lucene
+
+    Raises `ValueError` on anything else.
+    """
+
+    def __init__(self, text):
+        self.tokens = []
+        pos = 0
+        text = text.strip()
+        while pos < len(text):
+            match = _TOKEN.match(text, pos)
+            if match is None or match.end() == pos:
+                raise ValueError('cannot parse query at: %s' % text[pos:])
+            kind = match.lastgroup
+            token = match.group(kind)
+            if kind == 'word' and token in ('AND', 'OR', 'NOT', 'TO'):
+                kind = 'op'
+            self.tokens.append((kind, token))
+            pos = match.end()
+            while pos < len(text) and text[pos].isspace():
+                pos += 1
+        self.pos = 0
+        self.match = self._or(None) if self.tokens else (lambda result: True)
+        if self.pos != len(self.tokens):
+            raise ValueError('unexpected %r in query' % self.tokens[self.pos][1])
+
+    def __call__(self, result):
+        return self.match(result)
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def _take(self, *ops):
+        kind, token = self._peek()
+        if kind == 'op' and token in ops:
+            self.pos += 1
+            return token
+        return None
+
+    def _expect(self, op):
+        if self._take(op) is None:
+            raise ValueError('expected %r in query' % op)
+
+    def _or(self, field):
+        clauses = [self._and(field)]
+        while True:
+            if self._take('OR', '||') is None:
+                kind, token = self._peek()
+                if kind is None or (kind == 'op' and token in (')', 'AND', '&&')):
+                    break
+            clauses.append(self._and(field))
+        if len(clauses) == 1:
+            return clauses[0]
+        return lambda result: any(clause(result) for clause in clauses)
+
+    def _and(self, field):
+        clauses = [self._unary(field)]
+        while self._take('AND', '&&'):
+            clauses.append(self._unary(field))
+        if len(clauses) == 1:
+            return clauses[0]
+        return lambda result: all(clause(result) for clause in clauses)
+
+    def _unary(self, field):
+        if self._take('NOT', '!', '-'):
+            clause = self._unary(field)
+            return lambda result: not clause(result)
+        self._take('+')
+        return self._primary(field)
+
+    def _primary(self, field):
+        if self._take('('):
+            clause = self._or(field)
+            self._expect(')')
+            return clause
+        kind, token = self._peek()
+        if kind == 'word' and self.pos + 1 < len(self.tokens) \
+                and self.tokens[self.pos + 1] == ('op', ':'):
+            self.pos += 2
+            field = _UNESCAPE.sub(r'\1', token)
+            if self._take('('):
+                clause = self._or(field)
+                self._expect(')')
+                return clause
+            opening = self._take('[', '{')
+            if opening:
+                return self._range(field, opening)
+            return self._term(field)
+        return self._term(field)
+
+    def _bound(self):
+        negative = self._take('-')
+        kind, token = self._peek()
+        if kind not in ('word', 'phrase'):
+            raise ValueError('expected a range bound in query')
+        self.pos += 1
+        if kind == 'phrase':
+            token = token[1:-1]
+        token = _UNESCAPE.sub(r'\1', token)
+        return '-' + token if negative else token
+
+    def _range(self, field, opening):
+        low = self._bound()
+        self._expect('TO')
+        high = self._bound()
+        closing = self._take(']', '}')
+        if closing is None:
+            raise ValueError('expected the end of a range in query')
+
+        def within(actual):
+            # compare as numbers if the value and the bounds given are numbers
+            value, lower, upper = _number(actual), _number(low), _number(high)
+            if (value is None or isinstance(actual, bool)
+                    or (lower is None and low != '*') or (upper is None and high != '*')):
+                value, lower, upper = _text(actual), low.lower(), high.lower()
+            if low != '*' and (value < lower or (opening == '{' and value == lower)):
+                return False
+            if high != '*' and (value > upper or (closing == '}' and value == upper)):
+                return False
+            return True
+
+        return lambda result: any(within(v) for v in self._values(result, field))
+
+    def _term(self, field):
+        kind, token = self._peek()
+        if kind not in ('word', 'phrase'):
+            raise ValueError('expected a term in query')
+        self.pos += 1
+        if kind == 'phrase':
+            words = _WORDS.findall(_UNESCAPE.sub(r'\1', token[1:-1]).lower())
+
+            def matches(actual):
+                found = _WORDS.findall(_text(actual))
+                return any(found[i:i + len(words)] == words
+                           for i in range(len(found) - len(words) + 1))
+        else:
+            term = _UNESCAPE.sub(r'\1', token).lower()
+            if term == '*':
+                matches = lambda actual: True
+            elif '*' in term or '?' in term:
+                matches = lambda actual: fnmatch.fnmatchcase(_text(actual), term) or any(
+                    fnmatch.fnmatchcase(word, term) for word in _WORDS.findall(_text(actual)))
+            else:
+                number = _number(term)
+
+                def matches(actual):
+                    if number is not None and _number(actual) == number \
+                            and not isinstance(actual, bool):
+                        return True
+                    text = _text(actual)
+                    return text == term or term in _WORDS.findall(text)
+
+        return lambda result: any(matches(v) for v in self._values(result, field))
+
+    def _values(self, result, field):
+        return _field_values(result, field)
+
+
+def _field_values(result, field):
+    if field is None:
+        return _scalars(result['value'])
+    if field.startswith('@path.'):
+        value, parts = result['path'], field[len('@path.'):].split('.')
+    else:
+        if field.startswith('value.'):
+            field = field[len('value.'):]
+        value, parts = result['value'], field.split('.')
+    values = [value]
+    for part in parts:
+        found = []
+        for value in values:
+            if isinstance(value, dict) and part in value:
+                found.append(value[part])
+            elif isinstance(value, list):
+                found.extend(v[part] for v in value if isinstance(v, dict) and part in v)
+        values = found
+    return [scalar for value in values for scalar in _scalars(value)]
+
+
+_INTERVALS = {'year': 4, 'month': 7, 'day': 10, 'hour': 13}
+
+
+def _bound(text):
+    return None if text == '*' else float(text)
+
+
+def _numbers(values):
+    return [float(v) for v in values
+            if isinstance(v, (int, float)) and not isinstance(v, bool)]
+
+
+def _aggregate(spec, hits):
+    """
+    Computes a `value.field:kind[:options]` aggregate over the search hits.
+    `stats`, `range` and `time_series` are supported; `ValueError` is raised
+    for anything else.
+    """
+    parts = spec.split(':')
+    if len(parts) < 2:
+        raise ValueError('Malformed aggregate: %s' % spec)
+    field, kind, options = parts[0], parts[1], parts[2:]
+    values = [v for hit in hits for v in _field_values(hit, field)]
+    aggregate = {'aggregate_kind': kind, 'field_name': field}
+    if kind == 'stats' and not options:
+        numbers = _numbers(values)
+        count = len(numbers)
+        total = sum(numbers)
+        squares = sum(n * n for n in numbers)
+        mean = total / count if count else None
+        variance = squares / count - mean * mean if count else None
+        aggregate['value_count'] = count
+        aggregate['statistics'] = {
+            'min': min(numbers) if count else None,
+            'max': max(numbers) if count else None,
+            'mean': mean,
+            'sum': total,
+            'sum_of_squares': squares,
+            'variance': variance,
+            'std_dev': variance ** 0.5 if count else None
+        }
+    elif kind == 'range' and options:
+        numbers = _numbers(values)
+        aggregate['value_count'] = len(numbers)
+        aggregate['buckets'] = []
+        for option in options:
+            low, _, high = option.partition('~')
+            try:
+                low, high = _bound(low), _bound(high)
+            except ValueError:
+                raise ValueError('Malformed range: %s' % option)
+            bucket = {'count': len([n for n in numbers
+                                    if (low is None or n >= low) and
+                                    (high is None or n < high)])}
+            if low is not None:
+                bucket['min'] = low
+            if high is not None:
+                bucket['max'] = high
+            aggregate['buckets'].append(bucket)
+    elif kind == 'time_series' and len(options) == 1 and options[0] in _INTERVALS:
+        width = _INTERVALS[options[0]]
+        counts = {}
+        for value in values:
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                # milliseconds since the epoch
+                value = time.strftime('%Y-%m-%dT%H', time.gmtime(value / 1000.0))
+            bucket = ('%s' % value)[:width]
+            counts[bucket] = counts.get(bucket, 0) + 1
+        aggregate['interval'] = options[0]
+        aggregate['value_count'] = sum(counts.values())
+        aggregate['buckets'] = [{'bucket': bucket, 'count': counts[bucket]}
+                                for bucket in sorted(counts)]
+    else:
+        raise ValueError('Unsupported aggregate: %s' % spec)
+    return aggregate
+
+
+class Orchestrate(object):
+    """
+    The in-memory state of the fake service. Every handler returns a
+    `(status, headers, body)` tuple.
+
+    Each request waits `latency` seconds, or a random time between the
+    two ends of a `(low, high)` pair. A fraction `error_rate` of requests
+    is answered with `error_status` instead. Pass `seed` to make the
+    random choices repeatable. The last requests are recorded in `log`
+    as `(method, path)` pairs.
+    """
+
+    def __init__(self, latency=0, error_rate=0, error_status=503, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.log = deque(maxlen=10000)
+        self._failures = deque()
+        self.lock = threading.RLock()
+        # collection -> key -> list of (ref, value, reftime), latest last
+        self.items = {}
+        # (collection, key, type) -> (timestamp, ordinal) -> (ref, value)
+        self.events = {}
+        # (collection, key, kind) -> set of (to_collection, to_key)
+        self.relations = {}
+        self.ordinal = 0
+
+    def fail(self, count=1, status=503, retry_after=None):
+        """
+        Answers the next `count` requests with `status`, and with a
+        `Retry-After` header if given. If `status` is `None`, closes
+        their connections without answering instead.
+        """
+        headers = {} if retry_after is None else {'Retry-After': str(retry_after)}
+        with self.lock:
+            for _ in range(count):
+                self._failures.append(
+                    None if status is None else (status, headers, {'message': 'injected'}))
+
+    def _delay(self):
+        if isinstance(self.latency, (list, tuple)):
+            return self.random.uniform(*self.latency)
+        return self.latency
+
+    def handle(self, method, segments, query, headers, body):
+        """
+        Answers a request, returning `(status, headers, body)`, or `None`
+        to drop the connection.
+        """
+        with self.lock:
+            self.log.append((method, '/'.join(segments)))
+            delay = self._delay()
+            failure = False
+            if self._failures:
+                failure = self._failures.popleft()
+            elif self.error_rate and self.random.random() < self.error_rate:
+                failure = (self.error_status, {}, {'message': 'injected'})
+        # sleep outside the lock, so slow requests still overlap
+        if delay:
+            time.sleep(delay)
+        if failure is not False:
+            return failure
+        with self.lock:
+            return self._route(method, segments, query, headers, body)
+
+    def _route(self, method, segments, query, headers, body):
+        n = len(segments)
+        if n == 0:
+            return 200, {}, None
+        if n == 1:
+            return self.collection(method, segments[0], query, body)
+        if n == 2:
+            return self.item(method, segments[0], segments[1], query, headers, body)
+        collection, key, kind = segments[:3]
+        if kind == 'refs':
+            return self.refs(collection, key, segments[3:], query)
+        if kind == 'events':
+            return self.event(method, collection, key, segments[3:], query, headers, body)
+        if kind == 'relation' and n == 6:
+            return self.relation(method, collection, key, *segments[3:])
+        if kind == 'relations':
+            return self.traverse(collection, key, segments[3:], query)
+        return 404, {}, {'message': 'not found'}
+
+    def _version(self, collection, key, value):
+        ref = uuid.uuid4().hex[:16]
+        versions = self.items.setdefault(collection, {}).setdefault(key, [])
+        versions.append((ref, value, _now()))
+        return 201, {
+            'Location': _path(collection, key, 'refs', ref),
+            'ETag': '"%s"' % ref
+        }, None
+
+    def _latest(self, collection, key):
+        versions = self.items.get(collection, {}).get(key)
+        return versions[-1] if versions else None
+
+    def _result(self, collection, key, version):
+        ref, value, reftime = version
+        return {
+            'path': {
+                'collection': collection, 'key': key, 'ref': ref,
+                'kind': 'item', 'reftime': reftime
+            },
+            'value': value,
+            'reftime': reftime
+        }
+
+    def collection(self, method, collection, query, body):
+        if method == 'POST':
+            return self._version(collection, uuid.uuid4().hex[:16], body)
+        if method == 'DELETE':
+            self.items.pop(collection, None)
+            return 204, {}, None
+        if method == 'HEAD':
+            return 200, {}, None
+        if 'query' in query:
+            return self.search(collection, query)
+        return self.list(collection, query)
+
+    def list(self, collection, query):
+        limit = int(query.get('limit', 10))
+        keys = sorted(k for k, v in self.items.get(collection, {}).items() if v)
+        if 'startKey' in query:
+            keys = [k for k in keys if k >= query['startKey']]
+        if 'afterKey' in query:
+            keys = [k for k in keys if k > query['afterKey']]
+        if 'beforeKey' in query:
+            keys = [k for k in keys if k < query['beforeKey']]
+        if 'endKey' in query:
+            keys = [k for k in keys if k <= query['endKey']]
+        page = keys[:limit]
+        body = {
+            'count': len(page),
+            'results': [self._result(collection, k, self._latest(collection, k)) for k in page]
+        }
+        headers = {}
+        if len(keys) > limit:
+            params = dict(query, afterKey=page[-1])
+            params.pop('startKey', None)
+            body['next'] = '%s?%s' % (_path(collection), urlencode(sorted(params.items())))
+            headers['Link'] = '<%s>; rel="next"' % body['next']
+        return 200, headers, body
+
+    def search(self, collection, query):
+        limit = int(query.get('limit', 10))
+        offset = int(query.get('offset', 0))
+        try:
+            matches = Query(query['query'])
+        except ValueError as e:
+            return 400, {}, {'message': str(e)}
+        hits = []
+        for key in sorted(self.items.get(collection, {})):
+            version = self._latest(collection, key)
+            if version:
+                result = self._result(collection, key, version)
+                if matches(result):
+                    hits.append(result)
+        page = hits[offset:offset + limit]
+        body = {'count': len(page), 'total_count': len(hits), 'results': page}
+        if query.get('aggregate'):
+            try:
+                body['aggregates'] = [_aggregate(spec, hits)
+                                      for spec in query['aggregate'].split(',')]
+            except ValueError as e:
+                return 400, {}, {'message': str(e)}
+        links = []
+        if offset + limit < len(hits):
+            body['next'] = '%s?%s' % (_path(collection), urlencode(
+                sorted(dict(query, offset=offset + limit).items())))
+            links.append('<%s>; rel="next"' % body['next'])
+        if offset > 0:
+            body['prev'] = '%s?%s' % (_path(collection), urlencode(
+                sorted(dict(query, offset=max(offset - limit, 0)).items())))
+            links.append('<%s>; rel="prev"' % body['prev'])
+        return 200, {'Link': ', '.join(links)} if links else {}, body
+
+    def item(self, method, collection, key, query, headers, body):
+        latest = self._latest(collection, key)
+        if_match = headers.get('If-Match', '').strip('"')
+        if_none_match = headers.get('If-None-Match', '').strip('"')
+        if if_match and (latest is None or latest[0] != if_match):
+            return 412, {}, {'message': 'ref mismatch'}
+        if method in ('GET', 'HEAD'):
+            if latest is None:
+                return 404, {}, {'message': 'not found'}
+            ref = latest[0]
+            found = {
+                'ETag': '"%s"' % ref,
+                'Content-Location': _path(collection, key, 'refs', ref)
+            }
+            if if_none_match == ref:
+                return 304, found, None
+            return 200, found, latest[1] if method == 'GET' else None
+        if method == 'PUT':
+            if if_none_match == '*' and latest is not None:
+                return 412, {}, {'message': 'item already exists'}
+            return self._version(collection, key, body)
+        if method == 'PATCH':
+            if latest is None:
+                return 404, {}, {'message': 'not found'}
+            value = copy.deepcopy(latest[1])
+            if headers.get('Content-Type', '').startswith('application/merge-patch'):
+                value = _merge(value, body)
+            else:
+                try:
+                    value = _apply_patch(value, body)
+                except (KeyError, IndexError, TypeError, ValueError) as e:
+                    return 409, {}, {'message': str(e)}
+            return self._version(collection, key, value)
+        if method == 'DELETE':
+            self.items.get(collection, {}).pop(key, None)
+            return 204, {}, None
+        return 405, {}, None
+
+    def refs(self, collection, key, rest, query):
+        versions = self.items.get(collection, {}).get(key, [])
+        if rest:
+            for version in versions:
+                if version[0] == rest[0]:
+                    return 200, {'ETag': '"%s"' % version[0]}, version[1]
+            return 404, {}, {'message': 'not found'}
+        results = [self._result(collection, key, v) for v in reversed(versions)]
+        if query.get('values') == 'false':
+            for result in results:
+                del result['value']
+        return 200, {}, {'count': len(results), 'results': results}
+
+    def _bound(self, value):
+        timestamp, _, ordinal = value.partition('/')
+        return int(timestamp), int(ordinal) if ordinal else None
+
+    def event(self, method, collection, key, rest, query, headers, body):
+        if not rest:
+            return 404, {}, {'message': 'not found'}
+        event_type = rest[0]
+        events = self.events.setdefault((collection, key, event_type), {})
+        if len(rest) == 1 and method == 'GET':
+            return self.list_events(collection, key, event_type, events, query)
+        if method == 'POST':
+            timestamp = int(rest[1]) if len(rest) > 1 else _now()
+            self.ordinal += 1
+            return self._event(collection, key, event_type, events, timestamp, self.ordinal, body)
+        if len(rest) != 3:
+            return 404, {}, {'message': 'not found'}
+        timestamp, ordinal = int(rest[1]), int(rest[2])
+        current = events.get((timestamp, ordinal))
+        if_match = headers.get('If-Match', '').strip('"')
+        if if_match and (current is None or current[0] != if_match):
+            return 412, {}, {'message': 'ref mismatch'}
+        if method == 'PUT':
+            # only updates: events are created with POST
+            if current is None:
+                return 404, {}, {'message': 'not found'}
+            return self._event(collection, key, event_type, events, timestamp, ordinal, body)
+        if method == 'DELETE':
+            events.pop((timestamp, ordinal), None)
+            return 204, {}, None
+        if current is None:
+            return 404, {}, {'message': 'not found'}
+        return 200, {'ETag': '"%s"' % current[0]}, self._event_result(
+            collection, key, event_type, (timestamp, ordinal), current)
+
+    def _event(self, collection, key, event_type, events, timestamp, ordinal, body):
+        ref = uuid.uuid4().hex[:16]
+        events[(timestamp, ordinal)] = (ref, body)
+        return 201, {
+            'Location': _path(collection, key, 'events', event_type, timestamp, ordinal),
+            'ETag': '"%s"' % ref
+        }, None
+
+    def _event_result(self, collection, key, event_type, position, event):
+        return {
+            'path': {
+                'collection': collection, 'key': key, 'type': event_type,
+                'timestamp': position[0], 'ordinal': position[1], 'ref': event[0]
+            },
+            'value': event[1],
+            'timestamp': position[0],
+            'ordinal': position[1]
+        }
+
+    def list_events(self, collection, key, event_type, events, query):
+        limit = int(query.get('limit', 10))
+        positions = sorted(events, reverse=True)
+        for name, keep in [
+                ('startEvent', lambda p, b: p >= b),
+                ('afterEvent', lambda p, b: p > b),
+                ('beforeEvent', lambda p, b: p < b),
+                ('endEvent', lambda p, b: p <= b)]:
+            if name in query:
+                timestamp, ordinal = self._bound(query[name])
+                if ordinal is None:
+                    # a bare timestamp covers every ordinal at that instant
+                    ordinal = 0 if name in ('startEvent', 'beforeEvent') else float('inf')
+                positions = [p for p in positions if keep(p, (timestamp, ordinal))]
+        page = positions[:limit]
+        body = {
+            'count': len(page),
+            'results': [self._event_result(collection, key, event_type, p, events[p])
+                        for p in page]
+        }
+        headers = {}
+        if len(positions) > limit:
+            params = dict(query, beforeEvent='%d/%d' % page[-1])
+            params.pop('endEvent', None)
+            body['next'] = '%s?%s' % (_path(collection, key, 'events', event_type),
+                                      urlencode(sorted(params.items())))
+            headers['Link'] = '<%s>; rel="next"' % body['next']
+        return 200, headers, body
+
+    def relation(self, method, collection, key, kind, to_collection, to_key):
+        edges = self.relations.setdefault((collection, key, kind), set())
+        if method == 'PUT':
+            edges.add((to_collection, to_key))
+            return 204, {}, None
+        if method == 'DELETE':
+            edges.discard((to_collection, to_key))
+            return 204, {}, None
+        return 405, {}, None
+
+    def traverse(self, collection, key, kinds, query):
+        frontier = [(collection, key)]
+        for kind in kinds:
+            frontier = sorted(set(
+                edge for node in frontier
+                for edge in self.relations.get(node + (kind,), ())))
+        results = [self._result(c, k, self._latest(c, k))
+                   for c, k in frontier if self._latest(c, k)]
+        limit = int(query.get('limit', 10))
+        offset = int(query.get('offset', 0))
+        body = {'count': len(results[offset:offset + limit]),
+                'results': results[offset:offset + limit]}
+        headers = {}
+        if offset + limit < len(results):
+            body['next'] = '%s?%s' % (_path(collection, key, 'relations', *kinds), urlencode(
+                sorted(dict(query, offset=offset + limit).items())))
+            headers['Link'] = '<%s>; rel="next"' % body['next']
+        return 200, headers, body
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately; without this, small
+    # responses wait on delayed ACKs over keep-alive connections
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _dispatch(self):
+        url = urlparse(self.path)
+        segments = [unquote(s) for s in url.path.split('/')[2:] if s]
+        query = dict(parse_qsl(url.query))
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        encoding = self.headers.get('Content-Encoding')
+        if raw and encoding in ('gzip', 'deflate'):
+            raw = zlib.decompress(raw, 31 if encoding == 'gzip' else 15)
+        body = json.loads(raw.decode('utf-8')) if raw else None
+        answer = self.server.state.handle(
+            self.command, segments, query, self.headers, body)
+        if answer is None:
+            self.close_connection = True
+            return
+        status, headers, payload = answer
+        data = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if data:
+            self.send_header('Content-Type', 'application/json')
+            # like Orchestrate, compress large bodies for clients that accept it
+            if (len(data) >= self.server.compress_min_size
+                    and 'gzip' in self.headers.get('Accept-Encoding', '')):
+                data = compress(data, 'gzip')
+                self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(data)
+
+    do_GET = do_HEAD = do_PUT = do_POST = do_PATCH = do_DELETE = _dispatch
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    compress_min_size = 1024
+
+
+@contextmanager
+def serve(state=None, **options):
+    """
+    Runs the stand-in on an ephemeral local port for the duration of the
+    `with` block, yielding its base url. Serves `state`, or a new
+    `Orchestrate` created with `options`.
+    """
+    server = Server(('127.0.0.1', 0), Handler)
+    server.state = state if state is not None else Orchestrate(**options)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        yield 'http://127.0.0.1:%d' % server.server_address[1]
+    finally:
+        server.shutdown()
+        server.server_close()
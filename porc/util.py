@@ -1,14 +1,51 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
+from itertools import islice
 
-def datetime_to_timestamp(datetime_obj=datetime.now()):
+EPOCH = datetime.utcfromtimestamp(0)
+
+def datetime_to_timestamp(datetime_obj=None):
     """
     If given a `datetime_obj`, converts it to milliseconds since epoch.
     Else, returns the milliseconds between now and the epoch.
+
+    Naive datetimes are taken to be in UTC.
     """
-    epoch = datetime.utcfromtimestamp(0)
-    delta = datetime_obj - epoch
+    if datetime_obj is None:
+        return int(time.time() * 1000)
+    if datetime_obj.tzinfo is not None:
+        datetime_obj = datetime_obj.replace(tzinfo=None) - datetime_obj.utcoffset()
+    delta = datetime_obj - EPOCH
     # Python 3-compatible TimeDelta.total_seconds()
     seconds = (delta.microseconds +
                (delta.seconds + delta.days * 24 * 3600) * 10 ** 6) / 10.0 ** 6
     milliseconds = seconds * 1000
     return int(milliseconds)
+
+def bounded(fn, items, concurrency=10):
+    """
+    Calls `fn` on every item of `items` from `concurrency` threads,
+    yielding `(item, result)` pairs in the order the calls complete.
+    If a call raises, the exception is yielded as its result.
+
+    Items are only drawn from `items` as earlier calls finish, so at most
+    `concurrency` are in flight and generators are consumed lazily.
+    """
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = dict((executor.submit(fn, item), item)
+                       for item in islice(items, concurrency))
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            finished = [(pending.pop(future), future) for future in done]
+            # refill before handing results back, so the pool stays busy
+            # while the caller works through them
+            for item in islice(items, len(finished)):
+                pending[executor.submit(fn, item)] = item
+            for item, future in finished:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = e
+                yield item, result
@@ -24,7 +24,10 @@ setup(name='porc',
           'requests-futures==0.9.5',
           'lucene-querybuilder==0.2'
       ],
-      test_suite="tests",
+      extras_require={
+          'asyncio': ['aiohttp']
+      },
+      test_suite="tests.suite",
       classifiers=[
           'Intended Audience :: Developers',
           'Natural Language :: English',
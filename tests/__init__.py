@@ -1,5 +1,9 @@
 import os
 import logging
+import sys
+import unittest
+
+from porc.testing import Orchestrate, serve
 
 if os.environ.get('ORCHESTRATE_DEBUG', None) != None:
     logging.basicConfig(level=logging.DEBUG)
@@ -9,3 +13,39 @@ API_URL = os.environ.get('ORCHESTRATE_API_URL', None)
 
 logging.debug('API_URL: %s\tAPI_KEY: %s\n' % (API_URL, API_KEY))
 
+
+def suite():
+    """
+    Every test module but `aio`, which uses async syntax and
+    `IsolatedAsyncioTestCase`, on pythons older than 3.8.
+    """
+    names = sorted(name[:-3] for name in os.listdir(os.path.dirname(__file__))
+                   if name.endswith('.py') and name != '__init__.py')
+    if sys.version_info < (3, 8):
+        names.remove('aio')
+    return unittest.defaultTestLoader.loadTestsFromNames(
+        ['%s.%s' % (__name__, name) for name in names])
+
+
+def start_server(test, state=None):
+    """
+    Starts a stand-in server serving `state` until `test` is cleaned up,
+    returning its url.
+    """
+    server = serve(state)
+    url = server.__enter__()
+    test.addCleanup(server.__exit__, None, None, None)
+    return url
+
+
+class ServerTestCase(unittest.TestCase):
+    """
+    Runs each test against its own stand-in server: `state` is the
+    `Orchestrate` it serves, `url` its address, and `collection` a name
+    unique to the test.
+    """
+
+    def setUp(self):
+        self.state = Orchestrate()
+        self.url = start_server(self, self.state)
+        self.collection = self.id().split(".", 2)[2]
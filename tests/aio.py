@@ -0,0 +1,211 @@
+import asyncio
+import unittest
+import porc
+
+from porc.testing import Orchestrate
+from . import start_server
+
+
+class AsyncioClientTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.state = Orchestrate()
+        self.url = start_server(self, self.state)
+        self.client = porc.AsyncioClient('API_KEY', self.url)
+        self.collection = self.id().split(".", 2)[2]
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def test_crud(self):
+        resp = await self.client.put(self.collection, 'a', {"derp": True})
+        resp.raise_for_status()
+        ref = resp.ref
+        resp = await self.client.get(self.collection, 'a')
+        resp.raise_for_status()
+        assert resp['derp'] == True
+        assert resp.ref == ref
+        resp = await self.client.patch(
+            self.collection, 'a', porc.Patch().add('herp', 1), ref)
+        resp.raise_for_status()
+        resp = await self.client.put(self.collection, 'a', {}, ref)
+        assert resp.status_code == 412
+        resp = await self.client.delete(self.collection, 'a')
+        resp.raise_for_status()
+        resp = await self.client.get(self.collection, 'a')
+        assert resp.status_code == 404
+
+    async def test_gather(self):
+        responses = await asyncio.gather(*[
+            self.client.put(self.collection, str(i), {"i": i})
+            for i in range(200)
+        ])
+        [response.raise_for_status() for response in responses]
+        responses = await asyncio.gather(*[
+            self.client.get(self.collection, str(i)) for i in range(200)
+        ])
+        assert [response['i'] for response in responses] == list(range(200))
+
+    async def test_pages(self):
+        for i in range(25):
+            (await self.client.post(self.collection, {"i": i})).raise_for_status()
+        pages = self.client.list(self.collection, limit=10)
+        count = 0
+        async for page in pages:
+            page.raise_for_status()
+            count += page['count']
+        assert count == 25
+        with self.assertRaises(StopAsyncIteration):
+            await pages.next()
+        pages.reset()
+        assert len(await pages.all()) == 25
+        items = await self.client.search(self.collection, 'i:3').all()
+        assert [item['value']['i'] for item in items] == [3]
+
+    async def test_events_and_relations(self):
+        resp = await self.client.post_event(self.collection, 'a', 'log', {"n": 1})
+        resp.raise_for_status()
+        resp = await self.client.get_event(
+            self.collection, 'a', 'log', resp.timestamp, resp.ordinal)
+        resp.raise_for_status()
+        assert resp['value'] == {"n": 1}
+        page = await self.client.list_events(self.collection, 'a', 'log').next()
+        assert page['count'] == 1
+
+        for key in ['a', 'b']:
+            (await self.client.put(self.collection, key, {})).raise_for_status()
+        resp = await self.client.put_relation(
+            self.collection, 'a', 'friends', self.collection, 'b')
+        resp.raise_for_status()
+        resp = await self.client.get_relations(self.collection, 'a', 'friends')
+        assert resp['results'][0]['path']['key'] == 'b'
+
+    async def test_many(self):
+        items = ((str(i), {"i": i}) for i in range(50))
+        results = {}
+        async for key, response in self.client.put_many(self.collection, items, 8):
+            results[key] = response
+        [response.raise_for_status() for response in results.values()]
+        results = {}
+        async for key, response in self.client.get_many(
+                self.collection, [str(i) for i in range(50)] + ['missing']):
+            results[key] = response
+        assert results['missing'].status_code == 404
+        assert results['49']['i'] == 49
+        async for key, response in self.client.delete_many(self.collection, ['1', '2']):
+            response.raise_for_status()
+
+    async def test_items(self):
+        for i in range(25):
+            (await self.client.put(self.collection, '%02d' % i, {"i": i})).raise_for_status()
+        pages = self.client.list(self.collection, limit=10)
+        seen = [item['value']['i'] async for item in pages.items(max_items=12)]
+        assert seen == list(range(12))
+        rest = self.client.list(self.collection).items(cursor=pages.cursor)
+        seen.extend([item['value']['i'] async for item in rest])
+        assert seen == list(range(25))
+
+    async def test_cache(self):
+        self.client.cache = porc.Cache()
+        ref = (await self.client.put(self.collection, 'k', {"v": 1})).ref
+        for _ in range(2):
+            assert (await self.client.get(self.collection, 'k', ref))['v'] == 1
+            assert (await self.client.get(self.collection, 'k'))['v'] == 1
+        stats = self.client.cache.stats()
+        assert (stats['hits'], stats['revalidations']) == (2, 1)
+
+    async def test_pool_stats(self):
+        for i in range(10):
+            (await self.client.put(self.collection, str(i), {})).raise_for_status()
+        stats = self.client.pool_stats()
+        assert stats['requests'] == 10
+        assert stats['connections'] == 1
+        assert stats['reused'] == 9
+
+    async def test_rate_limiter(self):
+        limiter = porc.RateLimiter(rate=200, burst=1)
+        self.client.rate_limiter = limiter
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        responses = await asyncio.gather(*[
+            self.client.put(self.collection, str(i), {}) for i in range(5)
+        ])
+        [response.raise_for_status() for response in responses]
+        assert len(await self.client.list(self.collection).all()) == 5
+        assert limiter.stats()['admitted'] == 6
+        assert loop.time() - start >= 5 / 200.0
+
+    async def test_compress(self):
+        body = {"text": "lorem ipsum " * 500}
+        self.client.compress = 'gzip'
+        (await self.client.put(self.collection, 'a', body)).raise_for_status()
+        assert (await self.client.get(self.collection, 'a')).json == body
+        stats = self.client.transfer_stats()
+        assert stats['sent_wire'] < 1000 < 6000 < stats['sent']
+        assert stats['received_wire'] < 1000 < 6000 < stats['received']
+
+    async def test_observers(self):
+        histograms = porc.Histograms()
+        self.client.observers.append(histograms)
+        (await self.client.put(self.collection, 'a', {})).raise_for_status()
+        (await self.client.get(self.collection, 'a')).json
+        stats = histograms.stats()['GET /v0/{collection}/{key}']
+        assert stats['statuses'] == {200: 1}
+        assert stats['decode']['count'] == 1
+        assert stats['ttfb']['max'] <= stats['elapsed']['max']
+
+    async def test_update(self):
+        (await self.client.put(self.collection, 'a', {'count': 0})).raise_for_status()
+        responses = await asyncio.gather(*[
+            self.client.update(self.collection, 'a', lambda v: dict(v, count=v['count'] + 1),
+                               attempts=100, backoff=0.001)
+            for _ in range(5)
+        ])
+        [resp.raise_for_status() for resp in responses]
+        assert (await self.client.get(self.collection, 'a'))['count'] == 5
+
+    async def test_scan_events(self):
+        for i in range(30):
+            (await self.client.post_event(self.collection, 'a', 'log', {'i': i}, 1000 + i * 10)).raise_for_status()
+        events = [e async for e in self.client.scan_events(
+            self.collection, 'a', 'log', 1000, 1290, windows=4, limit=3)]
+        assert [e['value']['i'] for e in events] == list(range(29, -1, -1))
+        events = [e async for e in self.client.scan_events(
+            self.collection, 'a', 'log', 1000, 1290, ascending=True, adaptive=True, window_events=5)]
+        assert [e['value']['i'] for e in events] == list(range(30))
+
+    async def test_traverse(self):
+        for key in 'abcd':
+            (await self.client.put(self.collection, key, {})).raise_for_status()
+        for a, b in ['ab', 'ac', 'bd', 'ca']:
+            (await self.client.put_relation(self.collection, a, 'friends', self.collection, b)).raise_for_status()
+        results = [(depth, node[1], item['path']['key']) async for depth, node, item in
+                   self.client.traverse([(self.collection, 'a')], 'friends', depth=2)]
+        assert sorted(results) == [(1, 'a', 'b'), (1, 'a', 'c'), (2, 'b', 'd')]
+
+    async def test_search_cache(self):
+        self.client.search_cache = porc.Cache()
+        for i in range(3):
+            (await self.client.put(self.collection, str(i), {'i': i})).raise_for_status()
+        first = await self.client.search(self.collection, '*', limit=2).all()
+        assert await self.client.search(self.collection, '*', limit=2).all() == first
+        assert self.client.search_cache.stats()['hits'] == 2
+        (await self.client.put(self.collection, '3', {'i': 3})).raise_for_status()
+        assert len(await self.client.search(self.collection, '*', limit=2).all()) == 4
+
+    async def test_lean(self):
+        self.client.lean = True
+        resp = await self.client.put(self.collection, 'k', {'v': 1})
+        assert isinstance(resp, porc.LeanResponse)
+        assert (await self.client.get(self.collection, 'k', resp.ref))['v'] == 1
+        assert len(await self.client.list(self.collection).all()) == 1
+
+    async def test_retry(self):
+        retry = porc.Retry(attempts=3, backoff=0.001)
+        (await self.client.put(self.collection, 'k', {})).raise_for_status()
+        self.state.log.clear()
+        self.state.fail(2, retry_after=0)
+        async with porc.AsyncioClient('API_KEY', self.url, retry=retry) as c:
+            assert (await c.get(self.collection, 'k')).status_code == 200
+        assert len(self.state.log) == 3
+        assert retry.stats()['retries'] == 2
@@ -0,0 +1,78 @@
+import threading
+import time
+import porc
+
+from . import ServerTestCase
+
+
+class BulkTest(ServerTestCase):
+
+    def setUp(self):
+        super(BulkTest, self).setUp()
+        self.client = porc.Client('API_KEY', self.url)
+
+    def test_bounded(self):
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0, 'drawn': 0}
+
+        def items():
+            for i in range(50):
+                state['drawn'] += 1
+                yield i
+
+        def call(i):
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            time.sleep(0.001)
+            with lock:
+                state['running'] -= 1
+            if i == 7:
+                raise ValueError(i)
+            return i * 2
+
+        results = porc.util.bounded(call, items(), 4)
+        first = next(results)
+        # only a bounded number of items are pulled ahead of the caller
+        assert state['drawn'] <= 8
+        results = dict([first] + list(results))
+        assert state['peak'] <= 4
+        assert isinstance(results.pop(7), ValueError)
+        assert results == dict((i, i * 2) for i in range(50) if i != 7)
+
+    def test_put_get_delete_many(self):
+        items = ((str(i), {"i": i}) for i in range(30))
+        results = dict(self.client.put_many(self.collection, items, concurrency=5))
+        assert sorted(results) == sorted(str(i) for i in range(30))
+        [response.raise_for_status() for response in results.values()]
+
+        keys = [str(i) for i in range(30)] + ['missing']
+        results = dict(self.client.get_many(self.collection, keys, concurrency=5))
+        assert results['missing'].status_code == 404
+        assert results['12']['i'] == 12
+
+        results = dict(self.client.delete_many(self.collection, keys))
+        [response.raise_for_status() for response in results.values()]
+        assert self.client.list(self.collection).all() == []
+
+    def test_async_client(self):
+        with self.client.asynchronous() as c:
+            items = [('a', {"a": 1}), ('b', {"b": 2})]
+            results = dict(c.put_many(self.collection, items))
+            assert results['a'].status_code == 201
+            ref = results['a'].ref
+            results = dict(c.get_many(self.collection, [('a', ref), 'b']))
+            assert results['a']['a'] == 1
+            assert results['b']['b'] == 2
+
+    def test_patch_many(self):
+        refs = dict((key, response.ref) for key, response in
+                    self.client.put_many(self.collection, [(str(i), {"n": i}) for i in range(5)]))
+        patches = [(str(i), porc.Patch().increment('n'), refs[str(i)]) for i in range(4)]
+        patches[1] = ('1', porc.Patch().increment('n'), 'stale')
+        patches.append(('4', porc.Patch().test('n', 0)))
+        results = dict(self.client.patch_many(self.collection, patches, concurrency=3))
+        assert results['0'].status_code == 201
+        assert results['1'].status_code == 412
+        assert results['4'].status_code == 409
+        assert self.client.get(self.collection, '3')['n'] == 4
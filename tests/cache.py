@@ -0,0 +1,210 @@
+import time
+import unittest
+import porc
+
+from porc.testing import Orchestrate, serve
+from . import ServerTestCase
+
+
+class SlowWrites(Orchestrate):
+    """
+    Holds back writes before applying them, so reads can be made while
+    one is in flight.
+    """
+
+    def handle(self, method, *args):
+        if method in ('PUT', 'DELETE'):
+            time.sleep(0.3)
+        return Orchestrate.handle(self, method, *args)
+
+
+class CacheTest(unittest.TestCase):
+
+    def test_lru(self):
+        cache = porc.Cache(size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        assert cache.get('a') == 1
+        cache.set('c', 3)
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+        assert cache.stats()['evictions'] == 1
+
+    def test_ttl(self):
+        cache = porc.Cache(ttl=0.05)
+        cache.set('a', 1)
+        assert cache.get('a') == 1
+        time.sleep(0.1)
+        assert cache.get('a') is None
+
+    def test_invalidate(self):
+        cache = porc.Cache()
+        for key in [('c', 'k'), ('c', 'k', 'r'), ('c', 'j'), ('d', 'k')]:
+            cache.set(key, True)
+        cache.invalidate('c', 'k')
+        assert len(cache) == 2
+        cache.invalidate('c')
+        assert len(cache) == 1
+
+
+class ClientCacheTest(ServerTestCase):
+
+    def setUp(self):
+        super(ClientCacheTest, self).setUp()
+        self.client = porc.Client('API_KEY', self.url, cache=porc.Cache())
+        self.other = porc.Client('API_KEY', self.url)
+
+    def test_ref(self):
+        ref = self.client.put(self.collection, 'k', {"v": 1}).ref
+        assert self.client.get(self.collection, 'k', ref)['v'] == 1
+        resp = self.client.get(self.collection, 'k', ref)
+        assert resp['v'] == 1
+        assert resp.ref == ref
+        assert self.client.cache.stats()['hits'] == 1
+        # responses served from the cache are independent copies
+        resp['v'] = 2
+        assert self.client.get(self.collection, 'k', ref)['v'] == 1
+
+    def test_revalidate(self):
+        self.client.put(self.collection, 'k', {"v": 1}).raise_for_status()
+        assert self.client.get(self.collection, 'k')['v'] == 1
+        resp = self.client.get(self.collection, 'k')
+        assert resp.status_code == 200
+        assert resp['v'] == 1
+        stats = self.client.cache.stats()
+        assert (stats['hits'], stats['revalidations'], stats['misses']) == (1, 1, 1)
+        # a write by someone else fails revalidation
+        self.other.put(self.collection, 'k', {"v": 2}).raise_for_status()
+        assert self.client.get(self.collection, 'k')['v'] == 2
+        assert self.client.cache.stats()['misses'] == 2
+
+    def test_invalidate(self):
+        ref = self.client.put(self.collection, 'k', {"v": 1}).ref
+        self.client.get(self.collection, 'k').raise_for_status()
+        self.client.put(self.collection, 'k', {"v": 2}).raise_for_status()
+        assert self.client.get(self.collection, 'k')['v'] == 2
+        self.client.get(self.collection, 'k', ref).raise_for_status()
+        self.client.delete(self.collection, 'k').raise_for_status()
+        assert self.client.get(self.collection, 'k', ref).status_code == 404
+        assert self.client.get(self.collection, 'k').status_code == 404
+
+    def test_async(self):
+        ref = self.client.put(self.collection, 'k', {"v": 1}).ref
+        with self.client.asynchronous() as c:
+            assert c.get(self.collection, 'k', ref).result()['v'] == 1
+            assert c.get(self.collection, 'k', ref).result()['v'] == 1
+            assert c.get(self.collection, 'k').result()['v'] == 1
+            assert c.get(self.collection, 'k').result()['v'] == 1
+        assert self.client.cache.stats()['hits'] == 2
+
+    def test_lean(self):
+        client = porc.Client('API_KEY', self.other.uri, cache=porc.Cache(), lean=True)
+        ref = client.put(self.collection, 'k', {"v": 1}).ref
+        resp = client.get(self.collection, 'k')
+        resp['v'] = 2
+        for cached in [client.get(self.collection, 'k'), client.get(self.collection, 'k', ref)]:
+            assert isinstance(cached, porc.LeanResponse)
+            assert cached['v'] == 1
+        stats = client.cache.stats()
+        assert (stats['hits'], stats['revalidations'], stats['misses']) == (2, 1, 1)
+
+    def test_write_in_flight(self):
+        with serve(SlowWrites()) as url:
+            client = porc.Client('API_KEY', url, cache=porc.Cache())
+            ref = client.put(self.collection, 'k', {"v": 1}).ref
+            with client.asynchronous() as c:
+                deleted = c.delete(self.collection, 'k')
+                # read, and cached, while the delete is in flight
+                assert client.get(self.collection, 'k', ref).status_code == 200
+                deleted.result().raise_for_status()
+            assert client.get(self.collection, 'k', ref).status_code == 404
+
+
+class SearchCacheTest(ServerTestCase):
+
+    def setUp(self):
+        super(SearchCacheTest, self).setUp()
+        self.client = porc.Client('API_KEY', self.url, search_cache=porc.Cache())
+        for i in range(5):
+            self.client.put(self.collection, str(i), {'i': i}).raise_for_status()
+        self.state.log.clear()
+
+    def search(self, *args, **params):
+        return self.client.search(self.collection, *args, **params)
+
+    def test_key(self):
+        key = porc.pages.search_key('http://host/v0/a%20b?offset=0&query=%20x%20', {'limit': 2})
+        assert key == ('a b', ('limit', '2'), ('query', 'x'))
+        assert porc.pages.search_key('http://host/v0/a', {'limit': 2}) is None
+
+    def test_repeat(self):
+        first = self.search('*', limit=2).all()
+        assert len(first) == 5
+        assert len(self.state.log) == 3
+        # the same search, with parameters given differently
+        search = porc.Search().query(' * ').limit(2).offset(0)
+        assert self.search(search).all() == first
+        assert len(self.state.log) == 3
+        assert self.client.search_cache.stats()['hits'] == 3
+
+    def test_navigation(self):
+        pages = self.search('*', limit=2)
+        pages.next()
+        second = pages.next()
+        pages.next()
+        assert pages.prev()['results'] == second['results']
+        pages.reset()
+        assert [r['path']['key'] for r in pages.next()['results']] == ['0', '1']
+        assert len(self.state.log) == 3
+        # prefetched pages are cached too
+        self.client.search(self.collection, '*', limit=1).prefetch(3).all()
+        self.client.search(self.collection, '*', limit=1).all()
+        assert len(self.state.log) == 8
+
+    def test_invalidate(self):
+        self.search('*').all()
+        self.client.put('other', 'k', {}).raise_for_status()
+        self.search('*').all()
+        assert self.methods() == ['GET', 'PUT']
+        for write in [lambda: self.client.put(self.collection, '9', {'i': 9}),
+                      lambda: self.client.post(self.collection, {}),
+                      lambda: self.client.delete(self.collection, '9'),
+                      lambda: self.client.post_event(self.collection, '0', 'log', {}, 1),
+                      lambda: self.client.put_relation(self.collection, '0', 'r', self.collection, '1')]:
+            write().raise_for_status()
+            self.state.log.clear()
+            self.search('*').all()
+            assert self.methods() == ['GET']
+
+    def test_write_in_flight(self):
+        with serve(SlowWrites()) as url:
+            client = porc.Client('API_KEY', url, search_cache=porc.Cache())
+            client.put(self.collection, 'a', {'i': 1}).raise_for_status()
+            with client.asynchronous() as c:
+                put = c.put(self.collection, 'b', {'i': 2})
+                # searched, and cached, while the put is in flight
+                assert len(client.search(self.collection, '*').all()) == 1
+                put.result().raise_for_status()
+            assert len(client.search(self.collection, '*').all()) == 2
+
+    def test_ttl(self):
+        self.client.search_cache = porc.Cache(ttl=0.05)
+        self.search('*').all()
+        self.search('*').all()
+        time.sleep(0.1)
+        self.search('*').all()
+        assert self.methods() == ['GET', 'GET']
+
+    def test_uncached(self):
+        self.client.search_cache = None
+        self.search('*').all()
+        self.search('*').all()
+        # listings are never cached
+        self.client.search_cache = porc.Cache()
+        self.client.list(self.collection).all()
+        self.client.list(self.collection).all()
+        assert self.methods() == ['GET'] * 4
+
+    def methods(self):
+        return [method for method, _ in self.state.log]
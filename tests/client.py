@@ -320,7 +320,7 @@ class ClientTest(unittest.TestCase):
 
     def test_async(self):
         # add three items
-        with self.client.async() as c:
+        with self.client.asynchronous() as c:
             futures = [
                 c.post(self.collections[1], {"holy gosh": True}),
                 c.post(self.collections[1], {"holy gosh": True}),
@@ -329,7 +329,7 @@ class ClientTest(unittest.TestCase):
             responses = [future.result() for future in futures]
             [response.raise_for_status() for response in responses]
         # ensure they all exist
-        with self.client.async() as c:
+        with self.client.asynchronous() as c:
             futures = [
                 c.get(self.collections[1], responses[0].key),
                 c.get(self.collections[1], responses[1].key),
@@ -338,7 +338,7 @@ class ClientTest(unittest.TestCase):
             responses = [future.result() for future in futures]
             [response.raise_for_status() for response in responses]
         # delete all three
-        with self.client.async() as c:
+        with self.client.asynchronous() as c:
             futures = [
                 c.delete(self.collections[1], responses[0].key),
                 c.delete(self.collections[1], responses[1].key),
@@ -0,0 +1,122 @@
+import json
+import unittest
+import requests
+import porc
+from porc import codec
+
+
+class CodecTest(unittest.TestCase):
+
+    def tearDown(self):
+        codec.use('json')
+
+    def test_default(self):
+        assert codec.name == 'json'
+        codec.use()
+        for name in codec.PREFERENCE:
+            try:
+                __import__(name)
+            except ImportError:
+                continue
+            assert codec.name == name
+            break
+
+    def test_roundtrip(self):
+        doc = {"herp": "dérp", "count": 3, "tags": ["a", "b"], "ok": True, "none": None}
+        for name in codec.PREFERENCE:
+            try:
+                codec.use(name)
+            except ImportError:
+                continue
+            data = codec.dumps(doc)
+            assert isinstance(data, bytes)
+            assert json.loads(data.decode('utf-8')) == doc
+            assert codec.loads(data) == doc
+
+    def test_fallback(self):
+        # orjson and ujson refuse these, the standard library doesn't
+        doc = {1: 'a', 'big': 2 ** 70 + 1, 'small': -2 ** 70 - 1}
+        expected = {'1': 'a', 'big': 2 ** 70 + 1, 'small': -2 ** 70 - 1}
+        for name in codec.PREFERENCE:
+            try:
+                codec.use(name)
+            except ImportError:
+                continue
+            data = codec.dumps(doc)
+            assert json.loads(data.decode('utf-8')) == expected
+            assert codec.loads(codec.dumps({1: 'a'})) == {'1': 'a'}
+        with self.assertRaises(TypeError):
+            codec.dumps({'a': object()})
+
+    def test_large_ints(self):
+        # decoded exactly whichever codec is in use
+        content = b'{"a": 123456789012345678901234567890, "b": [-12345678901234567890]}'
+        expected = {'a': 123456789012345678901234567890, 'b': [-12345678901234567890]}
+        for name in codec.PREFERENCE:
+            try:
+                codec.use(name)
+            except ImportError:
+                continue
+            resp = requests.Response()
+            resp._content = content
+            assert porc.Response(resp).json == expected
+            assert codec.loads(content.decode('utf-8')) == expected
+            assert codec.loads(codec.dumps(expected)) == expected
+
+    def test_custom(self):
+        calls = []
+
+        class Custom(object):
+            def dumps(self, obj):
+                calls.append('dumps')
+                return json.dumps(obj)
+
+            def loads(self, data):
+                calls.append('loads')
+                return json.loads(data)
+
+        codec.use(Custom())
+        assert codec.loads(codec.dumps([1])) == [1]
+        assert calls == ['dumps', 'loads']
+
+
+class LazyResponseTest(unittest.TestCase):
+
+    def response(self, content):
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.url = 'https://api.orchestrate.io/v0/a_collection/a_key'
+        resp._content = content
+        return resp
+
+    def test_lazy(self):
+        # invalid bodies only fail once they are read
+        resp = porc.Response(self.response(b'not json'))
+        assert resp.key == 'a_key'
+        with self.assertRaises(ValueError):
+            resp.json
+
+    def test_decode(self):
+        resp = porc.Response(self.response(b'{"herp": "derp"}'))
+        assert resp['herp'] == 'derp'
+        resp['herp'] = 'lol'
+        assert resp.json == {"herp": "lol"}
+        assert porc.Response(self.response(b'')).json == {}
+
+
+class IterArrayTest(unittest.TestCase):
+
+    def test_chunks(self):
+        doc = {"count": 50, "results": [{"i": i, "s": "dérp" * i} for i in range(50)],
+               "total_count": 1234567}
+        data = json.dumps(doc, ensure_ascii=False).encode('utf-8')
+        for size in [1, 3, 64, len(data)]:
+            chunks = (data[i:i + size] for i in range(0, len(data), size))
+            assert list(codec.iter_array(chunks, 'results')) == doc['results']
+
+    def test_edges(self):
+        assert list(codec.iter_array([b'{}'], 'results')) == []
+        assert list(codec.iter_array([b'{"results": [] }'], 'results')) == []
+        assert list(codec.iter_array([b'{"results":[1, 22', b'3]}'], 'results')) == [1, 223]
+        with self.assertRaises(ValueError):
+            list(codec.iter_array([b'{"results": [1, 2'], 'results'))
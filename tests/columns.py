@@ -0,0 +1,93 @@
+import math
+import unittest
+import porc
+
+from array import array
+from requests import HTTPError
+from . import ServerTestCase
+
+
+class ColumnsTest(unittest.TestCase):
+
+    def test_items(self):
+        items = [{'value': {'price': 10, 'car': {'year': 2001}}},
+                 {'value': {'price': 'n/a', 'car': {'year': 2005.5}}},
+                 {'value': {'price': True}}]
+        cols = porc.columns.from_items(iter(items), ['value.price', 'car.year'], use_numpy=False)
+        assert isinstance(cols['value.price'], array)
+        assert cols['value.price'].typecode == 'd'
+        assert cols['value.price'][0] == 10
+        assert all(math.isnan(v) for v in cols['value.price'][1:])
+        assert list(cols['car.year'][:2]) == [2001, 2005.5]
+        assert math.isnan(cols['car.year'][2])
+
+    def test_aggregates(self):
+        cols = porc.columns.from_aggregates([
+            {'aggregate_kind': 'stats', 'field_name': 'value.p', 'value_count': 2,
+             'statistics': {'min': 1.0, 'max': 3.0}},
+            {'aggregate_kind': 'distance', 'field_name': 'value.loc', 'value_count': 3,
+             'buckets': [{'max': 1.0, 'count': 2}, {'min': 1.0, 'count': 1}]},
+            {'aggregate_kind': 'time_series', 'field_name': 'value.d', 'value_count': 1,
+             'interval': 'year', 'buckets': [{'bucket': '2014', 'count': 1}]},
+        ], use_numpy=False)
+        assert cols['value.p:stats'] == {'min': 1.0, 'max': 3.0, 'count': 2}
+        distance = cols['value.loc:distance']
+        assert math.isnan(distance['min'][0]) and distance['min'][1] == 1.0
+        assert distance['max'][0] == 1.0 and math.isnan(distance['max'][1])
+        assert list(distance['count']) == [2, 1]
+        assert cols['value.d:time_series']['bucket'] == ['2014']
+        assert list(cols['value.d:time_series']['count']) == [1]
+
+    @unittest.skipIf(porc.columns.numpy is None, "numpy is not installed")
+    def test_numpy(self):
+        cols = porc.columns.from_items([{'value': {'a': 1}}, {'value': {}}], ['a'])
+        assert cols['a'].dtype == 'float64'
+        assert cols['a'][0] == 1 and math.isnan(cols['a'][1])
+        cols = porc.columns.from_items([], ['a'], use_numpy=True)
+        assert len(cols['a']) == 0
+
+    @unittest.skipIf(porc.columns.numpy is not None, "numpy is installed")
+    def test_no_numpy(self):
+        with self.assertRaises(ImportError):
+            porc.columns.from_items([], ['a'], use_numpy=True)
+        assert isinstance(porc.columns.from_items([], ['a'])['a'], array)
+
+
+class PagesColumnsTest(ServerTestCase):
+
+    def setUp(self):
+        super(PagesColumnsTest, self).setUp()
+        self.client = porc.Client('API_KEY', self.url)
+        for i in range(25):
+            self.client.put(self.collection, '%02d' % i,
+                            {'price': i, 'date': '2014-0%d-01' % (i % 2 + 1)}).raise_for_status()
+
+    def test_columns(self):
+        pages = self.client.search(self.collection, '*', limit=10)
+        cols = pages.columns(['price', 'value.missing'], use_numpy=False)
+        assert list(cols['price']) == list(range(25))
+        assert len(cols['value.missing']) == 25
+        # without streaming, pages can be prefetched
+        pages = self.client.search(self.collection, '*', limit=10).prefetch(2)
+        assert list(pages.columns(['price'], use_numpy=False, stream=False)['price']) == list(range(25))
+
+    def test_aggregates(self):
+        search = porc.Search().query('*').limit(5) \
+            .aggregate('stats', 'price') \
+            .aggregate('range', 'price', ['*~10', '10~20', '20~*']) \
+            .aggregate('time_series', 'date', 'month')
+        cols = self.client.search(self.collection, search).aggregates(use_numpy=False)
+        stats = cols['value.price:stats']
+        assert stats['count'] == 25
+        assert (stats['min'], stats['max'], stats['sum'], stats['mean']) == (0, 24, 300, 12)
+        ranges = cols['value.price:range']
+        assert list(ranges['count']) == [10, 10, 5]
+        assert math.isnan(ranges['min'][0]) and ranges['min'][1] == 10
+        series = cols['value.date:time_series']
+        assert series['bucket'] == ['2014-01', '2014-02']
+        assert list(series['count']) == [13, 12]
+
+    def test_unsupported(self):
+        search = porc.Search().query('*').aggregate('distance', 'location', '*~1')
+        with self.assertRaises(HTTPError):
+            self.client.search(self.collection, search).aggregates()
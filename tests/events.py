@@ -0,0 +1,168 @@
+import time
+import unittest
+from datetime import datetime, timedelta, tzinfo
+import porc
+
+from . import ServerTestCase
+
+
+class UTCPlusOne(tzinfo):
+
+    def utcoffset(self, dt):
+        return timedelta(hours=1)
+
+    def dst(self, dt):
+        return timedelta(0)
+
+
+class TimestampTest(unittest.TestCase):
+
+    def test_now(self):
+        before = int(time.time() * 1000)
+        timestamp = porc.util.datetime_to_timestamp()
+        assert before <= timestamp <= int(time.time() * 1000)
+
+    def test_datetime(self):
+        assert porc.util.datetime_to_timestamp(datetime(1970, 1, 1, 0, 0, 1)) == 1000
+        aware = datetime(1970, 1, 1, 1, 0, 1, tzinfo=UTCPlusOne())
+        assert porc.util.datetime_to_timestamp(aware) == 1000
+
+
+class EventWriterTest(ServerTestCase):
+
+    def setUp(self):
+        super(EventWriterTest, self).setUp()
+        self.client = porc.Client('API_KEY', self.url)
+
+    def events(self, key, event_type='log'):
+        return self.client.list_events(self.collection, key, event_type, limit=100).all()
+
+    def test_write(self):
+        with porc.EventWriter(self.client, interval=None) as writer:
+            for i in range(30):
+                writer.add(self.collection, str(i % 3), 'log', {'i': i})
+            assert writer.stats()['buffered'] == 30
+        for key in ['0', '1', '2']:
+            assert sorted(e['value']['i'] for e in self.events(key)) == list(range(int(key), 30, 3))
+        stats = writer.stats()
+        assert stats['written'] == 30
+        assert stats['buffered'] == 0
+        with self.assertRaises(ValueError):
+            writer.add(self.collection, 'a', 'log', {})
+
+    def test_size(self):
+        writer = porc.EventWriter(self.client, max_events=10, interval=None)
+        for i in range(25):
+            writer.add(self.collection, 'a', 'log', {'i': i})
+        stats = writer.stats()
+        assert stats['written'] == 20
+        assert stats['buffered'] == 5
+        assert stats['flushes'] == 2
+        writer.close()
+        assert len(self.events('a')) == 25
+
+    def test_interval(self):
+        writer = porc.EventWriter(self.client, interval=0.02)
+        writer.add(self.collection, 'a', 'log', {})
+        deadline = time.time() + 5
+        while writer.stats()['written'] < 1 and time.time() < deadline:
+            time.sleep(0.01)
+        assert writer.stats()['written'] == 1
+        writer.close()
+
+    def test_timestamps(self):
+        writer = porc.EventWriter(self.client, interval=None)
+        timestamps = [writer.add(self.collection, 'a', 'log', {}) for _ in range(100)]
+        assert timestamps == sorted(timestamps)
+        assert writer.add(self.collection, 'a', 'log', {}, datetime(2014, 1, 1)) == 1388534400000
+        # writers never overwrite each other's events at the same instant
+        other = porc.EventWriter(self.client, interval=None)
+        for w in [writer, other]:
+            w.add(self.collection, 'b', 'log', {}, 1000)
+            w.close()
+        assert len(self.events('b')) == 2
+
+    def test_retry(self):
+        self.state.fail(3)
+        with porc.EventWriter(self.client, interval=None, concurrency=1, backoff=0) as writer:
+            for i in range(5):
+                writer.add(self.collection, 'a', 'log', {'i': i})
+        # each event was written once
+        assert sorted(e['value']['i'] for e in self.events('a')) == list(range(5))
+        assert writer.stats()['retries'] == 3
+
+    def test_retry_after(self):
+        self.state.fail(1, status=429, retry_after=0.2)
+        started = time.time()
+        with porc.EventWriter(self.client, interval=None, backoff=0) as writer:
+            writer.add(self.collection, 'a', 'log', {})
+        assert time.time() - started >= 0.2
+        assert writer.stats()['retries'] == 1
+        # past max_retry_after, the events wait for the next flush
+        writer = porc.EventWriter(self.client, interval=None, backoff=0, max_retry_after=0.1)
+        writer.add(self.collection, 'b', 'log', {})
+        self.state.fail(1, status=429, retry_after=0.2)
+        with self.assertRaises(Exception):
+            writer.flush()
+        assert writer.stats()['buffered'] == 1
+        writer.close()
+        assert len(self.events('b')) == 1
+
+    def test_error_in_block(self):
+        with self.assertRaises(KeyError):
+            with porc.EventWriter(self.client, interval=None, attempts=1) as writer:
+                writer.add(self.collection, 'a', 'log', {})
+                self.state.fail(1)
+                raise KeyError('mine')
+        assert writer.stats()['buffered'] == 1
+
+    def test_unavailable(self):
+        writer = porc.EventWriter(self.client, interval=None, attempts=2, backoff=0)
+        writer.add(self.collection, 'a', 'log', {})
+        self.state.fail(2)
+        with self.assertRaises(Exception):
+            writer.flush()
+        assert writer.stats()['buffered'] == 1
+        writer.close()
+        assert len(self.events('a')) == 1
+
+
+class ScanEventsTest(ServerTestCase):
+
+    def setUp(self):
+        super(ScanEventsTest, self).setUp()
+        self.client = porc.Client('API_KEY', self.url)
+        with porc.EventWriter(self.client, interval=None) as writer:
+            # denser towards the end, with events sharing timestamps
+            for i in range(300):
+                writer.add('scan', 'a', 'log', {'i': i}, 1000 + (i * i) // 30)
+        self.expected = self.client.list_events('scan', 'a', 'log', limit=100).all()
+
+    def scan(self, *args, **kwargs):
+        return list(self.client.scan_events('scan', 'a', 'log', *args, **kwargs))
+
+    def test_scan(self):
+        assert len(self.expected) == 300
+        for windows in [1, 3, 8, 50]:
+            assert self.scan(0, 10000, windows=windows, limit=7) == self.expected
+        assert self.scan(0, 10000, ascending=True, concurrency=2) == self.expected[::-1]
+
+    def test_bounds(self):
+        start, end = self.expected[-1]['timestamp'], self.expected[0]['timestamp']
+        assert self.scan(start, end) == self.expected
+        assert self.scan(start + 1, end - 1) == [
+            e for e in self.expected if start < e['timestamp'] < end]
+        assert self.scan(datetime(1970, 1, 1), datetime(1970, 1, 1, 0, 0, 1)) == [
+            e for e in self.expected if e['timestamp'] <= 1000]
+
+    def test_adaptive(self):
+        assert self.scan(0, 10000, windows=2, adaptive=True, window_events=20) == self.expected
+        windows = porc.events._Windows(0, 999, 10, False, True, 50)
+        assert windows.next() == (900, 1000)
+        windows.observed((900, 1000), 200)
+        # 2 events per millisecond
+        assert windows.next() == (875, 900)
+        # nothing found yet, so twice the ground covered so far
+        windows = porc.events._Windows(0, 999, 10, True, True, 50)
+        windows.observed(windows.next(), 0)
+        assert windows.next() == (100, 300)
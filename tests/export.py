@@ -0,0 +1,146 @@
+import gzip
+import os
+import shutil
+import tempfile
+import time
+import porc
+from porc.export import Progress, export_collection, import_collection
+
+from . import ServerTestCase
+
+
+class Interrupted(Exception):
+    pass
+
+
+class Interrupting(Progress):
+    def __init__(self, after):
+        super(Interrupting, self).__init__('test', out=None)
+        self.after = after
+
+    def add(self, count=1):
+        super(Interrupting, self).add(count)
+        if self.count == self.after:
+            raise Interrupted()
+
+
+class ExportTest(ServerTestCase):
+
+    def setUp(self):
+        super(ExportTest, self).setUp()
+        self.client = porc.Client('API_KEY', self.url)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        for i in range(45):
+            self.client.put(self.collection, '%02d' % i, {"i": i}).raise_for_status()
+        for i in range(3):
+            self.client.post_event(self.collection, '07', 'log', {"n": i},
+                                   1000 + i).raise_for_status()
+
+    def items(self, collection):
+        return dict((item['path']['key'], item['value'])
+                    for item in self.client.list(collection).all())
+
+    def events(self, collection):
+        return [(event['timestamp'], event['value'])
+                for event in self.client.list_events(collection, '07', 'log').all()]
+
+    def roundtrip(self, name):
+        path = os.path.join(self.directory, name)
+        stats = export_collection(self.client, self.collection, path, ['log'], limit=10,
+                                  progress=Progress('test', out=None))
+        assert stats['items'] == 45
+        assert not os.path.exists(path + '.checkpoint')
+        stats = import_collection(self.client, 'copy', path, concurrency=4,
+                                  progress=Progress('test', out=None))
+        assert stats['items'] == 48 and stats['failed'] == 0
+        assert self.items('copy') == self.items(self.collection)
+        assert self.events('copy') == self.events(self.collection)
+        return path
+
+    def test_roundtrip(self):
+        path = self.roundtrip('export.ndjson')
+        with open(path, 'rb') as f:
+            assert len(f.readlines()) == 48
+
+    def test_roundtrip_gzip(self):
+        path = self.roundtrip('export.ndjson.gz')
+        with gzip.open(path, 'rb') as f:
+            assert len(f.readlines()) == 48
+
+    def test_resume_export(self):
+        for name in ['export.ndjson', 'export.ndjson.gz']:
+            path = os.path.join(self.directory, name)
+            with self.assertRaises(Interrupted):
+                export_collection(self.client, self.collection, path, limit=10,
+                                  checkpoint_every=10, progress=Interrupting(25))
+            assert os.path.exists(path + '.checkpoint')
+            export_collection(self.client, self.collection, path, limit=10,
+                              progress=Progress('test', out=None))
+            with porc.export._open(path, 'rb') as f:
+                keys = [porc.codec.loads(line)['key'] for line in f]
+            # nothing written after the checkpoint is repeated
+            assert keys == ['%02d' % i for i in range(45)]
+
+    def test_resume_import(self):
+        path = os.path.join(self.directory, 'export.ndjson')
+        export_collection(self.client, self.collection, path,
+                          progress=Progress('test', out=None))
+        with self.assertRaises(Interrupted):
+            import_collection(self.client, 'copy', path, concurrency=1,
+                              checkpoint_every=10, progress=Interrupting(25))
+        # the request already in flight may have completed too
+        assert 25 <= len(self.items('copy')) <= 26
+        stats = import_collection(self.client, 'copy', path,
+                                  progress=Progress('test', out=None))
+        assert stats['items'] == 20
+        assert self.items('copy') == self.items(self.collection)
+
+    def test_failures(self):
+        path = os.path.join(self.directory, 'broken.ndjson')
+        with open(path, 'wb') as f:
+            f.write(b'{"kind": "item", "key": "a", "value": {}}\n\n'
+                    b'{"kind": "unknown", "key": "b", "value": {}}\n')
+        errors = []
+
+        class Errors(object):
+            write = errors.append
+
+        stats = import_collection(self.client, 'copy', path, errors=Errors(),
+                                  progress=Progress('test', out=None))
+        assert (stats['items'], stats['failed']) == (1, 1)
+        assert errors[0].startswith('line 3:')
+        assert porc.codec.loads(open(path + '.checkpoint', 'rb').read()) == {"line": 2}
+
+    def test_retries(self):
+        path = os.path.join(self.directory, 'export.ndjson')
+        export_collection(self.client, self.collection, path, ['log'],
+                          progress=Progress('test', out=None))
+        client = porc.Client('API_KEY', self.client.uri,
+                             retry=porc.Retry(backoff=0.01))
+        self.state.fail(2, 503)
+        stats = import_collection(client, 'copy', path, concurrency=1,
+                                  progress=Progress('test', out=None))
+        assert (stats['items'], stats['failed']) == (48, 0)
+        assert client.retry.stats()['retries'] == 2
+        assert self.items('copy') == self.items(self.collection)
+        assert self.events('copy') == self.events(self.collection)
+
+    def test_events_concurrently(self):
+        for i in range(3):
+            self.client.post_event(self.collection, '12', 'log', {"m": i},
+                                   2000 + i).raise_for_status()
+        self.state.latency = 0.02
+        path = os.path.join(self.directory, 'export.ndjson')
+        started = time.time()
+        export_collection(self.client, self.collection, path, ['log', 'other'], limit=15,
+                          progress=Progress('test', out=None), concurrency=10)
+        # 45 items with 2 types of events each, 10 listings at a time
+        assert time.time() - started < 45 * 2 * 0.02
+        with open(path, 'rb') as f:
+            records = [porc.codec.loads(line) for line in f]
+        assert [r['key'] for r in records if r['kind'] == 'item'] == ['%02d' % i for i in range(45)]
+        # events follow their item
+        keys = [r['key'] for r in records]
+        assert keys[keys.index('07'):keys.index('07') + 4] == ['07'] * 4
+        assert keys[keys.index('12'):keys.index('12') + 4] == ['12'] * 4
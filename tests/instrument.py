@@ -0,0 +1,74 @@
+import unittest
+import porc
+from porc.instrument import Histogram, Histograms, Observer
+from . import ServerTestCase
+
+
+class Recorder(Observer):
+    def __init__(self):
+        self.requests = []
+        self.decoded_samples = []
+
+    def request(self, sample):
+        self.requests.append(sample)
+
+    def decoded(self, sample):
+        self.decoded_samples.append(sample)
+
+
+class HistogramTest(unittest.TestCase):
+
+    def test_percentiles(self):
+        histogram = Histogram(growth=1.01)
+        for i in range(1, 1001):
+            histogram.add(i / 1000.0)
+        assert abs(histogram.percentile(50) - 0.5) < 0.01
+        assert abs(histogram.percentile(99) - 0.99) < 0.02
+        assert histogram.percentile(100) == 1.0
+        assert Histogram().percentile(50) is None
+        summary = histogram.summary()
+        assert summary['count'] == 1000 and summary['max'] == 1.0
+
+
+class InstrumentTest(ServerTestCase):
+
+    def setUp(self):
+        super(InstrumentTest, self).setUp()
+        self.recorder = Recorder()
+        self.histograms = Histograms()
+        self.client = porc.Client('API_KEY', self.url,
+                                  observers=[self.recorder, self.histograms])
+
+    def test_samples(self):
+        self.client.put('c', 'k', {"a": 1}).raise_for_status()
+        response = self.client.get('c', 'k')
+        put, get = self.recorder.requests
+        assert (put.method, put.route, put.status) == ('PUT', '/v0/{collection}/{key}', 201)
+        assert put.sent == len(porc.codec.dumps({"a": 1}))
+        assert get.received == len(response.content)
+        assert get.elapsed >= get.ttfb >= 0 and get.wait >= 0
+        assert get.decode is None
+        assert response['a'] == 1
+        assert self.recorder.decoded_samples == [get] and get.decode >= 0
+
+        self.client.search('c', 'a:1').all()
+        stats = self.histograms.stats()
+        assert stats['GET /v0/{collection}?query']['statuses'] == {200: 1}
+        assert stats['GET /v0/{collection}/{key}']['decode']['count'] == 1
+        assert stats['PUT /v0/{collection}/{key}']['elapsed']['p99'] > 0
+
+    def test_retries_and_errors(self):
+        self.client.retry = porc.Retry(backoff=0.001)
+        self.state.fail(1)
+        self.client.get('c', 'k')
+        assert [(s.attempt, s.status) for s in self.recorder.requests] == [(1, 503), (2, 404)]
+        client = porc.Client('API_KEY', 'http://127.0.0.1:1', observers=[self.recorder])
+        with self.assertRaises(Exception):
+            client.get('c', 'k')
+        assert self.recorder.requests[-1].error is not None
+
+    def test_async(self):
+        with self.client.asynchronous() as c:
+            c.get('c', 'k').result()
+        assert self.recorder.requests[-1].status == 404
+        assert self.recorder.requests[-1].wait >= 0
@@ -2,7 +2,7 @@ import time
 import unittest
 import porc
 
-from . import API_KEY, API_URL
+from . import API_KEY, API_URL, ServerTestCase
 
 class PagesTest(unittest.TestCase):
     def setUp(self):
@@ -50,3 +50,74 @@ class PagesTest(unittest.TestCase):
     def test_iter(self):
         pages = [page for page in self.pages]
         [page.raise_for_status() for page in pages]
+
+
+class LocalPagesTest(ServerTestCase):
+    def setUp(self):
+        super(LocalPagesTest, self).setUp()
+        self.client = porc.Client('API_KEY', self.url)
+        for i in range(95):
+            self.client.put(self.collection, '%03d' % i, {'i': i}).raise_for_status()
+
+    def test_prefetch_list(self):
+        expected = self.client.list(self.collection, limit=10).all()
+        pages = self.client.list(self.collection, limit=10).prefetch(3)
+        assert pages.all() == expected
+        assert len(expected) == 95
+
+    def test_prefetch_search(self):
+        expected = self.client.search(self.collection, '*', limit=10).all()
+        pages = self.client.search(self.collection, '*', limit=10).prefetch(4)
+        counts = [page['count'] for page in pages]
+        assert counts == [10] * 9 + [5]
+        pages.reset()
+        assert pages.all() == expected
+        pages = self.client.search(self.collection, '*', limit=10, offset=50)
+        assert len(pages.prefetch(4).all()) == 45
+
+    def test_prefetch_navigation(self):
+        pages = self.client.search(self.collection, '*', limit=10).prefetch(2)
+        first = pages.next()
+        second = pages.next()
+        assert pages.prev()['results'] == first['results']
+        assert pages.next()['results'] == second['results']
+        pages.reset()
+        assert pages.next()['results'] == first['results']
+
+    def test_items(self):
+        items = self.client.list(self.collection, limit=10).items()
+        assert [item['value']['i'] for item in items] == list(range(95))
+        assert items.cursor is None
+
+    def test_items_resume(self):
+        expected = self.client.list(self.collection, limit=10).all()
+        items = self.client.iter_items(self.collection, limit=10, max_items=23)
+        seen = list(items)
+        assert seen == expected[:23]
+        # resume from a fresh iterator, as after a crash
+        cursor = list(items.cursor)
+        items = self.client.iter_items(self.collection, cursor=cursor, max_items=30)
+        seen.extend(items)
+        assert seen == expected[:53]
+        # a bare `next` link starts at the top of that page
+        seen = seen[:50]
+        seen.extend(self.client.iter_items(self.collection, cursor=items.cursor[0]))
+        assert seen == expected
+
+    def test_items_search(self):
+        items = self.client.iter_items(self.collection, '*', limit=10, max_items=15)
+        assert len(list(items)) == 15
+
+    def test_items_stream(self):
+        expected = self.client.list(self.collection, limit=10).all()
+        pages = self.client.list(self.collection, limit=10)
+        pages.chunk_size = 64
+        items = pages.items(max_items=23, stream=True)
+        seen = list(items)
+        assert seen == expected[:23]
+        items = self.client.list(self.collection).items(cursor=items.cursor, stream=True)
+        seen.extend(items)
+        assert seen == expected
+        items = self.client.search(self.collection, 'i:7').items(stream=True)
+        assert [item['value']['i'] for item in items] == [7]
+        assert self.client.transfer_stats()['received'] > 0
@@ -1,5 +1,6 @@
 import porc
 import unittest
+import copy
 import random, string
 
 
@@ -180,6 +181,145 @@ class PatchTest(unittest.TestCase):
 
         assert self.patch.operations == expected
 
+
+class OptimizedPatchTest(unittest.TestCase):
+
+    def ops(self, patch):
+        return [(op['op'], op['path'], op.get('value')) for op in patch.operations]
+
+    def test_increments(self):
+        patch = porc.Patch(optimize=True)
+        patch.increment('a').increment('b').increment('a', 5).decrement('a', 2)
+        assert self.ops(patch) == [('inc', 'a', 4), ('inc', 'b', 1)]
+        patch = porc.Patch(optimize=True).add('n', 10).increment('n', 2)
+        assert self.ops(patch) == [('add', 'n', 12)]
+        patch = porc.Patch(optimize=True).replace('s', 'x').increment('s')
+        assert self.ops(patch) == [('replace', 's', 'x'), ('inc', 's', 1)]
+
+    def test_overwrites(self):
+        patch = porc.Patch(optimize=True).replace('a', 1).remove('a')
+        assert self.ops(patch) == [('remove', 'a', None)]
+        patch = porc.Patch(optimize=True).add('a', 1).replace('a', 2)
+        assert self.ops(patch) == [('add', 'a', 2)]
+        patch = porc.Patch(optimize=True).add('a', 1).add('b', 2).replace('a', 3).remove('b')
+        assert self.ops(patch) == [('add', 'b', 2), ('add', 'a', 3), ('remove', 'b', None)]
+        # the field may not have existed before it was added
+        patch = porc.Patch(optimize=True).add('a', 1).remove('a')
+        assert self.ops(patch) == [('add', 'a', 1), ('remove', 'a', None)]
+
+    def test_kept(self):
+        # reads of the field, and array elements, are left alone
+        patch = porc.Patch(optimize=True).increment('a').test('a', 1).increment('a')
+        assert len(patch.operations) == 3
+        patch = porc.Patch(optimize=True).increment('a').copy('a', 'b').increment('a')
+        assert len(patch.operations) == 3
+        patch = porc.Patch(optimize=True).add('/list/0', 1).add('/list/0', 2)
+        assert len(patch.operations) == 2
+        patch = porc.Patch(optimize=True).increment('a').increment('c').add('b', 1)
+        assert self.ops(patch) == [('inc', 'a', 1), ('inc', 'c', 1), ('add', 'b', 1)]
+
+    def test_preconditions(self):
+        # an `inc` fails if the field isn't a number, which a later write
+        # doesn't check
+        for build in [lambda p: p.add('a', 's'), lambda p: p.replace('a', 's'),
+                      lambda p: p.remove('a')]:
+            patch = build(porc.Patch(optimize=True).increment('a'))
+            assert len(patch.operations) == 2
+        # an `add` inside a field fails if its parent is missing, which
+        # overwriting the field doesn't check
+        patch = porc.Patch(optimize=True).add('a.b', 1).replace('a', {})
+        assert len(patch.operations) == 2
+        patch = porc.Patch(optimize=True).add('a.b', 1).add('/a/c', 2).remove('a')
+        assert len(patch.operations) == 3
+
+    def test_outcomes(self):
+        # optimized patches succeed or fail on the same documents, with
+        # the same result
+        rng = random.Random(7)
+        docs = [{}, {'a': 1}, {'a': 's'}, {'a': {}}, {'a': {'b': 1}}, {'b': True}]
+        values = [1, 2.5, 's', {}, {'b': 1}, True]
+        for _ in range(2000):
+            raw, optimized = porc.Patch(), porc.Patch(optimize=True)
+            for _ in range(rng.randint(1, 5)):
+                op = rng.choice(['add', 'replace', 'remove', 'inc'])
+                path = rng.choice(['a', 'a.b', 'b', '/a/b'])
+                if op == 'remove':
+                    args = (path,)
+                elif op == 'inc':
+                    args = (path, rng.choice([1, -2]))
+                else:
+                    args = (path, rng.choice(values))
+                method = 'increment' if op == 'inc' else op
+                getattr(raw, method)(*args)
+                getattr(optimized, method)(*args)
+            for doc in docs:
+                assert strict_apply(doc, raw.operations) == \
+                    strict_apply(doc, optimized.operations), (doc, raw.operations)
+
+    def test_validation(self):
+        for build in [lambda p: p.add('', 1), lambda p: p.add('a..b', 1),
+                      lambda p: p.remove('/a/~2'), lambda p: p.move('a', 'a.b')]:
+            with self.assertRaises(ValueError):
+                build(porc.Patch(optimize=True))
+        # without optimizing, operations are sent as given
+        porc.Patch().add('a..b', 1)
+
+
+class DiffTest(unittest.TestCase):
+
+    def test_diff(self):
+        old = {'a': 1, 'b': {'c': 2, 'd': 3}, 'e': [1], 'f': 'x', 'g/h': 1}
+        new = {'a': 1, 'b': {'c': 4}, 'e': [1, 2], 'i': True, 'g/h': 2.0}
+        assert porc.patch.diff(old, new).operations == [
+            {'op': 'remove', 'path': '/f'},
+            {'op': 'remove', 'path': '/b/d'},
+            {'op': 'add', 'path': '/b/c', 'value': 4},
+            {'op': 'add', 'path': '/e', 'value': [1, 2]},
+            {'op': 'add', 'path': '/i', 'value': True},
+            {'op': 'add', 'path': '/g~1h', 'value': 2.0},
+        ]
+        assert porc.patch.diff(new, new).operations == []
+
+    def test_lookup(self):
+        doc = {'a': {'b': [1, {'c': 2}]}}
+        assert porc.patch.lookup(doc, 'a.b.1.c') == 2
+        assert porc.patch.lookup(doc, '/a/b/0') == 1
+        with self.assertRaises(KeyError):
+            porc.patch.lookup(doc, 'a.x')
+
+
+def strict_apply(doc, operations):
+    """
+    Applies a patch the strictest way the API may: every parent must be
+    an object, replaced, removed and incremented fields must exist, and
+    incremented ones must be numbers. Returns the result, or `None` if
+    the patch fails.
+    """
+    doc = copy.deepcopy(doc)
+    for op in operations:
+        parts = porc.patch.segments(op['path'])
+        parent = doc
+        for part in parts[:-1]:
+            if not isinstance(parent, dict) or part not in parent:
+                return None
+            parent = parent[part]
+        last = parts[-1]
+        if not isinstance(parent, dict):
+            return None
+        if op['op'] != 'add' and last not in parent:
+            return None
+        if op['op'] in ('add', 'replace'):
+            parent[last] = copy.deepcopy(op['value'])
+        elif op['op'] == 'remove':
+            del parent[last]
+        elif op['op'] == 'inc':
+            value = parent[last]
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                return None
+            parent[last] = value + op['value']
+    return doc
+
+
 def random_path(levels=1, token='.'):
     path = list()
     for level in range(levels):
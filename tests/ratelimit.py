@@ -0,0 +1,74 @@
+import threading
+import time
+import unittest
+import porc
+from porc.ratelimit import RateLimiter, INTERACTIVE, BACKGROUND
+
+from . import ServerTestCase
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def test_rate(self):
+        limiter = RateLimiter(rate=100, burst=5)
+        start = time.time()
+        for _ in range(5):
+            limiter.acquire()
+        # the burst goes through at once
+        assert time.time() - start < 0.02
+        for _ in range(10):
+            limiter.acquire()
+        assert time.time() - start >= 0.09
+        stats = limiter.stats()
+        assert stats['admitted'] == 15
+        assert stats['waiting'] == 0
+
+    def test_priority(self):
+        limiter = RateLimiter(rate=50, burst=1)
+        limiter.acquire()
+        order = []
+
+        def request(name, priority):
+            limiter.acquire(priority)
+            order.append(name)
+
+        threads = [threading.Thread(target=request, args=('background%d' % i, BACKGROUND))
+                   for i in range(3)]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.002)
+        threads.append(threading.Thread(target=request, args=('interactive', INTERACTIVE)))
+        threads[-1].start()
+        for thread in threads:
+            thread.join()
+        # the bucket was empty, so the interactive request overtook the
+        # background ones that had not been admitted yet
+        assert order.index('interactive') <= 1
+        assert [name for name in order if name != 'interactive'] == [
+            'background0', 'background1', 'background2']
+
+
+class RateLimitedClientTest(ServerTestCase):
+
+    def setUp(self):
+        super(RateLimitedClientTest, self).setUp()
+        self.limiter = RateLimiter(rate=200, burst=1)
+        self.client = porc.Client('API_KEY', self.url, rate_limiter=self.limiter)
+
+    def test_shared(self):
+        start = time.time()
+        self.client.put(self.collection, 'a', {}).raise_for_status()
+        with self.client.asynchronous() as c:
+            c.get(self.collection, 'a').result().raise_for_status()
+        self.client.list(self.collection).all()
+        results = dict(self.client.get_many(self.collection, ['a', 'a', 'a']))
+        [response.raise_for_status() for response in results.values()]
+        assert self.limiter.stats()['admitted'] == 6
+        assert time.time() - start >= 5 / 200.0
+
+    def test_prioritized(self):
+        assert self.client._priority(None) == INTERACTIVE
+        with self.client.prioritized(BACKGROUND):
+            assert self.client._priority(None) == BACKGROUND
+            assert self.client._priority(INTERACTIVE) == INTERACTIVE
+        assert self.client._priority(None) == INTERACTIVE
@@ -0,0 +1,92 @@
+import porc
+
+from . import ServerTestCase
+
+
+class ResourceTest(ServerTestCase):
+
+    def test_reuse(self):
+        client = porc.Client('API_KEY', self.url)
+        for i in range(10):
+            client.put(self.collection, str(i), {}).raise_for_status()
+        assert client.pool_stats() == dict(requests=10, connections=1, reused=9)
+
+    def test_no_keep_alive(self):
+        client = porc.Client('API_KEY', self.url, keep_alive=False)
+        for i in range(5):
+            client.get(self.collection, str(i))
+        assert client.pool_stats() == dict(requests=5, connections=5, reused=0)
+        # other clients keep their connections open
+        client = porc.Client('API_KEY', self.url)
+        for i in range(5):
+            client.get(self.collection, str(i))
+        assert client.pool_stats() == dict(requests=5, connections=1, reused=4)
+
+    def test_config(self):
+        client = porc.Client('API_KEY', self.url, pool_maxsize=32, max_workers=32,
+                             keep_alive=60, timeout=5)
+        assert client.async_session.executor._max_workers == 32
+        for session in [client.session, client.async_session]:
+            adapter = session.get_adapter(self.url)
+            assert adapter._pool_maxsize == 32
+        with client.asynchronous() as c:
+            assert c.config == client.config
+            futures = [c.get(self.collection, str(i)) for i in range(32)]
+            [future.result() for future in futures]
+            assert c.pool_stats()['connections'] <= 32
+
+    def test_lean(self):
+        client = porc.Client('API_KEY', self.url, lean=True)
+        resp = client.put(self.collection, 'a', {'v': 1})
+        assert isinstance(resp, porc.LeanResponse)
+        assert (resp.status_code, resp.key) == (201, 'a')
+        assert client.get(self.collection, 'a', resp.ref)['v'] == 1
+        client.put(self.collection, 'b', {'v': 2}).raise_for_status()
+        assert len(client.list(self.collection, limit=1).all()) == 2
+        # streamed pages need the underlying response
+        assert len(list(client.list(self.collection, limit=1).items(stream=True))) == 2
+        with client.asynchronous() as c:
+            assert c.lean
+            resp = c.get(self.collection, 'b').result()
+            assert isinstance(resp, porc.LeanResponse)
+            assert resp['v'] == 2
+
+    def test_lazy_sessions(self):
+        client = porc.Client('API_KEY', self.url)
+        assert client._session is None and client._async_session is None
+        client.put(self.collection, 'a', {}).raise_for_status()
+        assert client._session is not None and client._async_session is None
+
+    def test_pages_share_pool(self):
+        client = porc.Client('API_KEY', self.url)
+        for i in range(5):
+            client.put(self.collection, str(i), {}).raise_for_status()
+        pages = client.list(self.collection, limit=2)
+        assert pages.resource is client
+        assert len(pages.all()) == 5
+        assert client.pool_stats() == dict(requests=8, connections=1, reused=7)
+        with client.asynchronous() as c:
+            # pages of an asynchronous client are still fetched synchronously
+            assert len(c.list(self.collection, limit=2).all()) == 5
+            assert c._async_session is None
+
+    def test_compress(self):
+        body = {"text": "lorem ipsum " * 500}
+        for encoding in ['gzip', 'deflate']:
+            client = porc.Client('API_KEY', self.url, compress=encoding)
+            client.put(self.collection, encoding, body).raise_for_status()
+            client.put(self.collection, 'small', {"a": 1}).raise_for_status()
+            stats = client.transfer_stats()
+            # only the large body was compressed
+            assert stats['sent'] > 6000
+            assert stats['sent_wire'] < 1000
+            assert client.get(self.collection, encoding).json == body
+            stats = client.transfer_stats()
+            assert stats['received'] > 6000
+            assert stats['received_wire'] < 1000
+
+    def test_uncompressed(self):
+        client = porc.Client('API_KEY', self.url)
+        client.put(self.collection, 'a', {"text": "lorem ipsum " * 500}).raise_for_status()
+        stats = client.transfer_stats()
+        assert stats['sent'] == stats['sent_wire'] > 6000
@@ -0,0 +1,98 @@
+import unittest
+import requests
+import porc
+from porc.response import route
+
+
+def make_response(path, **headers):
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.url = 'https://api.orchestrate.io' + path
+    resp.headers.update(headers)
+    resp._content = b''
+    return porc.Response(resp)
+
+
+class RouteTest(unittest.TestCase):
+
+    def test_route(self):
+        cases = {
+            '/v0/c': {'collection': 'c'},
+            '/v0/c?limit=10&afterKey=k': {'collection': 'c'},
+            '/v0/c/k': {'collection': 'c', 'key': 'k'},
+            '/v0/c/k%2F1': {'collection': 'c', 'key': 'k%2F1'},
+            '/v0/c/k/refs': {'collection': 'c', 'key': 'k'},
+            '/v0/c/k/refs/r': {'collection': 'c', 'key': 'k', 'ref': 'r'},
+            '/v0/c/k/events/t': {'collection': 'c', 'key': 'k', 'type': 't'},
+            '/v0/c/k/events/t/123': {
+                'collection': 'c', 'key': 'k', 'type': 't', 'timestamp': '123'},
+            '/v0/c/k/events/t/123/4': {
+                'collection': 'c', 'key': 'k', 'type': 't',
+                'timestamp': '123', 'ordinal': '4'},
+            '/v0/c/k/relations/friends': {
+                'collection': 'c', 'key': 'k', 'kinds': 'friends'},
+            '/v0/c/k/relations/a/b': {
+                'collection': 'c', 'key': 'k', 'kinds': 'a/b'},
+            '/v0/c/k/relation/friends/d/j': {
+                'collection': 'c', 'key': 'k', 'kind': 'friends',
+                'to_collection': 'd', 'to_key': 'j'},
+            '/v1/c/k': {},
+            '': {},
+        }
+        for path, expected in cases.items():
+            assert dict(route(path)) == expected, path
+
+    def test_headers(self):
+        resp = make_response('/v0/c', Location='/v0/c/k/refs/r', ETag='"r"')
+        assert (resp.collection, resp.key, resp.ref) == ('c', 'k', 'r')
+        resp = make_response('/v0/c/k', **{'Content-Location': '/v0/c/k/refs/r'})
+        assert resp.ref == 'r'
+        resp = make_response('/v0/c/k', ETag='"etag"')
+        assert resp.ref == 'etag'
+        with self.assertRaises(AttributeError):
+            make_response('/v0/c').key
+
+    def test_assigned(self):
+        resp = make_response('/v0/c/k', ETag='"r"')
+        resp.ref = 'mine'
+        assert resp.key == 'k'
+        assert resp.ref == 'mine'
+
+
+class LeanResponseTest(unittest.TestCase):
+
+    def make(self, path, content=b'{"a": 1}', status=200, **headers):
+        resp = make_response(path, **headers)
+        resp.response.status_code = status
+        resp.response.reason = 'Reason'
+        resp.response._content = content
+        return porc.LeanResponse(resp)
+
+    def test_fields(self):
+        resp = self.make('/v0/c', Location='/v0/c/k/refs/r', Link='</v0/c?offset=10>; rel="next"',
+                         **{'Content-Type': 'application/json'})
+        assert not hasattr(resp, '__dict__')
+        assert (resp.collection, resp.key, resp.ref) == ('c', 'k', 'r')
+        with self.assertRaises(AttributeError):
+            resp.type
+        assert resp['a'] == 1 and dict(resp) == {'a': 1}
+        assert resp.headers['location'] == resp.headers['Location'] == '/v0/c/k/refs/r'
+        assert 'Content-Type' not in resp.headers
+        assert resp.links['next']['url'] == '/v0/c?offset=10'
+        assert resp.ok
+        resp.raise_for_status()
+
+    def test_errors(self):
+        resp = self.make('/v0/c/k', content=b'<html>', status=502)
+        assert not resp.ok
+        assert resp.json == {}
+        with self.assertRaises(requests.HTTPError) as raised:
+            resp.raise_for_status()
+        assert raised.exception.response is resp
+
+    def test_copy(self):
+        resp = self.make('/v0/c/k', content=b'{"a": {"b": 1}}', ETag='"r"')
+        other = resp.copy()
+        other['a']['b'] = 2
+        assert resp['a']['b'] == 1
+        assert (other.status_code, other.key, other.ref) == (200, 'k', 'r')
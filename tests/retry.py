@@ -0,0 +1,86 @@
+import time
+import porc
+from . import ServerTestCase
+
+
+class RetryTest(ServerTestCase):
+
+    def setUp(self):
+        super(RetryTest, self).setUp()
+        self.ref = porc.Client('API_KEY', self.url).put('c', 'k', {}).ref
+        self.state.log.clear()
+        self.state.fail(2, retry_after=0)
+        self.retry = porc.Retry(attempts=3, backoff=0.001)
+        self.client = porc.Client('API_KEY', self.url, retry=self.retry)
+
+    def test_retry(self):
+        assert self.client.get('c', 'k').status_code == 200
+        assert len(self.state.log) == 3
+        stats = self.retry.stats()
+        assert (stats['requests'], stats['retries'], stats['exhausted']) == (1, 2, 0)
+
+    def test_exhausted(self):
+        self.state.fail(3)
+        assert self.client.get('c', 'k').status_code == 503
+        assert len(self.state.log) == 3
+        assert self.retry.stats()['exhausted'] == 1
+
+    def test_idempotency(self):
+        assert self.client.post('c', {}).status_code == 503
+        assert self.client.put('c', 'k', {}).status_code == 503
+        assert self.client.put('c', 'k', {}, self.ref).status_code == 201
+        assert [method for method, _ in self.state.log] == ['POST', 'PUT', 'PUT']
+
+    def test_retry_after(self):
+        self.state._failures.clear()
+        self.state.fail(1, status=429, retry_after=0.2)
+        start = time.time()
+        assert self.client.get('c', 'k').status_code == 200
+        assert time.time() - start >= 0.2
+        assert self.retry.stats()['delay'] >= 0.2
+
+    def test_long_retry_after(self):
+        self.state._failures.clear()
+        # honoured past max_backoff
+        self.retry.max_backoff = 0.01
+        self.state.fail(1, status=429, retry_after=0.2)
+        start = time.time()
+        assert self.client.get('c', 'k').status_code == 200
+        assert time.time() - start >= 0.2
+        # but not past max_retry_after
+        self.retry.max_retry_after = 0.1
+        self.state.log.clear()
+        self.state.fail(1, status=429, retry_after=0.2)
+        assert self.client.get('c', 'k').status_code == 429
+        assert len(self.state.log) == 1
+        assert self.retry.stats()['retries'] == 1
+
+    def test_backoff(self):
+        for attempt in range(1, 6):
+            waits = [porc.retry.backoff(attempt, 0.1, 1.0) for _ in range(100)]
+            assert 0 <= min(waits) and max(waits) <= min(1.0, 0.1 * 2 ** (attempt - 1))
+
+    def test_budget(self):
+        self.retry.tokens = 1
+        self.retry.budget = 0
+        self.state.fail(8)
+        self.client.get('c', 'k')
+        assert len(self.state.log) == 2
+        assert self.retry.stats()['throttled'] == 1
+
+    def test_dropped(self):
+        self.state._failures.clear()
+        self.state.fail(1, status=None)
+        assert self.client.get('c', 'k').status_code == 200
+        assert self.retry.stats()['retries'] == 1
+
+    def test_connection_error(self):
+        client = porc.Client('API_KEY', 'http://127.0.0.1:1', retry=self.retry)
+        with self.assertRaises(Exception):
+            client.get('c', 'k')
+        assert self.retry.stats()['retries'] == 2
+
+    def test_async(self):
+        with self.client.asynchronous() as c:
+            assert c.get('c', 'k').result().status_code == 200
+        assert len(self.state.log) == 3
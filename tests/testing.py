@@ -0,0 +1,60 @@
+import time
+import unittest
+import porc
+from porc.testing import Orchestrate, Query, serve
+
+
+class QueryTest(unittest.TestCase):
+
+    def test_syntax(self):
+        result = {
+            'path': {'collection': 'c', 'key': 'k', 'kind': 'item'},
+            'value': {'name': 'Hello World', 'age': 31, 'tags': ['a', 'b'],
+                      'nested': {'ok': True}, 'day': '2014-01-02'}
+        }
+        matching = [
+            '*', 'name:hello', 'value.name:"hello world"', 'hel*', 'h?llo',
+            'age:[30 TO 31]', 'age:[* TO 40] AND tags:b', 'tags:c OR nested.ok:true',
+            'name:(foo OR world)', '(age:1 OR age:31) AND NOT tags:z', '@path.key:k',
+            'name:*', 'day:[2014-01-01 TO 2014-12-31]', 'foo hello', '+age:31 -tags:z',
+        ]
+        for query in matching:
+            assert Query(query)(result), query
+        for query in ['name:"world hello"', 'age:{30 TO 31}', 'NOT age:31', 'missing:*',
+                      'age:31 && !tags:a', 'foo bar']:
+            assert not Query(query)(result), query
+        for query in ['age:[1 TO', '(a', 'a:)', 'AND']:
+            with self.assertRaises(ValueError):
+                Query(query)
+
+
+class OrchestrateTest(unittest.TestCase):
+
+    def test_search(self):
+        with serve() as url:
+            client = porc.Client('API_KEY', url)
+            for i in range(20):
+                client.put('c', str(i), {"i": i, "even": i % 2 == 0}).raise_for_status()
+            items = client.search('c', 'even:true AND i:[4 TO 10}', limit=2).all()
+            assert sorted(item['value']['i'] for item in items) == [4, 6, 8]
+            assert client.search('c', 'i:[1 TO').next().status_code == 400
+
+    def test_injection(self):
+        state = Orchestrate(latency=0.05, error_rate=0.5, seed=1)
+        with serve(state) as url:
+            client = porc.Client('API_KEY', url)
+            start = time.time()
+            statuses = [client.get('c', 'k').status_code for _ in range(10)]
+            assert time.time() - start >= 0.5
+            assert set(statuses) == set([404, 503])
+            state.error_rate = 0
+            state.latency = 0
+            state.fail(1, status=429, retry_after=3)
+            response = client.get('c', 'k')
+            assert response.status_code == 429
+            assert response.headers['Retry-After'] == '3'
+            state.fail(1, status=None)
+            with self.assertRaises(Exception):
+                client.get('c', 'k')
+            assert client.get('c', 'k').status_code == 404
+        assert len(state.log) == 13
@@ -0,0 +1,64 @@
+import time
+import porc
+
+from . import ServerTestCase
+
+
+class TraverseTest(ServerTestCase):
+
+    def setUp(self):
+        super(TraverseTest, self).setUp()
+        self.client = porc.Client('API_KEY', self.url)
+        for i in range(6):
+            self.client.put('users', str(i), {'i': i}).raise_for_status()
+        self.client.put('things', 'x', {}).raise_for_status()
+        # 0 -> 1 -> 2 -> 3, 0 -> 2, 2 -> 0, and 1 likes x
+        for a, b in [(0, 1), (1, 2), (2, 3), (0, 2), (2, 0), (3, 4), (4, 5)]:
+            self.client.put_relation('users', str(a), 'friends', 'users', str(b)).raise_for_status()
+        self.client.put_relation('users', '1', 'likes', 'things', 'x').raise_for_status()
+
+    def keys(self, results):
+        return sorted((depth, node[1], item['path']['key']) for depth, node, item in results)
+
+    def test_depth(self):
+        results = list(self.client.traverse([('users', '0')], 'friends'))
+        assert self.keys(results) == [(1, '0', '1'), (1, '0', '2')]
+        results = list(self.client.traverse([('users', '0')], 'friends', depth=3))
+        # 0 is a seed, and 2 was found at the first hop
+        assert self.keys(results) == [(1, '0', '1'), (1, '0', '2'), (2, '2', '3'), (3, '3', '4')]
+        assert results[0][2]['value'] == {'i': int(results[0][2]['path']['key'])}
+
+    def test_kinds(self):
+        results = list(self.client.traverse([('users', '0')], ['friends', 'likes']))
+        assert self.keys(results) == [(1, '0', '1'), (1, '0', '2'), (2, '1', 'x')]
+        results = list(self.client.traverse([('users', '1')], [('friends', 'likes')]))
+        assert self.keys(results) == [(1, '1', '2'), (1, '1', 'x')]
+        with self.assertRaises(ValueError):
+            list(self.client.traverse([('users', '0')], ['friends'], depth=2))
+
+    def test_seeds(self):
+        results = list(self.client.traverse([('users', '3'), ('users', '4'), ('users', '3')], 'friends'))
+        assert self.keys(results) == [(1, '4', '5')]
+
+    def test_fanout(self):
+        friends = [('f%d' % i, {}) for i in range(120)]
+        list(self.client.put_many('users', friends))
+        for key, _ in friends:
+            self.client.put_relation('users', 'hub', 'friends', 'users', key).raise_for_status()
+        results = list(self.client.traverse([('users', 'hub')], 'friends'))
+        assert len(results) == 120
+        results = list(self.client.traverse([('users', 'hub')], 'friends', max_fanout=15))
+        assert len(results) == 15
+        # one page of one relation per item
+        self.state.log.clear()
+        results = list(self.client.traverse([('users', '0'), ('users', '3')], ['friends'], max_fanout=1))
+        assert self.keys(results) == [(1, '0', '1'), (1, '3', '4')]
+        assert len(self.state.log) == 2
+
+    def test_concurrent(self):
+        self.state.latency = 0.05
+        start = time.time()
+        results = list(self.client.traverse([('users', str(i)) for i in range(6)], 'friends'))
+        # six requests, at once
+        assert time.time() - start < 0.2
+        assert results == []
@@ -0,0 +1,123 @@
+import threading
+import porc
+
+from . import ServerTestCase
+
+
+class UpdateTest(ServerTestCase):
+
+    def setUp(self):
+        super(UpdateTest, self).setUp()
+        self.client = porc.Client('API_KEY', self.url)
+
+    def methods(self):
+        return [method for method, _ in self.state.log]
+
+    def test_update(self):
+        self.client.put(self.collection, 'a', {'count': 1, 'name': 'a'}).raise_for_status()
+        resp = self.client.update(self.collection, 'a', lambda v: dict(v, count=v['count'] + 1))
+        resp.raise_for_status()
+        item = self.client.get(self.collection, 'a')
+        assert item.json == {'count': 2, 'name': 'a'}
+        assert item.ref == resp.ref
+
+    def test_in_place(self):
+        self.client.put(self.collection, 'a', {'tags': []}).raise_for_status()
+        self.client.update(self.collection, 'a', lambda v: v['tags'].append('x')).raise_for_status()
+        assert self.client.get(self.collection, 'a').json == {'tags': ['x']}
+
+    def test_unchanged(self):
+        self.client.put(self.collection, 'a', {'count': 1}).raise_for_status()
+        self.state.log.clear()
+        resp = self.client.update(self.collection, 'a', lambda v: v)
+        assert resp.status_code == 200
+        assert self.methods() == ['GET']
+
+    def test_missing(self):
+        resp = self.client.update(self.collection, 'a', lambda v: dict(v, count=v['count'] + 1))
+        assert resp.status_code == 404
+        resp = self.client.update(self.collection, 'a', lambda v: dict(v, count=v['count'] + 1),
+                                  default={'count': 0})
+        resp.raise_for_status()
+        assert self.client.get(self.collection, 'a').json == {'count': 1}
+
+    def test_contended(self):
+        self.client.put(self.collection, 'a', {'count': 0}).raise_for_status()
+
+        statuses = []
+
+        def increment():
+            for _ in range(5):
+                statuses.append(self.client.update(
+                    self.collection, 'a', lambda v: dict(v, count=v['count'] + 1),
+                    attempts=100, backoff=0.001).status_code)
+
+        threads = [threading.Thread(target=increment) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert statuses == [201] * 20, statuses
+        assert self.client.get(self.collection, 'a')['count'] == 20
+
+    def conflicting(self):
+        # changes another field between the read and the write, once
+        calls = []
+        self.client.put(self.collection, 'a', {'count': 0, 'other': 0}).raise_for_status()
+
+        def fn(value):
+            if not calls:
+                self.client.put(self.collection, 'a', dict(value, other=1)).raise_for_status()
+            calls.append(value)
+            value['count'] += 1
+
+        self.state.log.clear()
+        return fn, calls
+
+    def test_patch_fallback(self):
+        fn, calls = self.conflicting()
+        self.client.update(self.collection, 'a', fn, reads=['count']).raise_for_status()
+        assert len(calls) == 1
+        assert self.methods() == ['GET', 'PUT', 'PUT', 'PATCH']
+        assert self.client.get(self.collection, 'a').json == {'count': 1, 'other': 1}
+
+    def test_reread(self):
+        fn, calls = self.conflicting()
+        self.client.update(self.collection, 'a', fn).raise_for_status()
+        assert len(calls) == 2
+        assert self.methods() == ['GET', 'PUT', 'PUT', 'GET', 'PUT']
+        assert self.client.get(self.collection, 'a').json == {'count': 1, 'other': 1}
+
+    def test_failed_test(self):
+        # the field `fn` read changed, so the patch is refused too
+        calls = []
+        self.client.put(self.collection, 'a', {'count': 0}).raise_for_status()
+
+        def fn(value):
+            if not calls:
+                self.client.put(self.collection, 'a', {'count': 10}).raise_for_status()
+            calls.append(value)
+            value['count'] += 1
+
+        self.client.update(self.collection, 'a', fn, reads=['count']).raise_for_status()
+        assert len(calls) == 2
+        assert self.client.get(self.collection, 'a')['count'] == 11
+
+    def test_attempts(self):
+        self.client.put(self.collection, 'a', {'count': 0}).raise_for_status()
+
+        def fn(value):
+            self.client.put(self.collection, 'a', {'count': -1}).raise_for_status()
+            value['count'] += 1
+
+        resp = self.client.update(self.collection, 'a', fn, attempts=3, backoff=0)
+        assert resp.status_code == 412
+        assert self.methods().count('GET') == 3
+
+    def test_asynchronous(self):
+        self.client.put(self.collection, 'a', {'count': 0}).raise_for_status()
+        with self.client.asynchronous() as c:
+            futures = [c.update(self.collection, 'a', lambda v: dict(v, count=v['count'] + 1),
+                                attempts=100, backoff=0.001) for _ in range(5)]
+            [future.result().raise_for_status() for future in futures]
+        assert self.client.get(self.collection, 'a')['count'] == 5